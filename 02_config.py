@@ -1,6 +1,7 @@
 import boto3
 import json
 import os
+from flow_simulator.resource_index import ResourceIndex, ResourceRef
 
 
 def create_default_config():
@@ -8,6 +9,9 @@ def create_default_config():
         "region": "us-east-1",
         "modelInvokeId": "amazon.titan-text-premier-v1:0",
         "modelEvalId": "anthropic.claude-3-sonnet-20240229-v1:0",
+        "connectTimeout": 10,
+        "readTimeout": 120,
+        "requestDeadline": 300,
     }
     with open("bedrock_config.json", "w") as config_file:
         json.dump(default_config, config_file, indent=2)
@@ -26,14 +30,14 @@ region = config["region"]
 modelEvalId = config["modelEvalId"]
 
 bedrock_agent = boto3.client(service_name="bedrock-agent", region_name=region)
+resource_index = ResourceIndex(bedrock_agent)
 
 
 def get_existing_prompt(name):
     try:
-        response = bedrock_agent.list_prompts()
-        for prompt in response.get("promptSummaries", []):
-            if prompt["name"] == name:
-                return prompt["id"], prompt["arn"]
+        prompt = resource_index.get_prompt(name)
+        if prompt:
+            return prompt.id, prompt.arn
     except Exception as e:
         print(f"Error checking for existing prompt: {str(e)}")
     return None, None
@@ -68,6 +72,9 @@ def create_prompt(name):
             ],
             defaultVariant="variantOne",
         )
+        resource_index.record(
+            "prompts", name, ResourceRef(id=response["id"], arn=response["arn"])
+        )
         return response["id"], response["arn"]
     except Exception as e:
         print(f"Error creating prompt: {str(e)}")
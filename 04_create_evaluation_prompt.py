@@ -1,6 +1,7 @@
 import boto3
 import json
 import os
+from flow_simulator.resource_index import ResourceIndex, ResourceRef
 
 # Load configuration
 with open("bedrock_config.json", "r") as config_file:
@@ -10,14 +11,14 @@ region = config["region"]
 modelEvalId = config["modelEvalId"]
 
 bedrock_agent = boto3.client(service_name="bedrock-agent", region_name=region)
+resource_index = ResourceIndex(bedrock_agent)
 
 
 def get_existing_prompt(name):
     try:
-        response = bedrock_agent.list_prompts()
-        for prompt in response.get("promptSummaries", []):
-            if prompt["name"] == name:
-                return prompt["id"], prompt["arn"]
+        prompt = resource_index.get_prompt(name)
+        if prompt:
+            return prompt.id, prompt.arn
     except Exception as e:
         print(f"Error checking for existing prompt: {str(e)}")
     return None, None
@@ -52,6 +53,9 @@ def create_prompt(name):
             ],
             defaultVariant="variantOne",
         )
+        resource_index.record(
+            "prompts", name, ResourceRef(id=response["id"], arn=response["arn"])
+        )
         return response["id"], response["arn"]
     except Exception as e:
         print(f"Error creating prompt: {str(e)}")
@@ -2,6 +2,8 @@ import boto3
 import json
 import os
 from botocore.exceptions import ClientError
+from flow_simulator.generator import prompt_eval_template
+from flow_simulator.resource_index import ResourceIndex, ResourceRef
 
 # Load configuration
 with open("bedrock_config.json", "r") as config_file:
@@ -11,6 +13,8 @@ region = config["region"]
 modelInvokeId = config["modelInvokeId"]
 
 bedrock_agent = boto3.client(service_name="bedrock-agent", region_name=region)
+resource_index = ResourceIndex(bedrock_agent)
+flow_template = prompt_eval_template("07_prompt_eval_flow_defn.json")
 
 # Load role and prompt details
 with open("role_details.json", "r") as f:
@@ -24,10 +28,9 @@ promptEvalArn = prompt_details["promptEvalArn"]
 
 def get_existing_flow(name):
     try:
-        response = bedrock_agent.list_flows()
-        for flow in response.get("flowSummaries", []):
-            if flow["name"] == name:
-                return flow["id"], flow["arn"]
+        flow = resource_index.get_flow(name)
+        if flow:
+            return flow.id, flow.arn
     except Exception as e:
         print(f"Error checking for existing flow: {str(e)}")
     return None, None
@@ -36,104 +39,9 @@ def get_existing_flow(name):
 def create_or_update_flow(name, description, role_arn, prompt_arn):
     flow_id, flow_arn = get_existing_flow(name)
 
-    flow_definition = {
-        "nodes": [
-            {
-                "name": "Start",
-                "type": "Input",
-                "configuration": {"input": {}},
-                "outputs": [{"name": "document", "type": "String"}],
-            },
-            {
-                "name": "End",
-                "type": "Output",
-                "configuration": {"output": {}},
-                "inputs": [
-                    {"expression": "$.data", "name": "document", "type": "String"}
-                ],
-            },
-            {
-                "name": "Invoke",
-                "type": "Prompt",
-                "configuration": {
-                    "prompt": {
-                        "sourceConfiguration": {
-                            "inline": {
-                                "inferenceConfiguration": {
-                                    "text": {"maxTokens": 2000, "temperature": 0}
-                                },
-                                "modelId": modelInvokeId,
-                                "templateConfiguration": {
-                                    "text": {
-                                        "inputVariables": [{"name": "input"}],
-                                        "text": "{{input}}",
-                                    }
-                                },
-                                "templateType": "TEXT",
-                            }
-                        }
-                    }
-                },
-                "inputs": [{"expression": "$.data", "name": "input", "type": "String"}],
-                "outputs": [{"name": "modelCompletion", "type": "String"}],
-            },
-            {
-                "name": "Evaluate",
-                "type": "Prompt",
-                "configuration": {
-                    "prompt": {
-                        "sourceConfiguration": {"resource": {"promptArn": prompt_arn}}
-                    }
-                },
-                "inputs": [
-                    {"expression": "$.data", "name": "input", "type": "String"},
-                    {"expression": "$.data", "name": "output", "type": "String"},
-                ],
-                "outputs": [{"name": "modelCompletion", "type": "String"}],
-            },
-        ],
-        "connections": [
-            {
-                "name": "StartToInvoke",
-                "source": "Start",
-                "target": "Invoke",
-                "type": "Data",
-                "configuration": {
-                    "data": {"sourceOutput": "document", "targetInput": "input"}
-                },
-            },
-            {
-                "name": "InvokeToEvaluate",
-                "source": "Invoke",
-                "target": "Evaluate",
-                "type": "Data",
-                "configuration": {
-                    "data": {"sourceOutput": "modelCompletion", "targetInput": "output"}
-                },
-            },
-            {
-                "name": "StartToEvaluate",
-                "source": "Start",
-                "target": "Evaluate",
-                "type": "Data",
-                "configuration": {
-                    "data": {"sourceOutput": "document", "targetInput": "input"}
-                },
-            },
-            {
-                "name": "EvaluateToEnd",
-                "source": "Evaluate",
-                "target": "End",
-                "type": "Data",
-                "configuration": {
-                    "data": {
-                        "sourceOutput": "modelCompletion",
-                        "targetInput": "document",
-                    }
-                },
-            },
-        ],
-    }
+    flow_definition = flow_template.render_definition(
+        {"MODEL_INVOKE_ID": modelInvokeId, "PROMPT_EVAL_ARN": prompt_arn}
+    )
 
     try:
         if flow_id:
@@ -152,6 +60,9 @@ def create_or_update_flow(name, description, role_arn, prompt_arn):
                 executionRoleArn=role_arn,
                 definition=flow_definition,
             )
+            resource_index.record(
+                "flows", name, ResourceRef(id=response["id"], arn=response["arn"])
+            )
         return response["id"], response["arn"]
     except ClientError as e:
         print(f"Error creating/updating flow: {e}")
@@ -1,7 +1,11 @@
 import boto3
 import json
 
-region = "us-east-1"
+# Load configuration
+with open("bedrock_config.json", "r") as config_file:
+    config = json.load(config_file)
+
+region = config["region"]
 bedrock_agent = boto3.client(service_name="bedrock-agent", region_name=region)
 
 # Read flow details
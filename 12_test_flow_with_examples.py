@@ -1,13 +1,20 @@
-import boto3
 import json
-import time
 from botocore.exceptions import ClientError
-
-# Assuming you're using the same region as before
-region = "us-east-1"
-bedrock_agent_runtime = boto3.client(
-    service_name="bedrock-agent-runtime", region_name=region
+from flow_events import FlowEventConsumer
+from flow_invocation import (
+    FlowDeadlineExceeded,
+    create_runtime_client,
+    iter_flow_events,
+    request_deadline,
 )
+from judge_output import JudgeOutputError, JUDGE_KEYS
+
+# Load configuration for client timeouts and the request deadline
+with open("bedrock_config.json", "r") as config_file:
+    config = json.load(config_file)
+
+region = config["region"]
+bedrock_agent_runtime = create_runtime_client(region, config)
 
 # Read flow details
 with open("flow_details.json", "r") as f:
@@ -17,31 +24,19 @@ flow_id = flow_details["flowId"]
 flow_alias_id = flow_details.get("flowAliasId")  # Use the alias if available
 
 
-def invoke_flow(input_text, timeout=300):  # 5 minutes timeout
+def invoke_flow(input_text, timeout=request_deadline(config)):
     try:
-        response = bedrock_agent_runtime.invoke_flow(
-            flowIdentifier=flow_id,
-            flowAliasIdentifier=flow_alias_id,
-            inputs=[
-                {
-                    "content": {"document": input_text},
-                    "nodeName": "Start",
-                    "nodeOutputName": "document",
-                }
-            ],
+        event_stream = iter_flow_events(
+            bedrock_agent_runtime, flow_id, flow_alias_id, input_text, timeout
         )
-
-        event_stream = response["responseStream"]
-        result = ""
-        start_time = time.time()
-        for event in event_stream:
-            if time.time() - start_time > timeout:
-                print(f"Flow invocation timed out after {timeout} seconds.")
-                return None
-            if "flowOutputEvent" in event:
-                result += event["flowOutputEvent"]["content"]["document"]
-
-        return json.loads(result)
+        consumer = FlowEventConsumer().consume(event_stream)
+        return consumer.evaluation(required=JUDGE_KEYS)
+    except FlowDeadlineExceeded:
+        print(f"Flow invocation timed out after {timeout} seconds.")
+        return None
+    except JudgeOutputError as e:
+        print(f"Could not parse flow output ({e.reason}): {e}")
+        return None
     except ClientError as e:
         error_code = e.response["Error"]["Code"]
         error_message = e.response["Error"]["Message"]
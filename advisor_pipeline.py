@@ -0,0 +1,728 @@
+"""
+Generative AI Advisor pipeline
+
+The LangChain chains behind the generative_ai_advisor CLI: C-suite advice through
+a MultiPromptChain, project decomposition and assessment, and team coordination.
+The CLI imports this module only once it has a command to run, since LangChain
+and boto3 take seconds to load.
+"""
+
+import json
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from typing import Callable, IO, Iterable, List, Dict, Optional, Union
+
+import click
+from pydantic import BaseModel, ConfigDict, Field
+import boto3
+from langchain.chains import MultiPromptChain, LLMChain
+from langchain_community.llms import Bedrock
+from langchain.prompts import PromptTemplate
+from langchain.globals import set_llm_cache
+from langchain_core.callbacks import BaseCallbackHandler
+
+from llm_cache import SQLiteLRUCache
+
+DEFAULT_TEAMS = [
+    "backend-developer",
+    "code-architect",
+    "database-specialist",
+    "devops-engineer",
+    "frontend-developer",
+    "project-manager",
+    "qa-tester",
+    "security-specialist",
+    "technical-writer",
+]
+
+_llms: Dict[str, Bedrock] = {}
+_llms_lock = threading.Lock()
+
+
+class PromptInfo(BaseModel):
+    """
+    Represents information about a specific prompt.
+    """
+
+    name: str
+    description: str
+    prompt_template: str
+
+
+class AdvisorConfig(BaseModel):
+    """
+    Configuration for the Generative AI Advisor.
+    """
+
+    model_config = ConfigDict(protected_namespaces=())
+
+    model_id: str = Field(default="anthropic.claude-instant-v1")
+    prompt_infos: List[PromptInfo] = Field(default_factory=list)
+    teams: List[str] = Field(default_factory=lambda: list(DEFAULT_TEAMS))
+    max_concurrency: int = Field(default=4)
+    speculate: int = Field(default=0)
+
+
+def create_bedrock_client():
+    """
+    Create the Bedrock runtime client shared by every advisor LLM.
+
+    Returns:
+        The boto3 bedrock-runtime client.
+    """
+    return boto3.client("bedrock-runtime")
+
+
+def get_llm(model_id: str) -> Bedrock:
+    """
+    Return the LLM for a model id, creating it and its client on first use.
+
+    Every step of the pipeline shares the instance, so the client and its
+    connection pool are set up once per model rather than once per call.
+    Responses are streamed so callbacks see tokens as they arrive.
+
+    Args:
+        model_id (str): The model ID to use for the LLM.
+
+    Returns:
+        Bedrock: The shared LLM.
+    """
+    with _llms_lock:
+        if model_id not in _llms:
+            _llms[model_id] = Bedrock(
+                model_id=model_id, client=create_bedrock_client(), streaming=True
+            )
+        return _llms[model_id]
+
+
+def enable_response_cache(
+    path: str = ".advisor_cache.db", max_entries: int = 10000
+) -> SQLiteLRUCache:
+    """
+    Cache every LLM response in a SQLite file keyed by model and rendered prompt.
+
+    Re-running the advisor on the same question or project is then answered
+    from the cache without calling the model. The least recently used responses
+    are evicted beyond ``max_entries``.
+
+    Args:
+        path (str): The SQLite file holding the cache.
+        max_entries (int): The maximum number of cached responses.
+
+    Returns:
+        SQLiteLRUCache: The cache now used by all LLMs.
+    """
+    cache = SQLiteLRUCache(path, max_entries=max_entries)
+    set_llm_cache(cache)
+    return cache
+
+
+class StreamingEcho(BaseCallbackHandler):
+    """
+    Callback handler that writes one stage's tokens as they arrive and times it.
+
+    Tokens from the MultiPromptChain router are not written, since they are the
+    routing decision rather than the answer. A stage answered from the cache
+    streams nothing; ``streamed`` tells the caller to print the result instead.
+    """
+
+    def __init__(self, write: Optional[Callable[[str], None]] = None):
+        self.write = write or (lambda text: click.echo(text, nl=False))
+        self.started = time.perf_counter()
+        self.first_token: Optional[float] = None
+        self.streamed = False
+        self._chains = {}  # run id -> (chain name, parent run id)
+        self._muted = set()
+
+    def on_chain_start(
+        self, serialized, inputs, *, run_id, parent_run_id=None, **kwargs
+    ):
+        name = kwargs.get("name") or ((serialized or {}).get("id") or [""])[-1]
+        self._chains[run_id] = (name, parent_run_id)
+
+    def on_llm_start(
+        self, serialized, prompts, *, run_id, parent_run_id=None, **kwargs
+    ):
+        while parent_run_id in self._chains:
+            name, parent_run_id = self._chains[parent_run_id]
+            if name == "LLMRouterChain":
+                self._muted.add(run_id)
+                return
+
+    def on_llm_new_token(self, token: str, *, run_id, **kwargs):
+        if run_id in self._muted:
+            return
+        if self.first_token is None:
+            self.first_token = time.perf_counter() - self.started
+        self.streamed = True
+        self.write(token)
+
+    def timing(self) -> str:
+        """
+        Describe the time to first token and the total time of the stage.
+
+        Returns:
+            str: The timing summary.
+        """
+        total = time.perf_counter() - self.started
+        if self.first_token is None:
+            return f"[no tokens streamed, total {total:.2f}s]"
+        return f"[first token {self.first_token:.2f}s, total {total:.2f}s]"
+
+
+class OrderedStreams:
+    """
+    Terminal output for several concurrent streams, shown one at a time in order.
+
+    The first unfinished stream writes straight to the terminal; the others are
+    buffered and flushed as soon as every stream before them has finished.
+    """
+
+    def __init__(self, names: List[str], write: Optional[Callable[[str], None]] = None):
+        self.names = names
+        self.write = write or (lambda text: click.echo(text, nl=False))
+        self.buffers = {name: [f"\n{name.upper()}:\n"] for name in names}
+        self.finished = set()
+        self.head = 0
+        self.lock = threading.Lock()
+        with self.lock:
+            self._flush_head()
+
+    def _flush_head(self):
+        if self.head < len(self.names):
+            buffer = self.buffers[self.names[self.head]]
+            if buffer:
+                self.write("".join(buffer))
+                buffer.clear()
+
+    def writer(self, name: str) -> Callable[[str], None]:
+        """
+        Return a function that writes text to the stream called ``name``.
+
+        Args:
+            name (str): The stream name.
+
+        Returns:
+            Callable[[str], None]: The writer, safe to call from any thread.
+        """
+
+        def write(text: str):
+            with self.lock:
+                if self.head < len(self.names) and self.names[self.head] == name:
+                    self.write(text)
+                else:
+                    self.buffers[name].append(text)
+
+        return write
+
+    def finish(self, name: str, text: str = ""):
+        """
+        Write the final text of a stream and move on to the next streams in order.
+
+        Args:
+            name (str): The stream name.
+            text (str): Text to write after what was streamed.
+        """
+        self.writer(name)(text)
+        with self.lock:
+            self.finished.add(name)
+            while (
+                self.head < len(self.names) and self.names[self.head] in self.finished
+            ):
+                self.head += 1
+                self._flush_head()
+
+
+def run_stage(run: Callable[[list], str]) -> str:
+    """
+    Run one pipeline stage, streaming its tokens to the terminal, then print its timing.
+
+    Args:
+        run (Callable[[list], str]): Runs the stage with the given callbacks.
+
+    Returns:
+        str: The stage output.
+    """
+    handler = StreamingEcho()
+    result = run([handler])
+    if not handler.streamed:
+        click.echo(result.strip(), nl=False)
+    click.echo(f"\n{handler.timing()}")
+    return result
+
+
+def create_prompt_infos() -> List[PromptInfo]:
+    """
+    Create a list of PromptInfo objects with predefined C-suite roles.
+
+    Returns:
+        List[PromptInfo]: A list of PromptInfo objects.
+    """
+    prompts = [
+        PromptInfo(
+            name="CTO",
+            description="Good for overseeing technological needs and operations, including developing technology strategy, managing IT systems and infrastructure, and directing technology initiatives.",
+            prompt_template="""You're the CTO, CIO, and CDO of the company. You oversee all the technological, data needs and operations, including developing technology strategy, managing IT systems and infrastructure, and directing technology initiatives.
+Your job is keeping the company technologically updated in an efficient way.
+Human: {input}""",
+        ),
+        PromptInfo(
+            name="CFO",
+            description="Good for overseeing all financial activities, including financial planning, cash flow management, accounting, reporting, and risk management.",
+            prompt_template="""You're the Chief Financial Officer (CFO) of the company. You oversee all financial activities, including financial planning, cash flow management, accounting, reporting, and risk management.
+Your job is keeping the company financially profitable while ensuring growth.
+Human: {input}""",
+        ),
+        PromptInfo(
+            name="COO",
+            description="Good for overseeing day-to-day business operations and corporate strategy implementation.",
+            prompt_template="""You're the Chief Operating Officer (COO) of the company. You oversee the day-to-day business operations and corporate strategy implementation.
+Your job is ensuring the company operates efficiently and effectively by having a good strategy and culture.
+Human: {input}""",
+        ),
+    ]
+    return prompts
+
+
+def create_multi_prompt_chain(
+    config: AdvisorConfig, verbose: bool = True
+) -> MultiPromptChain:
+    """
+    Create a MultiPromptChain using the provided configuration.
+
+    Args:
+        config (AdvisorConfig): The configuration for the advisor.
+        verbose (bool): Print the chain's intermediate steps.
+
+    Returns:
+        MultiPromptChain: A configured MultiPromptChain object.
+    """
+    llm = get_llm(config.model_id)
+    return MultiPromptChain.from_prompts(
+        llm,
+        prompt_infos=[prompt_info.model_dump() for prompt_info in config.prompt_infos],
+        verbose=verbose,
+    )
+
+
+def decompose_project(
+    project: str, model_id: str, callbacks: Optional[list] = None
+) -> str:
+    """
+    Decompose the chosen project into smaller, manageable tasks.
+
+    Args:
+        project (str): The chosen project to decompose.
+        model_id (str): The model ID to use for the LLM.
+        callbacks (Optional[list]): LangChain callbacks for the run, e.g. StreamingEcho.
+
+    Returns:
+        str: A detailed breakdown of the project into smaller tasks.
+    """
+    llm = get_llm(model_id)
+
+    decomposer_template = """
+    You are a project decomposition specialist. Your task is to break down the following AI project into smaller, manageable tasks:
+
+    Project: {project}
+
+    Please provide a detailed breakdown of this project into:
+    1. Main phases
+    2. Specific tasks within each phase
+    3. Estimated time for each task
+    4. Dependencies between tasks
+
+    Your decomposition:
+    """
+
+    decomposer_prompt = PromptTemplate(
+        input_variables=["project"], template=decomposer_template
+    )
+
+    decomposer_chain = LLMChain(llm=llm, prompt=decomposer_prompt)
+    return decomposer_chain.run(project=project, callbacks=callbacks)
+
+
+def assess_project(
+    project: str, decomposition: str, model_id: str, callbacks: Optional[list] = None
+) -> str:
+    """
+    Assess the feasibility and potential challenges of the project.
+
+    Args:
+        project (str): The chosen project to assess.
+        decomposition (str): The project decomposition.
+        model_id (str): The model ID to use for the LLM.
+        callbacks (Optional[list]): LangChain callbacks for the run, e.g. StreamingEcho.
+
+    Returns:
+        str: An assessment of the project's feasibility and potential challenges.
+    """
+    llm = get_llm(model_id)
+
+    assessor_template = """
+    You are a project assessment specialist. Your task is to evaluate the feasibility and potential challenges of the following AI project:
+
+    Project: {project}
+
+    Project Decomposition:
+    {decomposition}
+
+    Please provide an assessment that includes:
+    1. Overall feasibility of the project
+    2. Potential technical challenges
+    3. Resource requirements (personnel, technology, time)
+    4. Risks and mitigation strategies
+    5. Recommendations for successful implementation
+
+    Your assessment:
+    """
+
+    assessor_prompt = PromptTemplate(
+        input_variables=["project", "decomposition"], template=assessor_template
+    )
+
+    assessor_chain = LLMChain(llm=llm, prompt=assessor_prompt)
+    return assessor_chain.run(
+        project=project, decomposition=decomposition, callbacks=callbacks
+    )
+
+
+def coordinate_project(
+    project: str,
+    decomposition: str,
+    assessment: str,
+    model_id: str,
+    teams: Optional[List[str]] = None,
+    max_concurrency: int = 4,
+    quiet: bool = False,
+) -> Dict[str, object]:
+    """
+    Coordinate the project implementation across different teams.
+
+    Teams are independent, so their chain runs share a pool of ``max_concurrency``
+    threads. Each plan streams to the terminal while it is the first unfinished
+    team; later teams are buffered, so plans appear in team order. A team whose
+    call fails gets its error printed without stopping the others.
+
+    Args:
+        project (str): The chosen project to implement.
+        decomposition (str): The project decomposition.
+        assessment (str): The project assessment.
+        model_id (str): The model ID to use for the LLM.
+        teams (Optional[List[str]]): The teams to plan for; defaults to DEFAULT_TEAMS.
+        max_concurrency (int): The maximum number of concurrent model calls.
+        quiet (bool): Print nothing, for batch runs.
+
+    Returns:
+        Dict[str, object]: Each team's guidelines, or the exception its call raised.
+    """
+    llm = get_llm(model_id)
+    teams = teams or DEFAULT_TEAMS
+
+    coordinator_template = """
+    You are the project coordinator for an AI implementation project. The chosen project is: {project}
+
+    Project Decomposition:
+    {decomposition}
+
+    Project Assessment:
+    {assessment}
+
+    You need to provide specific tasks and guidelines for the {team} team.
+
+    Please outline the key responsibilities, tasks, and considerations for the {team} team in implementing this AI project.
+    Be specific and provide actionable items, considering the project decomposition and assessment.
+
+    {team} team tasks and guidelines:
+    """
+
+    coordinator_prompt = PromptTemplate(
+        input_variables=["project", "decomposition", "assessment", "team"],
+        template=coordinator_template,
+    )
+
+    coordinator_chain = LLMChain(llm=llm, prompt=coordinator_prompt)
+
+    if quiet:
+        streams = OrderedStreams(teams, write=lambda text: None)
+    else:
+        click.echo("\nProject Coordination Plan:")
+        streams = OrderedStreams(teams)
+
+    def plan(team: str):
+        handler = StreamingEcho(streams.writer(team))
+        try:
+            result = coordinator_chain.run(
+                project=project,
+                decomposition=decomposition,
+                assessment=assessment,
+                team=team,
+                callbacks=[handler],
+            )
+        except Exception as e:
+            streams.finish(team, f"Failed: {e}\n")
+            return e
+        text = "" if handler.streamed else result.strip()
+        streams.finish(team, f"{text}\n{handler.timing()}\n")
+        return result
+
+    with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as executor:
+        return dict(zip(teams, executor.map(plan, teams)))
+
+
+def suggested_projects(answer: str) -> List[str]:
+    """
+    Split the advisors' answer into the suggested projects, one per non-empty line.
+
+    Args:
+        answer (str): The routed answer to the question.
+
+    Returns:
+        List[str]: The suggested projects.
+    """
+    return [line.strip() for line in answer.split("\n") if line.strip()]
+
+
+def choose_project(projects: List[str], choice: Union[int, str, None]) -> str:
+    """
+    Pick the project to implement from a batch item's choice.
+
+    Args:
+        projects (List[str]): The suggested projects.
+        choice (Union[int, str, None]): A 1-based project number, a project
+            description to use as is, or None for the first suggestion.
+
+    Returns:
+        str: The chosen project.
+    """
+    if isinstance(choice, str):
+        return choice
+    index = (choice or 1) - 1
+    if not 0 <= index < len(projects):
+        raise ValueError(
+            f"Project {choice} is not one of the {len(projects)} suggested projects"
+        )
+    return projects[index]
+
+
+def advise(
+    question: str, config: AdvisorConfig, project: Union[int, str, None] = None
+) -> Dict[str, object]:
+    """
+    Run the whole pipeline for one question without prompting or printing.
+
+    Args:
+        question (str): The question to ask the advisors.
+        config (AdvisorConfig): The configuration for the advisor.
+        project (Union[int, str, None]): The project choice, as for choose_project.
+
+    Returns:
+        Dict[str, object]: The report, with the seconds spent in each stage under
+        "latency". If a stage fails, the report so far with "error" and the
+        failed "stage".
+    """
+    report: Dict[str, object] = {"question": question}
+    latency: Dict[str, float] = {}
+    report["latency"] = latency
+    started = time.perf_counter()
+    stage = "route"
+
+    def timed(name, run):
+        nonlocal stage
+        stage = name
+        stage_started = time.perf_counter()
+        result = run()
+        latency[name] = round(time.perf_counter() - stage_started, 3)
+        return result
+
+    model = config.model_id
+    try:
+        mpc = create_multi_prompt_chain(config, verbose=False)
+        report["answer"] = timed("route", lambda: mpc.run(input=question))
+        report["projects"] = suggested_projects(report["answer"])
+        stage = "choose"
+        chosen = report["project"] = choose_project(report["projects"], project)
+        report["decomposition"] = timed(
+            "decompose", lambda: decompose_project(chosen, model)
+        )
+        report["assessment"] = timed(
+            "assess", lambda: assess_project(chosen, report["decomposition"], model)
+        )
+        teams = timed(
+            "coordinate",
+            lambda: coordinate_project(
+                chosen,
+                report["decomposition"],
+                report["assessment"],
+                model,
+                teams=config.teams,
+                max_concurrency=config.max_concurrency,
+                quiet=True,
+            ),
+        )
+        report["teams"] = {
+            team: (
+                {"error": str(result)}
+                if isinstance(result, Exception)
+                else result.strip()
+            )
+            for team, result in teams.items()
+        }
+    except Exception as e:
+        report["error"] = str(e)
+        report["stage"] = stage
+    latency["total"] = round(time.perf_counter() - started, 3)
+    return report
+
+
+def run_batch(
+    items: Iterable[dict],
+    config: AdvisorConfig,
+    output: IO[str],
+    max_questions: int = 4,
+) -> int:
+    """
+    Advise on many questions concurrently, writing one JSONL report per question.
+
+    Items are ``{"question": ..., "project": ...}`` objects, where the optional
+    project is as for choose_project. Up to ``max_questions`` questions run at
+    once, each with ``config.max_concurrency`` team calls. Reports are written
+    and flushed as soon as they finish, so they may be out of input order;
+    each carries the item's 0-based "index".
+
+    Args:
+        items (Iterable[dict]): The questions to advise on.
+        config (AdvisorConfig): The configuration for the advisor.
+        output (IO[str]): Where to write the JSONL reports.
+        max_questions (int): The maximum number of questions in flight.
+
+    Returns:
+        int: The number of reports that contain an error.
+    """
+    failures = 0
+    with ThreadPoolExecutor(max_workers=max(1, max_questions)) as executor:
+        futures = {
+            executor.submit(advise, item["question"], config, item.get("project")): i
+            for i, item in enumerate(items)
+        }
+        for future in as_completed(futures):
+            report = {"index": futures[future], **future.result()}
+            failures += "error" in report
+            output.write(json.dumps(report, ensure_ascii=False) + "\n")
+            output.flush()
+    return failures
+
+
+class ProjectSpeculation:
+    """
+    Decompose and assess the top suggested projects while the user is choosing.
+
+    Each of the first ``top_k`` projects is prepared on its own thread. Taking the
+    chosen project discards the others: one still decomposing skips its
+    assessment, so it makes no further model calls.
+    """
+
+    def __init__(self, projects: List[str], model_id: str, top_k: int):
+        self.model_id = model_id
+        self.executor = ThreadPoolExecutor(max_workers=max(1, top_k))
+        self.futures: Dict[str, Future] = {}
+        self.discarded: Dict[str, threading.Event] = {}
+        for project in projects[:top_k]:
+            if project not in self.futures:
+                self.discarded[project] = threading.Event()
+                self.futures[project] = self.executor.submit(self._prepare, project)
+
+    def _prepare(self, project: str):
+        decomposition = decompose_project(project, self.model_id)
+        if self.discarded[project].is_set():
+            return None
+        return decomposition, assess_project(project, decomposition, self.model_id)
+
+    def take(self, project: str) -> Optional[Future]:
+        """
+        Return the preparation of the chosen project and discard the rest.
+
+        Args:
+            project (str): The chosen project.
+
+        Returns:
+            Optional[Future]: The future of ``(decomposition, assessment)``, or
+            None if the project was not speculated on.
+        """
+        future = self.futures.pop(project, None)
+        for other, other_future in self.futures.items():
+            self.discarded[other].set()
+            other_future.cancel()
+        self.futures.clear()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        return future
+
+
+def run_advisor(question: str, config: AdvisorConfig):
+    """
+    Run the advisor pipeline for a question, prompting for the project to implement.
+
+    Args:
+        question (str): The question to ask the advisors.
+        config (AdvisorConfig): The configuration for the advisor.
+    """
+    model = config.model_id
+    mpc = create_multi_prompt_chain(config)
+
+    result = run_stage(lambda callbacks: mpc.run(input=question, callbacks=callbacks))
+
+    projects = suggested_projects(result)
+
+    click.echo("\nSuggested projects:")
+    for i, project in enumerate(projects, 1):
+        click.echo(f"{i}. {project}")
+
+    speculation = (
+        ProjectSpeculation(projects, model, config.speculate)
+        if config.speculate
+        else None
+    )
+    project_choice = click.prompt(
+        "Choose a project number to implement", type=int, default=1
+    )
+    chosen_project = projects[project_choice - 1]
+
+    click.echo(f"\nYou've chosen to implement: {chosen_project}")
+
+    prepared = speculation.take(chosen_project) if speculation else None
+    if prepared is not None:
+        chosen_at = time.perf_counter()
+        try:
+            decomposition, assessment = prepared.result()
+        except Exception as e:
+            click.echo(f"\nSpeculative preparation failed ({e}); running it again.")
+            prepared = None
+    if prepared is not None:
+        waited = f"[prepared in the background, waited {time.perf_counter() - chosen_at:.2f}s]"
+        click.echo("\nDecomposing the project...")
+        click.echo(f"{decomposition.strip()}\n{waited}")
+        click.echo("\nAssessing the project...")
+        click.echo(f"{assessment.strip()}\n{waited}")
+    else:
+        click.echo("\nDecomposing the project...")
+        decomposition = run_stage(
+            lambda callbacks: decompose_project(chosen_project, model, callbacks)
+        )
+
+        click.echo("\nAssessing the project...")
+        assessment = run_stage(
+            lambda callbacks: assess_project(
+                chosen_project, decomposition, model, callbacks
+            )
+        )
+
+    coordinate_project(
+        chosen_project,
+        decomposition,
+        assessment,
+        model,
+        teams=config.teams,
+        max_concurrency=config.max_concurrency,
+    )
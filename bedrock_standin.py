@@ -0,0 +1,1362 @@
+"""
+Offline stand-in for the Bedrock, Lambda and IAM APIs used in this repository.
+
+The stand-in keeps prompts, flows, versions, aliases and roles in memory and
+answers with deterministic canned completions, so deploys, flow runs and load
+tests need no AWS account. Latency, throttling and errors are injected per
+operation from a StandinConfig.
+
+Clients are plugged in either in process:
+
+    standin = BedrockStandin()
+    runtime = standin.client("bedrock-agent-runtime")
+
+or over HTTP, by pointing boto3's endpoint URLs at a running server:
+
+    python bedrock_standin.py --port 8765 --config standin.json
+
+which prints the AWS_ENDPOINT_URL_* variables to export before running the
+numbered scripts or evaluate_prompts_at_scale.py.
+"""
+
+import base64
+import binascii
+import functools
+import hashlib
+import json
+import math
+import random
+import re
+import struct
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from typing import Callable, Dict, List, Literal, Optional
+from urllib.parse import parse_qs, unquote, urlsplit
+from xml.sax.saxutils import escape
+
+import boto3
+import botocore
+import botocore.session
+import click
+from botocore.awsrequest import AWSResponse
+from pydantic import BaseModel, ValidationError
+
+from flow_simulator.deployment import from_bedrock_definition
+from flow_simulator.rate_limiter import estimate_tokens
+
+SERVICES = (
+    "bedrock-agent",
+    "bedrock-agent-runtime",
+    "bedrock-runtime",
+    "lambda",
+    "iam",
+)
+CONTROL_PLANE = ("bedrock-agent", "iam")
+DRAFT = "DRAFT"
+DRAFT_ALIAS = "TSTALIASID"
+DEFAULT_MODEL = "anthropic.claude-v2"
+CREDENTIALS = {"aws_access_key_id": "standin", "aws_secret_access_key": "standin"}
+IAM_NAMESPACE = "https://iam.amazonaws.com/doc/2010-05-08/"
+
+ERROR_STATUS = {
+    "ValidationException": 400,
+    "AccessDeniedException": 403,
+    "ResourceNotFoundException": 404,
+    "ConflictException": 409,
+    "ThrottlingException": 429,
+    "TooManyRequestsException": 429,
+    "InternalServerException": 500,
+    "ServiceException": 500,
+    "ServiceUnavailableException": 503,
+    # IAM
+    "Throttling": 400,
+    "NoSuchEntity": 404,
+    "EntityAlreadyExists": 409,
+    "DeleteConflict": 409,
+}
+THROTTLING_CODES = {"lambda": "TooManyRequestsException", "iam": "Throttling"}
+
+_TEMPLATE_VARIABLE = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+
+class Latency(BaseModel):
+    """Seconds before a response: ``constant`` waits ``seconds``, ``uniform``
+    draws from ``[low, high]`` and ``lognormal`` has median ``seconds`` and
+    shape ``sigma``."""
+
+    distribution: Literal["constant", "uniform", "lognormal"] = "constant"
+    seconds: float = 0.0
+    low: float = 0.0
+    high: float = 0.0
+    sigma: float = 0.5
+
+    def sample(self, rng: random.Random) -> float:
+        if self.distribution == "uniform":
+            return rng.uniform(self.low, self.high)
+        if self.distribution == "lognormal":
+            return self.seconds * math.exp(rng.gauss(0.0, self.sigma))
+        return self.seconds
+
+
+class Faults(BaseModel):
+    latency: Latency = Latency()
+    throttleRate: float = 0.0
+    errorRate: float = 0.0
+    errorCode: str = "InternalServerException"
+    # Calls beyond this many in flight are throttled, like a service quota.
+    maxConcurrency: Optional[int] = None
+
+
+class CannedCompletion(BaseModel):
+    pattern: str
+    text: str
+
+
+class StandinConfig(BaseModel):
+    region: str = "us-east-1"
+    accountId: str = "123456789012"
+    seed: int = 0
+    # Reject flows, prompts and functions that were not created first,
+    # instead of answering for them.
+    strict: bool = False
+    prepareSeconds: float = 0.0
+    default: Faults = Faults()
+    # Keyed by operation ("InvokeFlow") or service and operation
+    # ("bedrock-runtime:InvokeModel").
+    operations: Dict[str, Faults] = {}
+    # Checked in order against every prompt before the built-in answers.
+    completions: List[CannedCompletion] = []
+
+    def faults(self, service: str, operation: str) -> Faults:
+        return (
+            self.operations.get(f"{service}:{operation}")
+            or self.operations.get(operation)
+            or self.default
+        )
+
+
+class StandinError(Exception):
+    def __init__(self, code: str, message: str):
+        super().__init__(f"{code}: {message}")
+        self.code = code
+        self.message = message
+        self.status = ERROR_STATUS.get(code, 400)
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, bytes):
+        return base64.b64encode(value).decode("ascii")
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _dumps(value) -> bytes:
+    return json.dumps(value, default=_json_default).encode("utf-8")
+
+
+def _text(value) -> str:
+    return value if isinstance(value, str) else json.dumps(value)
+
+
+def _resource_id(identifier: str) -> str:
+    """The id in an id or ARN, e.g. ``ABC`` for ``arn:...:flow/ABC``."""
+    return identifier.rsplit("/", 1)[-1]
+
+
+def _prompt_ref(identifier: str):
+    """``(id, version)`` for a prompt id or ARN, with version None for the draft."""
+    prompt_id, _, version = _resource_id(identifier).partition(":")
+    return prompt_id, version or None
+
+
+def _function_name(identifier: str) -> str:
+    if identifier.startswith("arn:"):
+        return identifier.split(":")[6]
+    return identifier.split(":")[0]
+
+
+def _echo(event):
+    return {"output": event.get("input")}
+
+
+def _model_family(model_id: str) -> str:
+    parts = model_id.split(".")
+    return next((p for p in parts if p in ("anthropic", "amazon", "meta")), "")
+
+
+def encode_event(event_type: str, payload: bytes) -> bytes:
+    """One ``application/vnd.amazon.eventstream`` message."""
+    headers = b""
+    for name, value in (
+        (":event-type", event_type),
+        (":content-type", "application/json"),
+        (":message-type", "event"),
+    ):
+        name, value = name.encode(), value.encode()
+        headers += struct.pack("!B", len(name)) + name
+        headers += struct.pack("!BH", 7, len(value)) + value
+    prelude = struct.pack("!II", 12 + len(headers) + len(payload) + 4, len(headers))
+    message = prelude + struct.pack("!I", binascii.crc32(prelude)) + headers + payload
+    return message + struct.pack("!I", binascii.crc32(message))
+
+
+@functools.lru_cache(maxsize=None)
+def _uri_pattern(request_uri: str):
+    parts = re.split(r"\{(\w+)(\+?)\}", request_uri.split("?")[0].rstrip("/"))
+    pattern = re.escape(parts[0])
+    for i in range(1, len(parts), 3):
+        name, greedy, literal = parts[i : i + 3]
+        pattern += f"(?P<{name}>{'.+' if greedy else '[^/]+'})" + re.escape(literal)
+    return re.compile(pattern + "/?$")
+
+
+def _scalar(shape, text: str):
+    if shape.type_name in ("integer", "long"):
+        return int(text)
+    if shape.type_name in ("float", "double"):
+        return float(text)
+    if shape.type_name == "boolean":
+        return text.lower() == "true"
+    return text
+
+
+def parse_request(operation, path: str, query: dict, headers, body: bytes) -> dict:
+    """Parameters of a rest-json or query request, keyed by member name."""
+    shape = operation.input_shape
+    if shape is None:
+        return {}
+    if operation.metadata["protocol"] == "query":
+        form = parse_qs(body.decode("utf-8"))
+        return {
+            name: _scalar(member, form[name][0])
+            for name, member in shape.members.items()
+            if name in form
+        }
+
+    match = _uri_pattern(operation.http["requestUri"]).match(path)
+    labels = match.groupdict() if match else {}
+    payload = shape.serialization.get("payload")
+    document = json.loads(body) if body and payload is None else {}
+    params = {}
+    for name, member in shape.members.items():
+        location = member.serialization.get("location")
+        wire_name = member.serialization.get("name", name)
+        if location == "uri" and wire_name in labels:
+            params[name] = unquote(labels[wire_name])
+        elif location == "querystring" and wire_name in query:
+            params[name] = _scalar(member, query[wire_name][0])
+        elif location == "header" and wire_name in headers:
+            params[name] = _scalar(member, headers[wire_name])
+        elif name == payload and body:
+            params[name] = body if member.type_name == "blob" else json.loads(body)
+        elif location is None and name in document:
+            params[name] = document[name]
+    return params
+
+
+def _xml(shape, value) -> str:
+    if shape.type_name == "structure":
+        return "".join(
+            f"<{name}>{_xml(member, value[name])}</{name}>"
+            for name, member in shape.members.items()
+            if name in value
+        )
+    if shape.type_name == "list":
+        return "".join(f"<member>{_xml(shape.member, item)}</member>" for item in value)
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return escape(str(value))
+
+
+def serialize_response(operation, output: dict):
+    """``(status, headers, body)`` for an operation's output.
+
+    Event stream members are given as a list of ``(event type, event)``.
+    """
+    shape = operation.output_shape
+    if operation.metadata["protocol"] == "query":
+        name = operation.name
+        result = ""
+        if shape is not None:
+            wrapper = shape.serialization["resultWrapper"]
+            result = f"<{wrapper}>{_xml(shape, output)}</{wrapper}>"
+        body = (
+            f'<{name}Response xmlns="{IAM_NAMESPACE}">{result}<ResponseMetadata>'
+            f"<RequestId>standin</RequestId></ResponseMetadata></{name}Response>"
+        )
+        return 200, {"Content-Type": "text/xml"}, body.encode("utf-8")
+
+    status = operation.http.get("responseCode", 200)
+    headers = {"Content-Type": "application/json"}
+    payload = shape.serialization.get("payload") if shape else None
+    body, document = b"", {}
+    for name, member in shape.members.items() if shape else ():
+        if name not in output:
+            continue
+        value = output[name]
+        location = member.serialization.get("location")
+        if location == "header":
+            headers[member.serialization.get("name", name)] = str(value)
+        elif location == "statusCode":
+            status = value
+        elif name != payload:
+            document[name] = value
+        elif member.type_name == "blob":
+            body = value
+        elif member.serialization.get("eventstream"):
+            headers["Content-Type"] = "application/vnd.amazon.eventstream"
+            body = b"".join(encode_event(kind, _dumps(event)) for kind, event in value)
+        else:
+            body = _dumps(value)
+    if payload is None:
+        body = _dumps(document)
+    return status, headers, body
+
+
+def serialize_error(service_model, error: StandinError):
+    if service_model.protocol == "query":
+        body = (
+            f'<ErrorResponse xmlns="{IAM_NAMESPACE}"><Error><Type>Sender</Type>'
+            f"<Code>{error.code}</Code><Message>{escape(error.message)}</Message>"
+            "</Error><RequestId>standin</RequestId></ErrorResponse>"
+        )
+        return error.status, {"Content-Type": "text/xml"}, body.encode("utf-8")
+    headers = {"Content-Type": "application/json", "x-amzn-ErrorType": error.code}
+    return error.status, headers, _dumps({"message": error.message})
+
+
+def _unsigned(**kwargs):
+    return botocore.UNSIGNED
+
+
+class _Body(BytesIO):
+    """Raw response body with the ``stream`` method botocore reads event streams from."""
+
+    def stream(self, amt=1024, decode_content=None):
+        while True:
+            chunk = self.read(amt)
+            if not chunk:
+                return
+            yield chunk
+
+
+def _verdict(prompt: str, output: str, digest: bytes) -> dict:
+    return {
+        "answer-score": 50 + digest[0] % 51,
+        "prompt-score": 50 + digest[1] % 51,
+        "justification": "Canned evaluation from the Bedrock stand-in.",
+        "input": prompt,
+        "output": output,
+        "prompt-recommendations": "Canned recommendation from the Bedrock stand-in.",
+    }
+
+
+def _tagged(text: str, tag: str) -> str:
+    match = re.search(rf"<{tag}>\n(.*?)\n</{tag}>", text, re.DOTALL)
+    return match.group(1) if match else ""
+
+
+def _request_prompt(request: dict) -> str:
+    texts = [request["system"]] if isinstance(request.get("system"), str) else []
+    for message in request.get("messages", []):
+        content = message.get("content", "")
+        if isinstance(content, str):
+            texts.append(content)
+        else:
+            texts.extend(block.get("text", "") for block in content)
+    if request.get("messages"):
+        return "\n".join(texts)
+    return request.get("prompt") or request.get("inputText") or ""
+
+
+def _model_response(model_id: str, request: dict, prompt: str, text: str) -> dict:
+    tokens_in, tokens_out = estimate_tokens(prompt), estimate_tokens(text)
+    family = _model_family(model_id)
+    if "messages" in request:
+        return {
+            "id": "msg_standin",
+            "type": "message",
+            "role": "assistant",
+            "model": model_id,
+            "content": [{"type": "text", "text": text}],
+            "stop_reason": "end_turn",
+            "usage": {"input_tokens": tokens_in, "output_tokens": tokens_out},
+        }
+    if family == "amazon":
+        return {
+            "inputTextTokenCount": tokens_in,
+            "results": [
+                {
+                    "tokenCount": tokens_out,
+                    "outputText": text,
+                    "completionReason": "FINISH",
+                }
+            ],
+        }
+    if family == "meta":
+        return {
+            "generation": text,
+            "prompt_token_count": tokens_in,
+            "generation_token_count": tokens_out,
+            "stop_reason": "stop",
+        }
+    return {"completion": text, "stop_reason": "stop_sequence"}
+
+
+def _stream_chunk(model_id: str, request: dict, piece: str) -> dict:
+    if "messages" in request:
+        return {
+            "type": "content_block_delta",
+            "index": 0,
+            "delta": {"type": "text_delta", "text": piece},
+        }
+    family = _model_family(model_id)
+    if family == "amazon":
+        return {"outputText": piece, "index": 0}
+    if family == "meta":
+        return {"generation": piece}
+    return {"completion": piece}
+
+
+def _page(items: list, params: dict, key: str) -> dict:
+    start = int(params.get("nextToken") or 0)
+    end = start + (params.get("maxResults") or 100)
+    page = {key: items[start:end]}
+    if end < len(items):
+        page["nextToken"] = str(end)
+    return page
+
+
+class BedrockStandin:
+    """In-memory backend for the bedrock-agent, bedrock-agent-runtime,
+    bedrock-runtime, lambda and iam operations this repository calls.
+
+    Requests arrive already serialized by botocore, either from a client
+    hooked with ``attach``/``client`` or over HTTP from ``start_server``, and
+    are answered in the wire format botocore parses, so retries, event
+    streams and error codes behave as they do against AWS.
+
+    Every operation first passes through the faults configured for it:
+    a throttle or concurrency check, then the sampled latency, then an
+    injected error. ``counts`` tallies calls per ``service:Operation`` and
+    failures per ``service:Operation:Code``. Prompt nodes in flows render
+    their templates with the node inputs and answer with ``completion``;
+    ``functions`` maps Lambda function names to callables taking and
+    returning the JSON payload, and unknown functions echo ``{"output":
+    input}``.
+    """
+
+    def __init__(
+        self,
+        config: Optional[StandinConfig] = None,
+        functions: Optional[Dict[str, Callable[[dict], dict]]] = None,
+        sleep: Callable[[float], None] = time.sleep,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.config = config or StandinConfig()
+        self.functions = dict(functions or {})
+        self.sleep = sleep
+        self.clock = clock
+        self.counts = Counter()
+        self.prompts: Dict[str, dict] = {}
+        self.flows: Dict[str, dict] = {}
+        self.roles: Dict[str, dict] = {}
+        self._rng = random.Random(self.config.seed)
+        self._next_id = 0
+        self._inflight = Counter()
+        self._lock = threading.Lock()
+        self._state_lock = threading.RLock()
+        self._session = botocore.session.get_session()
+        self._models = {}
+        self._handlers = {
+            key: getattr(self, method) for key, method in OPERATIONS.items()
+        }
+
+    def service_model(self, service: str):
+        with self._lock:
+            if service not in self._models:
+                self._models[service] = self._session.get_service_model(service)
+            return self._models[service]
+
+    # Plumbing
+
+    def client(self, service_name: str, region_name: Optional[str] = None, **kwargs):
+        """A boto3 client whose requests are answered in process."""
+        client = boto3.client(
+            service_name,
+            region_name=region_name or self.config.region,
+            **{**CREDENTIALS, **kwargs},
+        )
+        return self.attach(client)
+
+    def attach(self, client):
+        """Answer ``client``'s requests in process instead of sending them."""
+        service = client.meta.service_model.service_id.hyphenize()
+        client.meta.events.register(f"choose-signer.{service}", _unsigned)
+        client.meta.events.register(
+            f"before-send.{service}", functools.partial(self._send, service)
+        )
+        return client
+
+    def _send(self, service, request, event_name, **kwargs):
+        url = urlsplit(request.url)
+        body = request.body
+        if hasattr(body, "read"):
+            body = body.read()
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        status, headers, payload = self.handle(
+            service,
+            event_name.rsplit(".", 1)[-1],
+            url.path,
+            parse_qs(url.query),
+            request.headers,
+            body or b"",
+        )
+        return AWSResponse(request.url, status, headers, _Body(payload))
+
+    def route(self, service: str, method: str, path: str, query: dict, body: bytes):
+        """The operation an HTTP request is for, or None."""
+        service_model = self.service_model(service)
+        if service_model.protocol == "query":
+            form = parse_qs(body.decode("utf-8"))
+            return (form.get("Action") or query.get("Action") or [None])[0]
+        for known_service, name in OPERATIONS:
+            if known_service != service:
+                continue
+            operation = service_model.operation_model(name)
+            if operation.http["method"] == method and _uri_pattern(
+                operation.http["requestUri"]
+            ).match(path):
+                return name
+        return None
+
+    def handle(self, service, operation_name, path, query, headers, body):
+        """Answer one request with ``(status, headers, body)``."""
+        service_model = self.service_model(service)
+        try:
+            handler = self._handlers.get((service, operation_name))
+            if handler is None:
+                raise StandinError(
+                    "ValidationException", f"{operation_name} is not simulated"
+                )
+            operation = service_model.operation_model(operation_name)
+            params = parse_request(operation, path, query, headers, body)
+            with self._admitted(service, operation_name):
+                lock = self._state_lock if service in CONTROL_PLANE else nullcontext()
+                with lock:
+                    output = handler(params)
+            return serialize_response(operation, output)
+        except StandinError as e:
+            self.counts[f"{service}:{operation_name}:{e.code}"] += 1
+            return serialize_error(service_model, e)
+        except Exception as e:
+            error = StandinError("InternalServerException", repr(e))
+            self.counts[f"{service}:{operation_name}:{error.code}"] += 1
+            return serialize_error(service_model, error)
+
+    @contextmanager
+    def _admitted(self, service: str, operation: str):
+        key = f"{service}:{operation}"
+        faults = self.config.faults(service, operation)
+        with self._lock:
+            self.counts[key] += 1
+            busy = (
+                faults.maxConcurrency is not None
+                and self._inflight[key] >= faults.maxConcurrency
+            )
+            throttled = busy or self._rng.random() < faults.throttleRate
+            failed = self._rng.random() < faults.errorRate
+            delay = faults.latency.sample(self._rng)
+            if not throttled:
+                self._inflight[key] += 1
+        if throttled:
+            raise StandinError(
+                THROTTLING_CODES.get(service, "ThrottlingException"), "Rate exceeded"
+            )
+        try:
+            self.sleep(max(0.0, delay))
+            if failed:
+                raise StandinError(faults.errorCode, f"Injected {faults.errorCode}")
+            yield
+        finally:
+            with self._lock:
+                self._inflight[key] -= 1
+
+    def _new_id(self) -> str:
+        with self._lock:
+            self._next_id += 1
+            seed = f"{self.config.seed}:{self._next_id}".encode()
+        return base64.b32encode(hashlib.sha256(seed).digest())[:10].decode()
+
+    def _arn(self, resource: str) -> str:
+        return (
+            f"arn:aws:bedrock:{self.config.region}:{self.config.accountId}:{resource}"
+        )
+
+    # Canned answers
+
+    def completion(self, model_id: str, prompt: str) -> str:
+        """Deterministic completion of ``prompt`` by ``model_id``.
+
+        The first configured completion whose pattern matches wins; the
+        evaluator prompt (it asks for a ``prompt-score``) gets a judge verdict
+        for its ``<input>`` and ``<output>``; anything else gets a canned
+        answer derived from a hash of the model and prompt.
+        """
+        for canned in self.config.completions:
+            if re.search(canned.pattern, prompt):
+                return canned.text
+        digest = hashlib.sha256(f"{model_id}\0{prompt}".encode("utf-8")).digest()
+        if "prompt-score" in prompt:
+            verdict = _verdict(
+                _tagged(prompt, "input"), _tagged(prompt, "output"), digest
+            )
+            return json.dumps(verdict)
+        return (
+            f"Canned answer {digest.hex()[:12]} from {model_id} "
+            f"to a {len(prompt.split())}-word prompt."
+        )
+
+    def retrieval_results(self, knowledge_base_id: str, query: str, count: int):
+        digest = hashlib.sha256(f"{knowledge_base_id}\0{query}".encode()).hexdigest()
+        return [
+            {
+                "content": {"text": f"Passage {i + 1} about: {query}"},
+                "location": {
+                    "type": "S3",
+                    "s3Location": {"uri": f"s3://standin/{digest[:12]}/{i + 1}.txt"},
+                },
+                "score": round(0.9 - 0.05 * i, 2),
+            }
+            for i in range(count)
+        ]
+
+    def call_function(self, identifier: str, event: dict) -> dict:
+        name = _function_name(identifier)
+        function = self.functions.get(name)
+        if function is None:
+            if self.config.strict:
+                raise StandinError(
+                    "ResourceNotFoundException", f"Function not found: {name}"
+                )
+            function = _echo
+        return function(event)
+
+    # bedrock-agent: prompts
+
+    def _prompt(self, identifier: str, version: Optional[str] = None):
+        prompt_id, arn_version = _prompt_ref(identifier)
+        prompt = self.prompts.get(prompt_id)
+        version = version or arn_version or DRAFT
+        if prompt is None or version not in prompt["versions"]:
+            raise StandinError(
+                "ResourceNotFoundException", f"Prompt {identifier} not found"
+            )
+        return prompt, version
+
+    def _prompt_view(self, prompt: dict, version: str) -> dict:
+        arn = prompt["arn"] if version == DRAFT else f"{prompt['arn']}:{version}"
+        return {
+            **prompt["versions"][version],
+            "id": prompt["id"],
+            "arn": arn,
+            "version": version,
+        }
+
+    def _create_prompt(self, params):
+        if any(
+            p["versions"][DRAFT]["name"] == params["name"]
+            for p in self.prompts.values()
+        ):
+            raise StandinError("ConflictException", f"Prompt {params['name']} exists")
+        prompt_id = self._new_id()
+        now = _now()
+        self.prompts[prompt_id] = {
+            "id": prompt_id,
+            "arn": self._arn(f"prompt/{prompt_id}"),
+            "versions": {
+                DRAFT: {
+                    "name": params["name"],
+                    "description": params.get("description", ""),
+                    "variants": params.get("variants", []),
+                    "defaultVariant": params.get("defaultVariant"),
+                    "createdAt": now,
+                    "updatedAt": now,
+                }
+            },
+        }
+        return self._prompt_view(self.prompts[prompt_id], DRAFT)
+
+    def _get_prompt(self, params):
+        prompt, version = self._prompt(
+            params["promptIdentifier"], params.get("promptVersion")
+        )
+        return self._prompt_view(prompt, version)
+
+    def _list_prompts(self, params):
+        if params.get("promptIdentifier"):
+            prompt, _ = self._prompt(params["promptIdentifier"])
+            views = [self._prompt_view(prompt, v) for v in prompt["versions"]]
+        else:
+            views = [self._prompt_view(p, DRAFT) for p in self.prompts.values()]
+        keys = ("name", "description", "id", "arn", "version", "createdAt", "updatedAt")
+        summaries = [{key: view[key] for key in keys} for view in views]
+        return _page(summaries, params, "promptSummaries")
+
+    def _create_prompt_version(self, params):
+        prompt, _ = self._prompt(params["promptIdentifier"])
+        version = str(len(prompt["versions"]))
+        prompt["versions"][version] = {**prompt["versions"][DRAFT], "createdAt": _now()}
+        return self._prompt_view(prompt, version)
+
+    def _delete_prompt(self, params):
+        prompt, version = self._prompt(
+            params["promptIdentifier"], params.get("promptVersion")
+        )
+        if version == DRAFT:
+            del self.prompts[prompt["id"]]
+            return {"id": prompt["id"]}
+        del prompt["versions"][version]
+        return {"id": prompt["id"], "version": version}
+
+    def _prompt_template(self, prompt_config: dict):
+        """``(model id, template text)`` for a Prompt node's configuration."""
+        source = prompt_config.get("sourceConfiguration", {})
+        if "inline" in source:
+            inline = source["inline"]
+            template = inline["templateConfiguration"]["text"]["text"]
+            return inline.get("modelId", DEFAULT_MODEL), template
+        resource = source.get("resource", {})
+        prompt_id, _ = _prompt_ref(resource.get("promptArn", ""))
+        if prompt_id not in self.prompts and not self.config.strict:
+            return resource.get("modelId", DEFAULT_MODEL), "{{input}}"
+        prompt, version = self._prompt(resource.get("promptArn", ""))
+        snapshot = prompt["versions"][version]
+        variant = next(
+            (
+                v
+                for v in snapshot["variants"]
+                if v["name"] == snapshot["defaultVariant"]
+            ),
+            snapshot["variants"][0],
+        )
+        return (
+            variant.get("modelId", DEFAULT_MODEL),
+            variant["templateConfiguration"]["text"]["text"],
+        )
+
+    # bedrock-agent: flows
+
+    def _flow(self, identifier: str) -> dict:
+        flow = self.flows.get(_resource_id(identifier))
+        if flow is None:
+            raise StandinError(
+                "ResourceNotFoundException", f"Flow {identifier} not found"
+            )
+        return flow
+
+    def _flow_status(self, flow: dict) -> str:
+        if flow["status"] == "Preparing" and self.clock() >= flow["readyAt"]:
+            flow["status"] = "Prepared"
+        return flow["status"]
+
+    def _flow_view(self, flow: dict) -> dict:
+        keys = ("name", "description", "executionRoleArn", "id", "arn", "definition")
+        view = {key: flow[key] for key in keys}
+        view.update(
+            status=self._flow_status(flow),
+            createdAt=flow["createdAt"],
+            updatedAt=flow["updatedAt"],
+            version=DRAFT,
+        )
+        return view
+
+    def _create_flow(self, params):
+        if any(flow["name"] == params["name"] for flow in self.flows.values()):
+            raise StandinError("ConflictException", f"Flow {params['name']} exists")
+        flow_id = self._new_id()
+        now = _now()
+        self.flows[flow_id] = {
+            "id": flow_id,
+            "arn": self._arn(f"flow/{flow_id}"),
+            "name": params["name"],
+            "description": params.get("description", ""),
+            "executionRoleArn": params.get("executionRoleArn"),
+            "definition": params.get("definition") or {},
+            "status": "NotPrepared",
+            "validations": [],
+            "createdAt": now,
+            "updatedAt": now,
+            "versions": {},
+            "aliases": {},
+        }
+        return self._flow_view(self.flows[flow_id])
+
+    def _update_flow(self, params):
+        flow = self._flow(params["flowIdentifier"])
+        for key in ("name", "description", "executionRoleArn", "definition"):
+            if key in params:
+                flow[key] = params[key]
+        flow.update(status="NotPrepared", validations=[], updatedAt=_now())
+        return self._flow_view(flow)
+
+    def _get_flow(self, params):
+        flow = self._flow(params["flowIdentifier"])
+        return {**self._flow_view(flow), "validations": flow["validations"]}
+
+    def _list_flows(self, params):
+        keys = (
+            "name",
+            "description",
+            "id",
+            "arn",
+            "status",
+            "createdAt",
+            "updatedAt",
+            "version",
+        )
+        summaries = [
+            {key: view[key] for key in keys}
+            for view in map(self._flow_view, self.flows.values())
+        ]
+        return _page(summaries, params, "flowSummaries")
+
+    def _prepare_flow(self, params):
+        flow = self._flow(params["flowIdentifier"])
+        try:
+            problems = from_bedrock_definition(flow["definition"]).graph.problems
+        except ValidationError as e:
+            problems = [str(e)]
+        if problems:
+            flow["status"] = "Failed"
+            flow["validations"] = [
+                {"message": problem, "severity": "Error"} for problem in problems
+            ]
+        else:
+            flow["status"] = "Preparing"
+            flow["readyAt"] = self.clock() + self.config.prepareSeconds
+        return {"id": flow["id"], "status": "Preparing"}
+
+    def _delete_flow(self, params):
+        flow = self._flow(params["flowIdentifier"])
+        if flow["aliases"] and not params.get("skipResourceInUseCheck"):
+            raise StandinError("ConflictException", f"Flow {flow['id']} has aliases")
+        del self.flows[flow["id"]]
+        return {"id": flow["id"]}
+
+    def _create_flow_version(self, params):
+        flow = self._flow(params["flowIdentifier"])
+        if self._flow_status(flow) != "Prepared":
+            raise StandinError(
+                "ValidationException", f"Flow {flow['id']} is not prepared"
+            )
+        version = str(len(flow["versions"]) + 1)
+        flow["versions"][version] = {
+            "definition": flow["definition"],
+            "description": params.get("description", flow["description"]),
+            "createdAt": _now(),
+        }
+        return self._flow_version_view(flow, version)
+
+    def _flow_version_view(self, flow: dict, version: str) -> dict:
+        snapshot = flow["versions"][version]
+        return {
+            "name": flow["name"],
+            "description": snapshot["description"],
+            "executionRoleArn": flow["executionRoleArn"],
+            "id": flow["id"],
+            "arn": f"{flow['arn']}/version/{version}",
+            "status": "Prepared",
+            "createdAt": snapshot["createdAt"],
+            "version": version,
+            "definition": snapshot["definition"],
+        }
+
+    def _list_flow_versions(self, params):
+        flow = self._flow(params["flowIdentifier"])
+        summaries = [
+            {
+                "id": flow["id"],
+                "arn": flow["arn"],
+                "status": self._flow_status(flow),
+                "createdAt": flow["createdAt"],
+                "version": DRAFT,
+            }
+        ]
+        for version in flow["versions"]:
+            view = self._flow_version_view(flow, version)
+            summaries.append(
+                {
+                    key: view[key]
+                    for key in ("id", "arn", "status", "createdAt", "version")
+                }
+            )
+        return _page(summaries, params, "flowVersionSummaries")
+
+    def _delete_flow_version(self, params):
+        flow = self._flow(params["flowIdentifier"])
+        version = params["flowVersion"]
+        if flow["versions"].pop(version, None) is None:
+            raise StandinError(
+                "ResourceNotFoundException",
+                f"Flow {flow['id']} has no version {version}",
+            )
+        return {"id": flow["id"], "version": version}
+
+    def _check_routing(self, flow: dict, routing: list):
+        for route in routing:
+            if (
+                route["flowVersion"] != DRAFT
+                and route["flowVersion"] not in flow["versions"]
+            ):
+                raise StandinError(
+                    "ValidationException",
+                    f"Flow {flow['id']} has no version {route['flowVersion']}",
+                )
+
+    def _create_flow_alias(self, params):
+        flow = self._flow(params["flowIdentifier"])
+        self._check_routing(flow, params["routingConfiguration"])
+        alias_id = self._new_id()
+        now = _now()
+        flow["aliases"][alias_id] = {
+            "name": params["name"],
+            "description": params.get("description", ""),
+            "routingConfiguration": params["routingConfiguration"],
+            "flowId": flow["id"],
+            "id": alias_id,
+            "arn": f"{flow['arn']}/alias/{alias_id}",
+            "createdAt": now,
+            "updatedAt": now,
+        }
+        return flow["aliases"][alias_id]
+
+    def _alias(self, flow: dict, identifier: str) -> dict:
+        alias = flow["aliases"].get(_resource_id(identifier))
+        if alias is None:
+            raise StandinError(
+                "ResourceNotFoundException", f"Flow alias {identifier} not found"
+            )
+        return alias
+
+    def _update_flow_alias(self, params):
+        flow = self._flow(params["flowIdentifier"])
+        alias = self._alias(flow, params["aliasIdentifier"])
+        self._check_routing(flow, params["routingConfiguration"])
+        for key in ("name", "description", "routingConfiguration"):
+            if key in params:
+                alias[key] = params[key]
+        alias["updatedAt"] = _now()
+        return alias
+
+    def _list_flow_aliases(self, params):
+        flow = self._flow(params["flowIdentifier"])
+        return _page(list(flow["aliases"].values()), params, "flowAliasSummaries")
+
+    def _delete_flow_alias(self, params):
+        flow = self._flow(params["flowIdentifier"])
+        alias = self._alias(flow, params["aliasIdentifier"])
+        del flow["aliases"][alias["id"]]
+        return {"flowId": flow["id"], "id": alias["id"]}
+
+    # bedrock-agent-runtime
+
+    def _flow_definition(self, flow_identifier: str, alias_identifier: str):
+        """The definition an alias runs, or None for an unknown flow when not strict."""
+        with self._state_lock:
+            flow = self.flows.get(_resource_id(flow_identifier))
+            if flow is None:
+                if self.config.strict:
+                    self._flow(flow_identifier)
+                return None
+            if alias_identifier == DRAFT_ALIAS:
+                version = DRAFT
+            else:
+                alias = self._alias(flow, alias_identifier)
+                version = alias["routingConfiguration"][0]["flowVersion"]
+            if version != DRAFT:
+                return flow["versions"][version]["definition"]
+            if self._flow_status(flow) != "Prepared":
+                raise StandinError(
+                    "ValidationException", f"Flow {flow['id']} is not prepared"
+                )
+            return flow["definition"]
+
+    def _invoke_flow(self, params):
+        document = next(
+            (i["content"]["document"] for i in params.get("inputs", [])), ""
+        )
+        definition = self._flow_definition(
+            params["flowIdentifier"], params["flowAliasIdentifier"]
+        )
+        if definition is None:
+            output = self.completion(DEFAULT_MODEL, _text(document))
+            digest = hashlib.sha256(_text(document).encode("utf-8")).digest()
+            events = [
+                (
+                    "flowOutputEvent",
+                    {
+                        "content": {
+                            "document": json.dumps(_verdict(document, output, digest))
+                        },
+                        "nodeName": "End",
+                        "nodeType": "FlowOutputNode",
+                    },
+                )
+            ]
+        else:
+            events = self.run_flow(
+                definition, document, params.get("enableTrace", False)
+            )
+        events.append(("flowCompletionEvent", {"completionReason": "SUCCESS"}))
+        return {"executionId": self._new_id(), "responseStream": events}
+
+    def run_flow(self, definition: dict, document, trace: bool = False) -> list:
+        """Run a bedrock-agent flow definition and return its response events.
+
+        Nodes run in topological order; each receives its inputs by name from
+        the connections that reached it and sends its result along all of
+        its outgoing connections.
+        """
+        graph = from_bedrock_definition(definition).graph
+        if graph.problems:
+            raise StandinError("ValidationException", "; ".join(graph.problems))
+        values = {}
+        events = []
+        for name in graph.topological_order:
+            node = graph.nodes[name]
+            inputs = {
+                port.name: values[(name, port.name)]
+                for port in node.inputs
+                if (name, port.name) in values
+            }
+            if node.type == "Input":
+                result = document
+            elif not inputs:
+                continue
+            elif node.type == "Output":
+                output = {
+                    "content": {"document": next(iter(inputs.values()))},
+                    "nodeName": name,
+                    "nodeType": "FlowOutputNode",
+                }
+                events.append(("flowOutputEvent", output))
+                continue
+            else:
+                result = self._run_node(node, inputs)
+            if trace:
+                fields = [
+                    {"nodeOutputName": port.name, "content": {"document": result}}
+                    for port in node.outputs
+                ]
+                node_trace = {"nodeName": name, "timestamp": _now(), "fields": fields}
+                events.append(
+                    ("flowTraceEvent", {"trace": {"nodeOutputTrace": node_trace}})
+                )
+            for conn in graph.outgoing.get(name, ()):
+                port = conn.configuration.get("data")
+                if port is not None:
+                    values[(conn.target, port.targetInput)] = result
+        return events
+
+    def _run_node(self, node, inputs: dict):
+        first = next(iter(inputs.values()))
+        if node.type == "Prompt":
+            model_id, template = self._prompt_template(node.configuration.prompt)
+            prompt = _TEMPLATE_VARIABLE.sub(
+                lambda m: _text(inputs.get(m.group(1), "")), template
+            )
+            return self.completion(model_id, prompt)
+        if node.type == "LambdaFunction":
+            return self.call_function(
+                node.configuration.lambdaArn, {"input": first}
+            ).get("output")
+        if node.type == "KnowledgeBase":
+            return self.retrieval_results(
+                node.configuration.knowledgeBaseId, _text(first), 5
+            )
+        return first
+
+    def _retrieve(self, params):
+        query = params.get("retrievalQuery", {}).get("text", "")
+        search = params.get("retrievalConfiguration", {}).get(
+            "vectorSearchConfiguration", {}
+        )
+        results = self.retrieval_results(
+            params["knowledgeBaseId"], query, search.get("numberOfResults", 5)
+        )
+        return {"retrievalResults": results}
+
+    # bedrock-runtime
+
+    def _model_call(self, params):
+        request = json.loads(params.get("body") or b"{}")
+        prompt = _request_prompt(request)
+        return request, prompt, self.completion(params["modelId"], prompt)
+
+    def _invoke_model(self, params):
+        request, prompt, text = self._model_call(params)
+        response = _model_response(params["modelId"], request, prompt, text)
+        return {"body": _dumps(response), "contentType": "application/json"}
+
+    def _invoke_model_with_response_stream(self, params):
+        request, _, text = self._model_call(params)
+        pieces = re.findall(r"\S+\s*", text) or [text]
+        events = [
+            (
+                "chunk",
+                {"bytes": _dumps(_stream_chunk(params["modelId"], request, piece))},
+            )
+            for piece in pieces
+        ]
+        if "messages" in request:
+            stop = {"type": "message_stop"}
+            events.append(("chunk", {"bytes": _dumps(stop)}))
+        return {"body": events, "contentType": "application/json"}
+
+    # lambda
+
+    def _invoke(self, params):
+        event = json.loads(params.get("Payload") or b"{}")
+        response = {"StatusCode": 200, "ExecutedVersion": "$LATEST"}
+        try:
+            response["Payload"] = _dumps(
+                self.call_function(params["FunctionName"], event)
+            )
+        except StandinError:
+            raise
+        except Exception as e:
+            response["FunctionError"] = "Unhandled"
+            response["Payload"] = _dumps(
+                {"errorMessage": str(e), "errorType": type(e).__name__}
+            )
+        return response
+
+    # iam
+
+    def _role(self, name: str) -> dict:
+        if name not in self.roles:
+            raise StandinError(
+                "NoSuchEntity", f"The role with name {name} cannot be found."
+            )
+        return self.roles[name]
+
+    def _create_role(self, params):
+        name = params["RoleName"]
+        if name in self.roles:
+            raise StandinError(
+                "EntityAlreadyExists", f"Role with name {name} already exists."
+            )
+        role = {
+            "Path": params.get("Path", "/"),
+            "RoleName": name,
+            "RoleId": "AROA" + self._new_id(),
+            "Arn": f"arn:aws:iam::{self.config.accountId}:role/{name}",
+            "CreateDate": _now(),
+            "AssumeRolePolicyDocument": params["AssumeRolePolicyDocument"],
+            "Description": params.get("Description", ""),
+        }
+        self.roles[name] = {"Role": role, "policies": {}, "attached": []}
+        return {"Role": role}
+
+    def _get_role(self, params):
+        return {"Role": self._role(params["RoleName"])["Role"]}
+
+    def _delete_role(self, params):
+        role = self._role(params["RoleName"])
+        if role["policies"] or role["attached"]:
+            raise StandinError(
+                "DeleteConflict", "Cannot delete entity, must delete policies first."
+            )
+        del self.roles[params["RoleName"]]
+        return {}
+
+    def _put_role_policy(self, params):
+        role = self._role(params["RoleName"])
+        role["policies"][params["PolicyName"]] = params["PolicyDocument"]
+        return {}
+
+    def _delete_role_policy(self, params):
+        role = self._role(params["RoleName"])
+        if role["policies"].pop(params["PolicyName"], None) is None:
+            raise StandinError(
+                "NoSuchEntity",
+                f"The role policy {params['PolicyName']} cannot be found.",
+            )
+        return {}
+
+    def _list_role_policies(self, params):
+        role = self._role(params["RoleName"])
+        return {"PolicyNames": list(role["policies"]), "IsTruncated": False}
+
+    def _attach_role_policy(self, params):
+        role = self._role(params["RoleName"])
+        if params["PolicyArn"] not in role["attached"]:
+            role["attached"].append(params["PolicyArn"])
+        return {}
+
+    def _list_attached_role_policies(self, params):
+        role = self._role(params["RoleName"])
+        policies = [
+            {"PolicyName": arn.rsplit("/", 1)[-1], "PolicyArn": arn}
+            for arn in role["attached"]
+        ]
+        return {"AttachedPolicies": policies, "IsTruncated": False}
+
+    def _detach_role_policy(self, params):
+        role = self._role(params["RoleName"])
+        if params["PolicyArn"] not in role["attached"]:
+            raise StandinError(
+                "NoSuchEntity", f"Policy {params['PolicyArn']} was not attached."
+            )
+        role["attached"].remove(params["PolicyArn"])
+        return {}
+
+
+# (service, operation) -> BedrockStandin handler
+OPERATIONS = {
+    ("bedrock-agent", "CreatePrompt"): "_create_prompt",
+    ("bedrock-agent", "GetPrompt"): "_get_prompt",
+    ("bedrock-agent", "ListPrompts"): "_list_prompts",
+    ("bedrock-agent", "CreatePromptVersion"): "_create_prompt_version",
+    ("bedrock-agent", "DeletePrompt"): "_delete_prompt",
+    ("bedrock-agent", "CreateFlow"): "_create_flow",
+    ("bedrock-agent", "UpdateFlow"): "_update_flow",
+    ("bedrock-agent", "GetFlow"): "_get_flow",
+    ("bedrock-agent", "ListFlows"): "_list_flows",
+    ("bedrock-agent", "PrepareFlow"): "_prepare_flow",
+    ("bedrock-agent", "DeleteFlow"): "_delete_flow",
+    ("bedrock-agent", "CreateFlowVersion"): "_create_flow_version",
+    ("bedrock-agent", "ListFlowVersions"): "_list_flow_versions",
+    ("bedrock-agent", "DeleteFlowVersion"): "_delete_flow_version",
+    ("bedrock-agent", "CreateFlowAlias"): "_create_flow_alias",
+    ("bedrock-agent", "UpdateFlowAlias"): "_update_flow_alias",
+    ("bedrock-agent", "ListFlowAliases"): "_list_flow_aliases",
+    ("bedrock-agent", "DeleteFlowAlias"): "_delete_flow_alias",
+    ("bedrock-agent-runtime", "InvokeFlow"): "_invoke_flow",
+    ("bedrock-agent-runtime", "Retrieve"): "_retrieve",
+    ("bedrock-runtime", "InvokeModel"): "_invoke_model",
+    (
+        "bedrock-runtime",
+        "InvokeModelWithResponseStream",
+    ): "_invoke_model_with_response_stream",
+    ("lambda", "Invoke"): "_invoke",
+    ("iam", "CreateRole"): "_create_role",
+    ("iam", "GetRole"): "_get_role",
+    ("iam", "DeleteRole"): "_delete_role",
+    ("iam", "PutRolePolicy"): "_put_role_policy",
+    ("iam", "DeleteRolePolicy"): "_delete_role_policy",
+    ("iam", "ListRolePolicies"): "_list_role_policies",
+    ("iam", "AttachRolePolicy"): "_attach_role_policy",
+    ("iam", "ListAttachedRolePolicies"): "_list_attached_role_policies",
+    ("iam", "DetachRolePolicy"): "_detach_role_policy",
+}
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    # Keep-alive, so load tests measure the stand-in rather than connection setup.
+    protocol_version = "HTTP/1.1"
+
+    def _dispatch(self):
+        standin = self.server.standin
+        url = urlsplit(self.path)
+        _, service, path = (url.path.split("/", 2) + [""])[:3]
+        path = "/" + path
+        query = parse_qs(url.query)
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if service in SERVICES:
+            operation = standin.route(service, self.command, path, query, body)
+            status, headers, payload = standin.handle(
+                service, operation, path, query, self.headers, body
+            )
+        else:
+            status, headers = 404, {"Content-Type": "application/json"}
+            payload = _dumps({"message": f"Serving {', '.join(SERVICES)}"})
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    do_GET = do_POST = do_PUT = do_DELETE = _dispatch
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(standin: BedrockStandin, host="127.0.0.1", port=0):
+    """Serve ``standin`` over HTTP from a daemon thread; port 0 picks a free port."""
+    server = ThreadingHTTPServer((host, port), _RequestHandler)
+    server.daemon_threads = True
+    server.standin = standin
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def endpoint_environment(server, region="us-east-1") -> Dict[str, str]:
+    """Environment variables that point boto3 clients at ``server``."""
+    host, port = server.server_address[:2]
+    session = botocore.session.get_session()
+    environment = {}
+    for service in SERVICES:
+        service_id = session.get_service_model(service).service_id
+        name = "AWS_ENDPOINT_URL_" + service_id.replace(" ", "_").upper()
+        environment[name] = f"http://{host}:{port}/{service}"
+    environment.update(
+        AWS_ACCESS_KEY_ID=CREDENTIALS["aws_access_key_id"],
+        AWS_SECRET_ACCESS_KEY=CREDENTIALS["aws_secret_access_key"],
+        AWS_DEFAULT_REGION=region,
+    )
+    return environment
+
+
+@click.command()
+@click.option("--host", default="127.0.0.1", show_default=True)
+@click.option("--port", default=8765, show_default=True)
+@click.option(
+    "--config",
+    "config_path",
+    type=click.Path(exists=True),
+    help="JSON StandinConfig with latency, faults and canned completions",
+)
+@click.option("--seed", type=int, help="Seed for latency and fault sampling")
+@click.option(
+    "--strict", is_flag=True, help="Reject resources that were not created first"
+)
+def main(host, port, config_path, seed, strict):
+    """Serve the Bedrock stand-in and print the environment that points boto3 at it."""
+    config = StandinConfig()
+    if config_path:
+        with open(config_path) as f:
+            config = StandinConfig.model_validate(json.load(f))
+    if seed is not None:
+        config.seed = seed
+    config.strict = config.strict or strict
+    server = start_server(BedrockStandin(config), host, port)
+    for name, value in endpoint_environment(server, config.region).items():
+        print(f"export {name}={value}")
+    click.echo(
+        f"Bedrock stand-in listening on {host}:{server.server_address[1]}", err=True
+    )
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
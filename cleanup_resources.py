@@ -1,40 +1,42 @@
 import boto3
 
+from flow_simulator.resource_index import ResourceIndex
+from flow_simulator.teardown import TeardownEngine, summarize
 
-def cleanup_resources(flowEvalId, flowEvalAliasId, promptEvalId):
-    bedrock_agent = boto3.client("bedrock-agent")
-    iam = boto3.client("iam")
-
-    # Delete flow alias
-    bedrock_agent.delete_flow_alias(
-        flowIdentifier=flowEvalId, aliasIdentifier=flowEvalAliasId
-    )
-    print(f"Deleted flow alias: {flowEvalAliasId}")
-
-    # Delete flow version
-    bedrock_agent.delete_flow_version(flowIdentifier=flowEvalId, flowVersion="1")
-    print(f"Deleted flow version 1 for flow: {flowEvalId}")
 
-    # Delete flow
-    bedrock_agent.delete_flow(flowIdentifier=flowEvalId)
-    print(f"Deleted flow: {flowEvalId}")
+def cleanup_flows(flow_ids, prompt_ids=(), role_names=(), max_workers=16):
+    """Delete flows with all of their aliases, versions and prompts.
 
-    # Delete prompt
-    bedrock_agent.delete_prompt(promptIdentifier=promptEvalId)
-    print(f"Deleted prompt: {promptEvalId}")
-
-    # Detach role policy
-    iam.detach_role_policy(
-        RoleName="MyBedrockFlowsRole",
-        PolicyArn="arn:aws:iam::aws:policy/AmazonBedrockFullAccess",
+    Independent resources are deleted concurrently; roles in ``role_names``
+    have their policies detached and are deleted after the flows.
+    """
+    bedrock_agent = boto3.client("bedrock-agent")
+    engine = TeardownEngine(
+        bedrock_agent,
+        boto3.client("iam"),
+        max_workers=max_workers,
+        index=ResourceIndex(bedrock_agent),
     )
-    print("Detached AmazonBedrockFullAccess policy from MyBedrockFlowsRole")
+    plan = engine.plan(flow_ids, prompt_ids, role_names)
+    print(f"Deleting {len(plan)} resources")
+    outcomes = engine.run(plan)
+    for outcome in outcomes.values():
+        if outcome.status in ("failed", "skipped"):
+            print(f"Could not delete {' '.join(outcome.key)}: {outcome.error}")
+    return outcomes
 
-    # Delete role
-    iam.delete_role(RoleName="MyBedrockFlowsRole")
-    print("Deleted MyBedrockFlowsRole")
 
-    print("Cleanup completed successfully.")
+def cleanup_resources(flowEvalId, flowEvalAliasId, promptEvalId):
+    # Every alias of the flow is discovered, so flowEvalAliasId is not needed
+    # to find it; it is kept for existing callers.
+    outcomes = cleanup_flows(
+        [flowEvalId], [promptEvalId], role_names=["MyBedrockFlowsRole"]
+    )
+    counts = summarize(outcomes)
+    if counts.get("failed") or counts.get("skipped"):
+        print(f"Cleanup incomplete: {counts}")
+    else:
+        print("Cleanup completed successfully.")
 
 
 # Example usage
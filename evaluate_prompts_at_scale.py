@@ -1,60 +1,307 @@
 import json
+import os
+import socket
+import time
 from datetime import datetime
+
+import click
+
+from flow_invocation import create_runtime_client, request_deadline, run_hedged
+from flow_simulator.rate_limiter import SharedRateLimiter, estimate_tokens
+from judge_output import JudgeOutputError
+from prompt_dedup import NearDuplicateIndex, evaluate_clustered
+from prompt_prescorer import evaluate_triaged
+from region_router import RegionRouter, load_region_targets
 from test_evaluation_flow import evaluatePrompt
+from work_queue import WorkQueue, run_worker
+
+# Expected length of a model's answer, charged against its token budget.
+EXPECTED_OUTPUT_TOKENS = 500
+
+
+def load_config(path="bedrock_config.json"):
+    if not os.path.exists(path):
+        return {"region": "us-east-1"}
+    with open(path, "r") as config_file:
+        return json.load(config_file)
+
+
+def load_dataset(path):
+    promptsDataset = []
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                promptsDataset.append(json.loads(line))
+    return promptsDataset
+
+
+def evaluate_item(
+    router, item, modelInvokeId, modelEvalId, deadline, rate_limiter=None
+):
+    def evaluate_in_region(target, client):
+        if rate_limiter:
+            # The invoke model reads the prompt and answers it; the judge reads
+            # both and writes its verdict.
+            tokens = estimate_tokens(item["input"])
+            rate_limiter.acquire(modelInvokeId, tokens + EXPECTED_OUTPUT_TOKENS)
+            rate_limiter.acquire(modelEvalId, tokens + 2 * EXPECTED_OUTPUT_TOKENS)
+        result = evaluatePrompt(
+            item["input"],
+            target.flowId,
+            target.flowAliasId,
+            modelInvokeId,
+            modelEvalId,
+            client=client,
+            deadline=deadline,
+        )
+        if result is None:
+            return {"error": "Flow returned no output", "region": target.region}
+        result["region"] = target.region
+        return result
 
-# Read prompts dataset file
-promptsDataset = []
-with open("prompts_dataset.jsonl") as f:
-    for line in f:
-        promptsDataset.append(json.loads(line))
-
-# Configuration
-flowEvalId = "your_flow_eval_id"
-flowEvalAliasId = "your_flow_eval_alias_id"
-modelInvokeId = "your_model_invoke_id"
-modelEvalId = "your_model_eval_id"
-
-if promptsDataset:
-    results = []
-    for i, j in enumerate(promptsDataset):
+    try:
+        return router.call(evaluate_in_region)
+    except JudgeOutputError as e:
+        # Keep the raw output so the item can be repaired offline with
+        # judge_output.reparse_failed_results instead of a paid re-run.
+        return {
+            "error": str(e),
+            "parse-error": e.reason,
+            "raw-output": e.raw,
+            "modelInvoke": modelInvokeId,
+            "modelEval": modelEvalId,
+        }
+
+
+def evaluate_dataset(
+    promptsDataset,
+    router,
+    modelInvokeId,
+    modelEvalId,
+    deadline=None,
+    max_workers=4,
+    hedge_percentile=95,
+    rate_limiter=None,
+):
+    total = len(promptsDataset)
+
+    def evaluate(indexed_item):
+        i, item = indexed_item
         print(
-            f"{datetime.now().strftime('%H:%M:%S')} - Evaluating prompt {i+1} of {len(promptsDataset)}..."
+            f"{datetime.now().strftime('%H:%M:%S')} - Evaluating prompt {i+1} of {total}..."
         )
-        try:
-            results.append(
-                evaluatePrompt(
-                    j["input"], flowEvalId, flowEvalAliasId, modelInvokeId, modelEvalId
-                )
+        return evaluate_item(
+            router, item, modelInvokeId, modelEvalId, deadline, rate_limiter
+        )
+
+    results = run_hedged(
+        evaluate,
+        enumerate(promptsDataset),
+        max_workers=max_workers,
+        hedge_percentile=hedge_percentile,
+    )
+    for i, result in enumerate(results):
+        if isinstance(result, Exception):
+            print(f"Error evaluating prompt {i+1}: {result}")
+            results[i] = {"error": str(result)}
+        elif "parse-error" in result:
+            print(
+                f"Could not parse evaluation of prompt {i+1} "
+                f"({result['parse-error']}): {result['error']}"
             )
-        except Exception as e:
-            print(f"Error evaluating prompt {i+1}: {e}")
-            results.append({"error": str(e)})
     print("All prompts evaluated.")
+    for region, stats in router.stats().items():
+        print(f"{region}: {json.dumps(stats)}")
+    return results
+
+
+def plot_scores(results, path="evaluation_scores.png"):
+    # Visualize results (requires matplotlib)
+    import matplotlib.pyplot as plt
+
+    scores = [
+        result.get("prompt-score", 0) for result in results if "prompt-score" in result
+    ]
+    labels = [f"Prompt {i+1}" for i in range(len(scores))]
+
+    fig, ax = plt.subplots(figsize=(10, 6))
+    ax.bar(labels, scores)
+    ax.set_title("Evaluation Scores", fontsize=14)
+    ax.set_xlabel("Prompts", fontsize=12)
+    ax.set_ylabel("Score", fontsize=12)
+    plt.xticks(rotation=45, fontsize=10)
+    ax.grid(axis="y", linestyle="--", alpha=0.7)
+    plt.tight_layout()
+    ax.axhline(y=80, color="r", linestyle="--", label="Passing threshold")
+    ax.legend(loc="upper right")
+    plt.savefig(path)
+    plt.close()
+
+    print(f"Evaluation scores chart saved as '{path}'")
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+@click.command()
+@click.option("--dataset", default="prompts_dataset.jsonl", help="Prompts dataset")
+@click.option("--config", "config_path", default="bedrock_config.json")
+@click.option("--flow-id", default="your_flow_eval_id")
+@click.option("--flow-alias-id", default="your_flow_eval_alias_id")
+@click.option("--model-invoke-id", default="your_model_invoke_id")
+@click.option("--model-eval-id", default="your_model_eval_id")
+@click.option("--max-workers", default=4, help="Concurrent flow invocations")
+@click.option(
+    "--hedge-percentile",
+    default=95.0,
+    help="Hedge calls slower than this latency percentile; 0 disables hedging",
+)
+@click.option("--chart", default="evaluation_scores.png")
+@click.option(
+    "--mode",
+    type=click.Choice(["local", "coordinator", "worker", "merge"]),
+    default="local",
+    help="Evaluate locally, or share the dataset through a work queue",
+)
+@click.option("--queue", "queue_path", default="evaluation_queue.db")
+@click.option("--shard-size", default=100, help="Dataset lines per queued shard")
+@click.option("--lease-seconds", default=300.0)
+@click.option("--worker-id", default=default_worker_id)
+@click.option("--results-dir", default="shard_results")
+@click.option("--output", default="evaluation_results.jsonl")
+@click.option(
+    "--prescore-skip-below",
+    type=float,
+    default=None,
+    help="Skip the judge for prompts whose local pre-score is below this",
+)
+@click.option(
+    "--prescore-audit-rate",
+    default=0.1,
+    help="Share of skippable prompts judged anyway to measure false skips",
+)
+@click.option(
+    "--dedup-threshold",
+    type=float,
+    default=None,
+    help="Evaluate only a sample of each cluster of prompts this similar",
+)
+@click.option("--dedup-sample", default=1, help="Prompts evaluated per cluster")
+def main(
+    dataset,
+    config_path,
+    flow_id,
+    flow_alias_id,
+    model_invoke_id,
+    model_eval_id,
+    max_workers,
+    hedge_percentile,
+    chart,
+    mode,
+    queue_path,
+    shard_size,
+    lease_seconds,
+    worker_id,
+    results_dir,
+    output,
+    prescore_skip_below,
+    prescore_audit_rate,
+    dedup_threshold,
+    dedup_sample,
+):
+    if mode in ("coordinator", "merge"):
+        queue = WorkQueue(queue_path)
+        if mode == "coordinator":
+            shards = queue.enqueue_dataset(dataset, shard_size)
+            print(f"Queued {shards} shards of {dataset} in {queue_path}")
+            while not queue.is_finished():
+                print(f"Shards: {json.dumps(queue.counts())}")
+                time.sleep(10)
+        written = queue.merge(output)
+        print(f"Merged {written} results into {output}")
+        return
+
+    config = load_config(config_path)
+    # A "regions" list in the config fans the run out over several regions.
+    router = RegionRouter(
+        load_region_targets(config, flow_id, flow_alias_id),
+        lambda region: create_runtime_client(region, config),
+    )
+
+    def judge(promptsDataset):
+        return evaluate_dataset(
+            promptsDataset,
+            router,
+            model_invoke_id,
+            model_eval_id,
+            deadline=request_deadline(config),
+            max_workers=max_workers,
+            hedge_percentile=hedge_percentile or None,
+            # "rateLimits" in the config is shared with every runner on this host.
+            rate_limiter=SharedRateLimiter.from_config(config),
+        )
+
+    def triaged(promptsDataset):
+        if prescore_skip_below is None:
+            return judge(promptsDataset)
+        results, report = evaluate_triaged(
+            promptsDataset,
+            judge,
+            prescore_skip_below,
+            audit_rate=prescore_audit_rate,
+        )
+        print(f"Pre-score: {json.dumps(report)}")
+        if report["false-skips"]:
+            print(
+                f"Warning: the judge passed {report['false-skips']} audited "
+                "prompts the pre-scorer would have skipped"
+            )
+        return results
+
+    def evaluate(promptsDataset):
+        if dedup_threshold is None:
+            return triaged(promptsDataset)
+        results, report = evaluate_clustered(
+            promptsDataset,
+            triaged,
+            NearDuplicateIndex(dedup_threshold),
+            sample=dedup_sample,
+        )
+        print(f"Near duplicates: {json.dumps(report)}")
+        if report["disagreeing-clusters"]:
+            print(
+                "Warning: evaluated members of clusters "
+                f"{report['disagreeing-clusters']} disagree about passing"
+            )
+        return results
+
+    if mode == "worker":
+        completed = run_worker(
+            WorkQueue(queue_path),
+            worker_id,
+            evaluate,
+            results_dir,
+            lease_seconds=lease_seconds,
+            wait_for_work=True,
+        )
+        print(f"Worker {worker_id} completed {completed} shards")
+        return
+
+    # Read prompts dataset file
+    promptsDataset = load_dataset(dataset)
+    if not promptsDataset:
+        print("No prompts to evaluate.")
+        return
+
+    results = evaluate(promptsDataset)
+
+    # Review results
+    for i in results:
+        print(json.dumps(i, indent=2, ensure_ascii=False))
+
+    plot_scores(results, chart)
+
 
-# Review results
-for i in results:
-    print(json.dumps(i, indent=2, ensure_ascii=False))
-
-# Visualize results (requires matplotlib)
-import matplotlib.pyplot as plt
-import numpy as np
-
-scores = [
-    result.get("prompt-score", 0) for result in results if "prompt-score" in result
-]
-labels = [f"Prompt {i+1}" for i in range(len(scores))]
-
-fig, ax = plt.subplots(figsize=(10, 6))
-ax.bar(labels, scores)
-ax.set_title("Evaluation Scores", fontsize=14)
-ax.set_xlabel("Prompts", fontsize=12)
-ax.set_ylabel("Score", fontsize=12)
-plt.xticks(rotation=45, fontsize=10)
-ax.grid(axis="y", linestyle="--", alpha=0.7)
-plt.tight_layout()
-ax.axhline(y=80, color="r", linestyle="--", label="Passing threshold")
-ax.legend(loc="upper right")
-plt.savefig("evaluation_scores.png")
-plt.close()
-
-print("Evaluation scores chart saved as 'evaluation_scores.png'")
+if __name__ == "__main__":
+    main()
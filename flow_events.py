@@ -0,0 +1,112 @@
+import json
+
+from judge_output import (
+    JsonObjectScanner,
+    JudgeOutputError,
+    normalize_judge_keys,
+    parse_judge_output,
+)
+
+
+class FlowEventConsumer:
+    """Consume an ``invoke_flow`` response stream.
+
+    Output chunks are kept per output node as a list and joined once, and
+    each node's output is scanned for JSON objects as it arrives, so
+    ``on_document`` fires as soon as an evaluation object is complete instead
+    of after the stream ends. Callbacks receive ``(event_payload, consumer)``;
+    ``on_document`` receives ``(node_name, document, consumer)``.
+    """
+
+    def __init__(
+        self,
+        on_output=None,
+        on_document=None,
+        on_completion=None,
+        on_trace=None,
+        keep_traces=False,
+    ):
+        self.on_output = on_output
+        self.on_document = on_document
+        self.on_completion = on_completion
+        self.on_trace = on_trace
+        self.keep_traces = keep_traces
+        self.chunks = {}
+        self.documents = {}
+        self.parse_errors = {}
+        self.traces = []
+        self.trace_count = 0
+        self.completion_reason = None
+        self._scanners = {}
+
+    def consume(self, events):
+        for event in events:
+            self.feed(event)
+        return self
+
+    def feed(self, event):
+        if "flowOutputEvent" in event:
+            self._handle_output(event["flowOutputEvent"])
+        elif "flowCompletionEvent" in event:
+            payload = event["flowCompletionEvent"]
+            self.completion_reason = payload.get("completionReason")
+            if self.on_completion:
+                self.on_completion(payload, self)
+        elif "flowTraceEvent" in event:
+            payload = event["flowTraceEvent"]
+            self.trace_count += 1
+            if self.keep_traces:
+                self.traces.append(payload)
+            if self.on_trace:
+                self.on_trace(payload, self)
+
+    def _handle_output(self, payload):
+        node_name = payload.get("nodeName", "End")
+        document = payload["content"]["document"]
+        if self.on_output:
+            self.on_output(payload, self)
+
+        if not isinstance(document, str):
+            # Object-typed outputs arrive already decoded.
+            self.chunks.setdefault(node_name, []).append(json.dumps(document))
+            if isinstance(document, dict):
+                self._add_document(node_name, normalize_judge_keys(document))
+            return
+
+        self.chunks.setdefault(node_name, []).append(document)
+        scanner = self._scanners.setdefault(node_name, JsonObjectScanner())
+        for candidate in scanner.feed(document):
+            try:
+                self._add_document(node_name, parse_judge_output(candidate))
+            except JudgeOutputError as e:
+                self.parse_errors[node_name] = e
+
+    def _add_document(self, node_name, document):
+        self.documents.setdefault(node_name, []).append(document)
+        if self.on_document:
+            self.on_document(node_name, document, self)
+
+    @property
+    def has_output(self):
+        return bool(self.chunks)
+
+    def text(self, node_name=None):
+        """Return the joined output of ``node_name``, or of every output node."""
+        if node_name is not None:
+            return "".join(self.chunks.get(node_name, []))
+        return "".join("".join(chunks) for chunks in self.chunks.values())
+
+    def evaluation(self, node_name=None, required=()):
+        """Return the first complete evaluation object from the flow output.
+
+        As in ``parse_judge_output``, the first object wins, so an example
+        object the judge appends after its verdict is ignored. Falls back to a
+        tolerant parse of the whole output, which raises ``JudgeOutputError``
+        labelled with the failure reason.
+        """
+        names = [node_name] if node_name is not None else list(self.documents)
+        for name in names:
+            for document in self.documents.get(name, []):
+                if all(key in document for key in required):
+                    return document
+        return parse_judge_output(self.text(node_name), required)
@@ -0,0 +1,205 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import boto3
+from botocore.config import Config
+
+# Timeouts in seconds; any of them can be overridden in bedrock_config.json.
+DEFAULT_TIMEOUTS = {
+    "connectTimeout": 10,
+    "readTimeout": 120,
+    "requestDeadline": 300,
+}
+
+
+class FlowDeadlineExceeded(TimeoutError):
+    pass
+
+
+def client_config(config):
+    """Build a botocore ``Config`` with the connect/read timeouts from ``config``."""
+    timeouts = {**DEFAULT_TIMEOUTS, **config}
+    return Config(
+        connect_timeout=timeouts["connectTimeout"],
+        read_timeout=timeouts["readTimeout"],
+        retries={"max_attempts": config.get("maxAttempts", 3), "mode": "standard"},
+    )
+
+
+def create_runtime_client(region_name, config):
+    return boto3.client(
+        service_name="bedrock-agent-runtime",
+        region_name=region_name,
+        config=client_config(config),
+    )
+
+
+def request_deadline(config):
+    return config.get("requestDeadline", DEFAULT_TIMEOUTS["requestDeadline"])
+
+
+def _close_stream(event_stream):
+    raw_stream = getattr(event_stream, "_raw_stream", None)
+    # urllib3's shutdown() unblocks a read stuck in another thread; close()
+    # alone only takes effect once the blocked read returns.
+    if hasattr(raw_stream, "shutdown"):
+        raw_stream.shutdown()
+    if hasattr(event_stream, "close"):
+        event_stream.close()
+
+
+class StreamWatchdog:
+    """Close ``event_stream`` once ``expires_at`` (a ``time.monotonic`` value) passes."""
+
+    def __init__(self, event_stream, expires_at):
+        self.event_stream = event_stream
+        self.expires_at = expires_at
+        self.expired = False
+        self._timer = None
+
+    def _expire(self):
+        self.expired = True
+        try:
+            _close_stream(self.event_stream)
+        except Exception as e:
+            print(f"Error closing event stream: {e}")
+
+    def __enter__(self):
+        remaining = self.expires_at - time.monotonic()
+        if remaining <= 0:
+            self._expire()
+        else:
+            self._timer = threading.Timer(remaining, self._expire)
+            self._timer.daemon = True
+            self._timer.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._timer is not None:
+            self._timer.cancel()
+        return False
+
+
+def iter_flow_events(client, flow_id, flow_alias_id, document, deadline=None):
+    """Invoke a flow and yield its response stream events.
+
+    ``deadline`` bounds the whole request, including time spent waiting on a
+    stalled stream: a watchdog closes the stream when it passes and
+    ``FlowDeadlineExceeded`` is raised.
+    """
+    expires_at = None if deadline is None else time.monotonic() + deadline
+    response = client.invoke_flow(
+        flowIdentifier=flow_id,
+        flowAliasIdentifier=flow_alias_id,
+        inputs=[
+            {
+                "content": {"document": document},
+                "nodeName": "Start",
+                "nodeOutputName": "document",
+            }
+        ],
+    )
+    event_stream = response["responseStream"]
+    if expires_at is None:
+        yield from event_stream
+        return
+
+    with StreamWatchdog(event_stream, expires_at) as watchdog:
+        try:
+            for event in event_stream:
+                if watchdog.expired:
+                    break
+                yield event
+        except Exception as e:
+            if watchdog.expired:
+                raise FlowDeadlineExceeded(
+                    f"Flow invocation exceeded its {deadline}s deadline"
+                ) from e
+            raise
+    if watchdog.expired:
+        raise FlowDeadlineExceeded(f"Flow invocation exceeded its {deadline}s deadline")
+
+
+def _percentile(values, percentile):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(len(ordered) * percentile / 100))
+    return ordered[index]
+
+
+def run_hedged(
+    func,
+    items,
+    max_workers=8,
+    hedge_percentile=95,
+    min_samples=20,
+    max_hedges=1,
+    poll_interval=0.05,
+    latency_window=1000,
+):
+    """Apply ``func`` to ``items`` concurrently, hedging stragglers.
+
+    Once ``min_samples`` calls have completed, any call running longer than
+    the ``hedge_percentile`` latency of completed calls gets a duplicate
+    attempt; whichever attempt finishes first wins. ``hedge_percentile=None``
+    disables hedging. Results come back in input order; an item whose
+    attempts all raised holds the last exception.
+    """
+    items = list(items)
+    results = [None] * len(items)
+    done = [False] * len(items)
+    attempts = {}  # future -> (index, started)
+    running = [0] * len(items)
+    hedges = [0] * len(items)
+    latencies = deque(maxlen=latency_window)
+    next_index = 0
+    completed = 0
+
+    executor = ThreadPoolExecutor(max_workers=max_workers * (1 + max_hedges))
+
+    def submit(index):
+        future = executor.submit(func, items[index])
+        attempts[future] = (index, time.monotonic())
+        running[index] += 1
+
+    try:
+        while completed < len(items):
+            # Attempts left over from items that already finished don't hold a slot.
+            while next_index < len(items) and next_index - completed < max_workers:
+                submit(next_index)
+                next_index += 1
+
+            finished, _ = wait(
+                list(attempts), timeout=poll_interval, return_when=FIRST_COMPLETED
+            )
+            now = time.monotonic()
+            for future in finished:
+                index, started = attempts.pop(future)
+                running[index] -= 1
+                if done[index]:
+                    continue
+                error = future.exception()
+                if error is not None and running[index]:
+                    continue  # another attempt may still succeed
+                results[index] = error if error is not None else future.result()
+                done[index] = True
+                completed += 1
+                latencies.append(now - started)
+
+            if hedge_percentile is None or len(latencies) < min_samples:
+                continue
+            threshold = _percentile(latencies, hedge_percentile)
+            for index, started in list(attempts.values()):
+                if (
+                    not done[index]
+                    and hedges[index] < max_hedges
+                    and now - started > threshold
+                ):
+                    hedges[index] += 1
+                    submit(index)
+    finally:
+        # Losing attempts are abandoned rather than waited for.
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return results
@@ -1,32 +1,42 @@
 import boto3
+from typing import List
 from .models import FlowDefinition
+from .deployment import DeploymentPlanner, FlowSpec, format_plan
 
 
 class BedrockFlowUpdater:
-    def __init__(self):
-        self.bedrock_agent = boto3.client("bedrock-agent")
+    def __init__(self, bedrock_agent=None, max_workers: int = 8):
+        self.bedrock_agent = bedrock_agent or boto3.client("bedrock-agent")
+        self.planner = DeploymentPlanner(self.bedrock_agent, max_workers=max_workers)
 
     def create_or_update_flow(
         self, flow: FlowDefinition, flow_name: str, role_arn: str
     ):
-        try:
-            # Try to get the existing flow
-            existing_flow = self.bedrock_agent.get_flow(flowIdentifier=flow_name)
+        spec = FlowSpec(
+            name=flow_name,
+            definition=flow,
+            role_arn=role_arn,
+            description=f"Flow: {flow_name}",
+        )
+        (result,) = self.deploy([spec])
+        if result.error:
+            raise RuntimeError(f"Failed to deploy {flow_name}: {result.error}")
+        return result.flow_arn
 
-            # If the flow exists, update it
-            response = self.bedrock_agent.update_flow(
-                flowIdentifier=flow_name, definition=flow.dict()
-            )
-            print(f"Flow updated: {response['flowArn']}")
+    def deploy(self, specs: List[FlowSpec], dry_run: bool = False):
+        """Deploy many flows concurrently, skipping those that are unchanged.
 
-        except self.bedrock_agent.exceptions.ResourceNotFoundException:
-            # If the flow doesn't exist, create a new one
-            response = self.bedrock_agent.create_flow(
-                name=flow_name,
-                description=f"Flow: {flow_name}",
-                executionRoleArn=role_arn,
-                definition=flow.dict(),
-            )
-            print(f"Flow created: {response['flowArn']}")
+        With ``dry_run`` the plan is printed and nothing is changed.
+        """
+        plan = self.planner.plan(specs)
+        print(format_plan(plan))
+        if dry_run:
+            return []
 
-        return response["flowArn"]
+        results = self.planner.apply(specs, plan)
+        for result in results:
+            if result.error:
+                print(f"Flow {result.name} failed: {result.error}")
+            elif result.action != "noop":
+                print(f"Flow {result.action}d: {result.flow_arn}")
+        return results
@@ -0,0 +1,350 @@
+import hashlib
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Literal, Optional
+
+from botocore.exceptions import ClientError
+from pydantic import BaseModel
+
+from .graph import FlowGraphError
+from .models import TYPED_NODES, FlowDefinition
+from .resource_index import ResourceIndex, ResourceRef
+from .waiter import FlowPreparationWaiter
+
+
+class FlowSpec(BaseModel):
+    name: str
+    definition: FlowDefinition
+    role_arn: str
+    description: str = ""
+    alias: Optional[str] = None
+
+
+class PlannedChange(BaseModel):
+    name: str
+    action: Literal["create", "update", "noop"]
+    flow_id: Optional[str] = None
+    flow_arn: Optional[str] = None
+    local_hash: str
+    deployed_hash: Optional[str] = None
+    reasons: List[str] = []
+
+
+class DeploymentResult(BaseModel):
+    name: str
+    action: str
+    flow_id: Optional[str] = None
+    flow_arn: Optional[str] = None
+    version: Optional[str] = None
+    alias_id: Optional[str] = None
+    prepare_seconds: Optional[float] = None
+    error: Optional[str] = None
+
+
+def _config_key(node_type: str) -> str:
+    return node_type[0].lower() + node_type[1:]
+
+
+def to_bedrock_definition(flow: FlowDefinition) -> Dict[str, Any]:
+    """Convert a ``FlowDefinition`` to the shape the bedrock-agent API expects.
+
+    Node configurations are nested under the camel-cased node type, e.g.
+    ``{"lambdaFunction": {"lambdaArn": ...}}``.
+    """
+    nodes = []
+    for node in flow.nodes:
+        key = _config_key(node.type)
+        body = node.configuration.model_dump(exclude_none=True)
+        if list(body) == [key]:
+            body = body[key]
+        entry = {"name": node.name, "type": node.type, "configuration": {key: body}}
+        if node.inputs:
+            entry["inputs"] = [i.model_dump() for i in node.inputs]
+        if node.outputs:
+            entry["outputs"] = [o.model_dump() for o in node.outputs]
+        nodes.append(entry)
+
+    connections = [
+        {
+            "name": conn.name,
+            "source": conn.source,
+            "target": conn.target,
+            "type": conn.type,
+            "configuration": {
+                key: value.model_dump() for key, value in conn.configuration.items()
+            },
+        }
+        for conn in flow.connections
+    ]
+    return {"nodes": nodes, "connections": connections}
+
+
+def from_bedrock_definition(definition: Dict[str, Any]) -> FlowDefinition:
+    """Build a ``FlowDefinition`` from a bedrock-agent definition, the inverse
+    of ``to_bedrock_definition``."""
+    nodes = []
+    for node in definition.get("nodes", []):
+        key = _config_key(node["type"])
+        configuration = node.get("configuration") or {}
+        body = configuration.get(key, configuration)
+        typed = TYPED_NODES.get(node["type"])
+        if typed and key in typed.model_fields["configuration"].annotation.model_fields:
+            body = {key: body}
+        nodes.append({**node, "configuration": body})
+    return FlowDefinition(nodes=nodes, connections=definition.get("connections", []))
+
+
+def _prune(value):
+    if isinstance(value, dict):
+        pruned = {k: _prune(v) for k, v in value.items()}
+        return {k: v for k, v in pruned.items() if v not in (None, [], {})}
+    if isinstance(value, list):
+        return [_prune(v) for v in value]
+    return value
+
+
+def definition_hash(definition: Dict[str, Any]) -> str:
+    """Hash a bedrock-agent flow definition independently of ordering and empty fields."""
+    normalized = _prune(definition)
+    normalized["nodes"] = sorted(normalized.get("nodes", []), key=lambda n: n["name"])
+    normalized["connections"] = sorted(
+        normalized.get("connections", []), key=lambda c: c["name"]
+    )
+    encoded = json.dumps(normalized, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+def flow_hash(flow: FlowDefinition) -> str:
+    return definition_hash(to_bedrock_definition(flow))
+
+
+class DeploymentPlanner:
+    """Plan and apply deployments of many flows at once.
+
+    Planning lists flows once through ``ResourceIndex``, fetches deployed
+    definitions concurrently and compares content hashes, so unchanged flows
+    become no-ops. Applying runs create/update, prepare, version and alias
+    steps for each changed flow in parallel.
+    """
+
+    def __init__(
+        self,
+        bedrock_agent,
+        index: Optional[ResourceIndex] = None,
+        max_workers: int = 8,
+        prepare_timeout: float = 300.0,
+    ):
+        self.bedrock_agent = bedrock_agent
+        self.index = index or ResourceIndex(bedrock_agent)
+        self.max_workers = max_workers
+        self.waiter = FlowPreparationWaiter(
+            bedrock_agent, timeout=prepare_timeout, max_workers=max_workers
+        )
+
+    def _plan_one(
+        self, spec: FlowSpec, ref: Optional[ResourceRef]
+    ) -> Optional[PlannedChange]:
+        """Plan one flow; returns None if ``ref`` no longer exists."""
+        local_hash = flow_hash(spec.definition)
+        if ref is None:
+            return PlannedChange(
+                name=spec.name,
+                action="create",
+                local_hash=local_hash,
+                reasons=["flow does not exist"],
+            )
+
+        try:
+            deployed = self.bedrock_agent.get_flow(flowIdentifier=ref.id)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") == "ResourceNotFoundException":
+                return None
+            raise
+        deployed_hash = definition_hash(deployed.get("definition") or {})
+        reasons = []
+        if deployed_hash != local_hash:
+            reasons.append("definition changed")
+        if deployed.get("executionRoleArn") != spec.role_arn:
+            reasons.append("execution role changed")
+        if (deployed.get("description") or "") != spec.description:
+            reasons.append("description changed")
+        # A deploy that stopped part way leaves the flow unprepared or without
+        # its alias; redeploy it even though the definition matches.
+        if deployed.get("status") != "Prepared":
+            reasons.append(f"flow is {deployed.get('status') or 'not prepared'}")
+        if spec.alias:
+            alias = self._find_alias(ref.id, spec.alias)
+            if alias is None:
+                reasons.append("alias missing")
+            elif not alias.get("routingConfiguration"):
+                reasons.append("alias has no routing")
+        return PlannedChange(
+            name=spec.name,
+            action="update" if reasons else "noop",
+            flow_id=ref.id,
+            flow_arn=ref.arn,
+            local_hash=local_hash,
+            deployed_hash=deployed_hash,
+            reasons=reasons,
+        )
+
+    def plan(self, specs: List[FlowSpec]) -> List[PlannedChange]:
+        """Compare ``specs`` with what is deployed.
+
+        Raises ``FlowGraphError`` before any API call if a definition is not a
+        valid graph.
+        """
+        problems = [
+            f"{spec.name}: {problem}"
+            for spec in specs
+            for problem in spec.definition.graph.problems
+        ]
+        if problems:
+            raise FlowGraphError(problems)
+        refs = self.index.lookup_flows([spec.name for spec in specs])
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            changes = list(
+                executor.map(lambda spec: self._plan_one(spec, refs[spec.name]), specs)
+            )
+        # Flows deleted since the index was cached: list once more and re-plan.
+        stale = [spec for spec, change in zip(specs, changes) if change is None]
+        if stale:
+            refs = self.index.lookup_flows([spec.name for spec in stale], refresh=True)
+            replanned = {
+                spec.name: self._plan_one(spec, refs[spec.name])
+                or self._plan_one(spec, None)
+                for spec in stale
+            }
+            changes = [
+                change or replanned[spec.name] for spec, change in zip(specs, changes)
+            ]
+        return changes
+
+    def _find_alias(self, flow_id: str, alias: str) -> Optional[dict]:
+        existing = None
+        paginator = self.bedrock_agent.get_paginator("list_flow_aliases")
+        for page in paginator.paginate(flowIdentifier=flow_id):
+            for summary in page.get("flowAliasSummaries", []):
+                if summary["name"] == alias:
+                    existing = summary
+        return existing
+
+    def _upsert_alias(self, flow_id: str, alias: str, version: str) -> str:
+        routing = [{"flowVersion": version}]
+        existing = self._find_alias(flow_id, alias)
+        if existing:
+            response = self.bedrock_agent.update_flow_alias(
+                flowIdentifier=flow_id,
+                aliasIdentifier=existing["id"],
+                name=alias,
+                routingConfiguration=routing,
+            )
+        else:
+            response = self.bedrock_agent.create_flow_alias(
+                flowIdentifier=flow_id,
+                name=alias,
+                description=f"Alias for {alias}",
+                routingConfiguration=routing,
+            )
+        return response["id"]
+
+    def _submit_one(self, spec: FlowSpec, change: PlannedChange) -> DeploymentResult:
+        result = DeploymentResult(
+            name=spec.name,
+            action=change.action,
+            flow_id=change.flow_id,
+            flow_arn=change.flow_arn,
+        )
+        if change.action == "noop":
+            return result
+        try:
+            definition = to_bedrock_definition(spec.definition)
+            if change.action == "create":
+                response = self.bedrock_agent.create_flow(
+                    name=spec.name,
+                    description=spec.description,
+                    executionRoleArn=spec.role_arn,
+                    definition=definition,
+                )
+            else:
+                response = self.bedrock_agent.update_flow(
+                    flowIdentifier=change.flow_id,
+                    name=spec.name,
+                    description=spec.description,
+                    executionRoleArn=spec.role_arn,
+                    definition=definition,
+                )
+            result.flow_id = response["id"]
+            result.flow_arn = response["arn"]
+            self.bedrock_agent.prepare_flow(flowIdentifier=result.flow_id)
+        except Exception as e:
+            result.error = str(e)
+        return result
+
+    def _publish_one(self, spec: FlowSpec, result: DeploymentResult):
+        if result.action == "noop" or result.error or not spec.alias:
+            return
+        try:
+            version = self.bedrock_agent.create_flow_version(
+                flowIdentifier=result.flow_id
+            )["version"]
+            result.version = version
+            result.alias_id = self._upsert_alias(result.flow_id, spec.alias, version)
+        except Exception as e:
+            result.error = str(e)
+
+    def apply(
+        self, specs: List[FlowSpec], plan: Optional[List[PlannedChange]] = None
+    ) -> List[DeploymentResult]:
+        plan = plan or self.plan(specs)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = list(executor.map(self._submit_one, specs, plan))
+
+            # One polling loop waits for every flow that was submitted.
+            started_at = self.waiter.clock()
+            pending = {
+                result.flow_id: result
+                for result in results
+                if result.action != "noop" and not result.error
+            }
+            prepared = self.waiter.wait(
+                pending, {flow_id: started_at for flow_id in pending}
+            )
+            for flow_id, outcome in prepared.items():
+                result = pending[flow_id]
+                result.prepare_seconds = outcome.latency
+                if not outcome.prepared:
+                    result.error = f"Flow {flow_id} preparation {outcome.status}" + (
+                        f": {outcome.error}" if outcome.error else ""
+                    )
+
+            list(executor.map(self._publish_one, specs, results))
+
+        # Recorded here rather than in the workers so the cache file is
+        # written from one thread.
+        for result in results:
+            if result.action == "create" and result.flow_id:
+                self.index.record(
+                    "flows",
+                    result.name,
+                    ResourceRef(id=result.flow_id, arn=result.flow_arn),
+                )
+        return results
+
+
+def format_plan(plan: List[PlannedChange]) -> str:
+    symbols = {"create": "+", "update": "~", "noop": "="}
+    lines = []
+    for change in plan:
+        reasons = f" ({', '.join(change.reasons)})" if change.reasons else ""
+        lines.append(
+            f"{symbols[change.action]} {change.name}: {change.action}{reasons}"
+        )
+    counts = {action: 0 for action in symbols}
+    for change in plan:
+        counts[change.action] += 1
+    lines.append(
+        f"{counts['create']} to create, {counts['update']} to update, "
+        f"{counts['noop']} unchanged"
+    )
+    return "\n".join(lines)
@@ -0,0 +1,197 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from .models import FlowDefinition
+
+
+class NodeCost(BaseModel):
+    latency: float  # seconds
+    cost: float = 0.0  # USD per invocation
+
+
+# Rough starting points for on-demand usage; configure or learn real values.
+DEFAULT_NODE_COSTS = {
+    "Input": NodeCost(latency=0.0),
+    "Output": NodeCost(latency=0.0),
+    "LambdaFunction": NodeCost(latency=0.2, cost=0.000005),
+    "KnowledgeBase": NodeCost(latency=0.8, cost=0.0004),
+    "Prompt": NodeCost(latency=3.0, cost=0.006),
+}
+UNKNOWN_NODE_COST = NodeCost(latency=0.1)
+
+
+class CostModel(BaseModel):
+    """Expected latency and cost of a node, by node name first, then node type."""
+
+    by_type: Dict[str, NodeCost] = dict(DEFAULT_NODE_COSTS)
+    by_name: Dict[str, NodeCost] = {}
+    default: NodeCost = UNKNOWN_NODE_COST
+
+    def node_cost(self, name: str, node_type: str) -> NodeCost:
+        return self.by_name.get(name) or self.by_type.get(node_type) or self.default
+
+    @classmethod
+    def from_samples(
+        cls,
+        samples: Iterable[Tuple[str, float, float]],
+        base: Optional["CostModel"] = None,
+    ) -> "CostModel":
+        """Average ``(node_type, latency, cost)`` samples into a model.
+
+        Types without samples keep the values from ``base``.
+        """
+        totals = defaultdict(lambda: [0, 0.0, 0.0])
+        for node_type, latency, cost in samples:
+            total = totals[node_type]
+            total[0] += 1
+            total[1] += latency
+            total[2] += cost
+        base = base or cls()
+        by_type = dict(base.by_type)
+        for node_type, (count, latency, cost) in totals.items():
+            by_type[node_type] = NodeCost(latency=latency / count, cost=cost / count)
+        return cls(by_type=by_type, by_name=base.by_name, default=base.default)
+
+    @classmethod
+    def from_traces(
+        cls,
+        flow: FlowDefinition,
+        traces: Iterable[dict],
+        base: Optional["CostModel"] = None,
+    ) -> "CostModel":
+        """Learn node-type latencies from recorded ``invoke_flow`` traces.
+
+        ``traces`` are ``flowTraceEvent`` payloads (as kept by
+        ``FlowEventConsumer(keep_traces=True)``) from runs of ``flow``. A
+        node's latency is the time from its input trace to its output trace;
+        costs are taken from ``base``.
+        """
+        base = base or cls()
+        types = {node.name: node.type for node in flow.nodes}
+        samples = [
+            (types[name], latency, base.node_cost(name, types[name]).cost)
+            for name, latency in trace_latencies(traces)
+            if name in types
+        ]
+        return cls.from_samples(samples, base)
+
+
+def _timestamp(value) -> float:
+    if isinstance(value, datetime):
+        return value.timestamp()
+    if isinstance(value, str):
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    return float(value)
+
+
+def trace_latencies(traces: Iterable[dict]) -> List[Tuple[str, float]]:
+    """``(node name, seconds)`` for each node input/output trace pair."""
+    started: Dict[str, List[float]] = defaultdict(list)
+    latencies = []
+    for payload in traces:
+        trace = payload.get("flowTraceEvent", payload).get("trace", {})
+        if "nodeInputTrace" in trace:
+            event = trace["nodeInputTrace"]
+            started[event["nodeName"]].append(_timestamp(event["timestamp"]))
+        elif "nodeOutputTrace" in trace:
+            event = trace["nodeOutputTrace"]
+            if started[event["nodeName"]]:
+                start = started[event["nodeName"]].pop(0)
+                latencies.append(
+                    (event["nodeName"], _timestamp(event["timestamp"]) - start)
+                )
+    return latencies
+
+
+class FlowEstimate(BaseModel):
+    latency: float
+    sequential_latency: float
+    cost: float
+    critical_path: List[str]
+    dominant_node: Optional[str]
+    node_costs: Dict[str, NodeCost]
+    slack: Dict[str, float]
+
+    @property
+    def parallel_savings(self) -> float:
+        """Seconds saved by running independent branches concurrently."""
+        return self.sequential_latency - self.latency
+
+
+def estimate_flow(
+    flow: FlowDefinition, model: Optional[CostModel] = None
+) -> FlowEstimate:
+    """Estimate one invocation of ``flow``, assuming independent branches run
+    in parallel and each node starts when all of its predecessors finish.
+
+    The critical path is the longest chain of node latencies; ``slack`` is how
+    much a node could slow down without delaying the flow.
+    """
+    model = model or CostModel()
+    graph = flow.graph
+    graph.check()
+    order = graph.topological_order
+    costs = {name: model.node_cost(name, graph.nodes[name].type) for name in order}
+
+    finish: Dict[str, float] = {}
+    critical_parent: Dict[str, Optional[str]] = {}
+    for name in order:
+        parent = max(graph.predecessors(name), key=finish.get, default=None)
+        start = finish[parent] if parent else 0.0
+        finish[name] = start + costs[name].latency
+        critical_parent[name] = parent
+
+    latency = max(finish.values(), default=0.0)
+    latest_finish: Dict[str, float] = {}
+    for name in reversed(order):
+        latest_finish[name] = min(
+            (
+                latest_finish[successor] - costs[successor].latency
+                for successor in graph.successors(name)
+            ),
+            default=latency,
+        )
+
+    path = []
+    # Last of the nodes that finish latest, so zero-latency Output nodes are
+    # included in the path.
+    name = max(reversed(order), key=finish.get, default=None)
+    while name is not None:
+        path.append(name)
+        name = critical_parent[name]
+    path.reverse()
+
+    dominant = max(path, key=lambda n: costs[n].latency, default=None)
+    return FlowEstimate(
+        latency=latency,
+        sequential_latency=sum(cost.latency for cost in costs.values()),
+        cost=sum(cost.cost for cost in costs.values()),
+        critical_path=path,
+        dominant_node=dominant,
+        node_costs=costs,
+        slack={name: latest_finish[name] - finish[name] for name in order},
+    )
+
+
+def format_estimate(estimate: FlowEstimate) -> str:
+    lines = [
+        f"Expected latency: {estimate.latency:.2f}s "
+        f"(sequential {estimate.sequential_latency:.2f}s, "
+        f"parallelism saves {estimate.parallel_savings:.2f}s)",
+        f"Cost per input: ${estimate.cost:.6f}",
+        "Critical path: " + " -> ".join(estimate.critical_path),
+    ]
+    if estimate.dominant_node and estimate.latency:
+        share = estimate.node_costs[estimate.dominant_node].latency / estimate.latency
+        lines.append(
+            f"Dominant node: {estimate.dominant_node} ({share:.0%} of latency)"
+        )
+    for name, cost in estimate.node_costs.items():
+        lines.append(
+            f"  {name}: {cost.latency:.2f}s, ${cost.cost:.6f}, "
+            f"slack {estimate.slack[name]:.2f}s"
+        )
+    return "\n".join(lines)
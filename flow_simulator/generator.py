@@ -0,0 +1,174 @@
+import copy
+import hashlib
+import itertools
+import json
+import re
+from string import Template
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from .deployment import FlowSpec, definition_hash, from_bedrock_definition
+from .models import FlowDefinition
+
+PLACEHOLDER = re.compile(r"\$([A-Z_][A-Z0-9_]*)")
+WHOLE_PLACEHOLDER = re.compile(r"^\$([A-Z_][A-Z0-9_]*)$")
+
+Path = Tuple[Any, ...]
+
+
+class FlowVariant(BaseModel):
+    name: str
+    parameters: Dict[str, Any]
+    definition: FlowDefinition
+    content_hash: str
+
+    def to_spec(self, role_arn: str, description: str = "", alias=None) -> FlowSpec:
+        return FlowSpec(
+            name=self.name,
+            definition=self.definition,
+            role_arn=role_arn,
+            description=description,
+            alias=alias,
+        )
+
+
+def parameter_grid(**axes: Iterable[Any]) -> List[Dict[str, Any]]:
+    """Every combination of the given axes, e.g.
+    ``parameter_grid(MODEL_INVOKE_ID=[a, b], TEMPERATURE=[0, 0.5])``."""
+    names = list(axes)
+    return [
+        dict(zip(names, values))
+        for values in itertools.product(*(list(axes[name]) for name in names))
+    ]
+
+
+def _parameters_hash(parameters: Dict[str, Any]) -> str:
+    encoded = json.dumps(parameters, sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+class FlowTemplate:
+    """A bedrock-agent flow definition with ``$NAME`` placeholders.
+
+    A string that is exactly ``"$NAME"`` is replaced by the parameter value
+    whatever its type; placeholders inside longer strings are substituted as
+    text. Other values can be made parameters with ``bind``. The template is
+    scanned once; rendering copies only the containers on the way to a
+    placeholder and shares everything else with the template.
+    """
+
+    def __init__(
+        self,
+        template: Dict[str, Any],
+        defaults: Optional[Dict[str, Any]] = None,
+        name_prefix: str = "flow",
+    ):
+        self.template = template
+        self.defaults = dict(defaults or {})
+        self.name_prefix = name_prefix
+        # Nested dict of the keys leading to each slot; leaves are
+        # ("whole", name), ("text", Template) or ("bound", name).
+        self._slots: Dict[Any, Any] = {}
+        self.required = set()
+        self._compile(template, ())
+
+    @classmethod
+    def from_file(cls, path: str, **kwargs) -> "FlowTemplate":
+        with open(path, "r") as f:
+            return cls(json.load(f), **kwargs)
+
+    def _add_slot(self, path: Path, slot):
+        node = self._slots
+        for key in path[:-1]:
+            node = node.setdefault(key, {})
+        node[path[-1]] = slot
+
+    def _compile(self, value, path: Path):
+        if isinstance(value, dict):
+            for key, child in value.items():
+                self._compile(child, path + (key,))
+        elif isinstance(value, list):
+            for index, child in enumerate(value):
+                self._compile(child, path + (index,))
+        elif isinstance(value, str):
+            whole = WHOLE_PLACEHOLDER.match(value)
+            if whole:
+                self._add_slot(path, ("whole", whole.group(1)))
+                self.required.add(whole.group(1))
+            elif PLACEHOLDER.search(value):
+                self._add_slot(path, ("text", Template(value)))
+                self.required.update(PLACEHOLDER.findall(value))
+
+    def bind(self, name: str, node_name: str, *keys) -> "FlowTemplate":
+        """Make the value at ``keys`` in a node's configuration a parameter.
+
+        The parameter is optional; variants without it keep the template's
+        value. Returns the template for chaining.
+        """
+        for index, node in enumerate(self.template["nodes"]):
+            if node["name"] == node_name:
+                self._add_slot(
+                    ("nodes", index, "configuration") + tuple(keys), ("bound", name)
+                )
+                return self
+        raise ValueError(f"Template has no node named {node_name!r}")
+
+    def _render(self, value, slots, parameters):
+        if isinstance(slots, tuple):
+            kind, arg = slots
+            if kind == "text":
+                return arg.safe_substitute(parameters)
+            if kind == "bound" and arg not in parameters:
+                return value
+            return copy.deepcopy(parameters[arg])
+        rendered = copy.copy(value)
+        for key, child_slots in slots.items():
+            rendered[key] = self._render(value[key], child_slots, parameters)
+        return rendered
+
+    def render_definition(self, parameters: Dict[str, Any]) -> Dict[str, Any]:
+        """Render the template to a bedrock-agent definition dict."""
+        parameters = {**self.defaults, **parameters}
+        missing = self.required - set(parameters)
+        if missing:
+            raise ValueError(
+                f"Missing template parameters: {', '.join(sorted(missing))}"
+            )
+        return self._render(self.template, self._slots, parameters)
+
+    def render(self, parameters: Dict[str, Any]) -> FlowVariant:
+        definition = self.render_definition(parameters)
+        return FlowVariant(
+            name=f"{self.name_prefix}-{_parameters_hash(parameters)[:10]}",
+            parameters=parameters,
+            definition=from_bedrock_definition(definition),
+            content_hash=definition_hash(definition),
+        )
+
+    def render_grid(self, grid: Iterable[Dict[str, Any]]) -> List[FlowVariant]:
+        """Render one variant per parameter set, dropping identical definitions."""
+        variants = []
+        seen = set()
+        for parameters in grid:
+            variant = self.render(parameters)
+            if variant.content_hash not in seen:
+                seen.add(variant.content_hash)
+                variants.append(variant)
+        return variants
+
+
+def prompt_eval_template(
+    path: str = "07_prompt_eval_flow_defn.json", name_prefix: str = "prompt-eval"
+) -> FlowTemplate:
+    """The prompt evaluation flow, parameterized by ``MODEL_INVOKE_ID``,
+    ``PROMPT_EVAL_ARN`` and optionally ``INFERENCE_CONFIG`` (the Invoke node's
+    ``inferenceConfiguration``)."""
+    return FlowTemplate.from_file(path, name_prefix=name_prefix).bind(
+        "INFERENCE_CONFIG",
+        "Invoke",
+        "prompt",
+        "sourceConfiguration",
+        "inline",
+        "inferenceConfiguration",
+    )
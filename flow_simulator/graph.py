@@ -0,0 +1,150 @@
+from collections import defaultdict, deque
+from typing import TYPE_CHECKING, Dict, List, Tuple
+
+if TYPE_CHECKING:
+    from .models import FlowConnection, FlowDefinition, FlowNode
+
+Port = Tuple[str, str]  # (node name, input or output name)
+
+
+class FlowGraphError(ValueError):
+    def __init__(self, problems: List[str]):
+        super().__init__("Invalid flow: " + "; ".join(problems))
+        self.problems = problems
+
+
+class FlowGraph:
+    """Indexes over a ``FlowDefinition``, built in one O(nodes + connections) pass.
+
+    Obtain it through ``FlowDefinition.graph``, which caches it until the
+    flow's nodes or connections change.
+    """
+
+    def __init__(self, flow: "FlowDefinition"):
+        self.nodes: Dict[str, "FlowNode"] = {}
+        self.outgoing: Dict[str, List["FlowConnection"]] = defaultdict(list)
+        self.incoming: Dict[str, List["FlowConnection"]] = defaultdict(list)
+        self.from_port: Dict[Port, List["FlowConnection"]] = defaultdict(list)
+        self.to_port: Dict[Port, List["FlowConnection"]] = defaultdict(list)
+        self.input_types: Dict[Port, str] = {}
+        self.output_types: Dict[Port, str] = {}
+        self.problems: List[str] = []
+
+        for node in flow.nodes:
+            if node.name in self.nodes:
+                self.problems.append(f"duplicate node name {node.name!r}")
+                continue
+            self.nodes[node.name] = node
+            for port in node.inputs:
+                self.input_types[(node.name, port.name)] = port.type
+            for port in node.outputs:
+                self.output_types[(node.name, port.name)] = port.type
+
+        connection_names = set()
+        for conn in flow.connections:
+            if conn.name in connection_names:
+                self.problems.append(f"duplicate connection name {conn.name!r}")
+            connection_names.add(conn.name)
+            self._check_connection(conn)
+            self.outgoing[conn.source].append(conn)
+            self.incoming[conn.target].append(conn)
+            data = conn.configuration.get("data")
+            if data is not None:
+                self.from_port[(conn.source, data.sourceOutput)].append(conn)
+                self.to_port[(conn.target, data.targetInput)].append(conn)
+
+        self.topological_order, self.cycle = self._sort()
+        if self.cycle:
+            self.problems.append("cycle: " + " -> ".join(self.cycle))
+
+    def _check_connection(self, conn: "FlowConnection"):
+        missing = [
+            end
+            for end, name in (("source", conn.source), ("target", conn.target))
+            if name not in self.nodes
+        ]
+        for end in missing:
+            node_name = getattr(conn, end)
+            self.problems.append(
+                f"connection {conn.name!r} {end} {node_name!r} is not a node"
+            )
+        data = conn.configuration.get("data")
+        if missing or data is None:
+            return
+        source_type = self.output_types.get((conn.source, data.sourceOutput))
+        target_type = self.input_types.get((conn.target, data.targetInput))
+        if source_type is None:
+            self.problems.append(
+                f"connection {conn.name!r}: {conn.source!r} has no output "
+                f"{data.sourceOutput!r}"
+            )
+        if target_type is None:
+            self.problems.append(
+                f"connection {conn.name!r}: {conn.target!r} has no input "
+                f"{data.targetInput!r}"
+            )
+        if source_type and target_type and source_type != target_type:
+            self.problems.append(
+                f"connection {conn.name!r}: {conn.source}.{data.sourceOutput} is "
+                f"{source_type} but {conn.target}.{data.targetInput} is {target_type}"
+            )
+
+    def _sort(self):
+        """Kahn's algorithm in declaration order, plus one cycle if there is any."""
+        in_degree = {name: 0 for name in self.nodes}
+        for name in self.nodes:
+            for conn in self.outgoing.get(name, ()):
+                if conn.target in in_degree:
+                    in_degree[conn.target] += 1
+
+        ready = deque(name for name, degree in in_degree.items() if degree == 0)
+        order = []
+        while ready:
+            name = ready.popleft()
+            order.append(name)
+            for conn in self.outgoing.get(name, ()):
+                if conn.target in in_degree:
+                    in_degree[conn.target] -= 1
+                    if in_degree[conn.target] == 0:
+                        ready.append(conn.target)
+
+        if len(order) == len(self.nodes):
+            return order, None
+        # Every node left over lies on or downstream of a cycle; walking
+        # backwards along unsorted predecessors must revisit a node.
+        remaining = {name for name, degree in in_degree.items() if degree > 0}
+        name = next(iter(remaining))
+        path: List[str] = []
+        seen: Dict[str, int] = {}
+        while name not in seen:
+            seen[name] = len(path)
+            path.append(name)
+            name = next(
+                conn.source for conn in self.incoming[name] if conn.source in remaining
+            )
+        cycle = path[seen[name] :][::-1]
+        return order, cycle + [cycle[0]]
+
+    def in_degree(self, name: str) -> int:
+        return len(self.incoming.get(name, ()))
+
+    def out_degree(self, name: str) -> int:
+        return len(self.outgoing.get(name, ()))
+
+    def successors(self, name: str) -> List[str]:
+        return list(dict.fromkeys(conn.target for conn in self.outgoing.get(name, ())))
+
+    def predecessors(self, name: str) -> List[str]:
+        return list(dict.fromkeys(conn.source for conn in self.incoming.get(name, ())))
+
+    def nodes_of_type(self, node_type: str) -> List["FlowNode"]:
+        return [node for node in self.nodes.values() if node.type == node_type]
+
+    @property
+    def is_valid(self) -> bool:
+        return not self.problems
+
+    def check(self):
+        """Raise ``FlowGraphError`` listing every problem found, if any."""
+        if self.problems:
+            raise FlowGraphError(self.problems)
@@ -3,6 +3,8 @@ from .simulator import FlowSimulator
 from .utils import save_flow_to_json, load_flow_from_json
 from .visualizer import generate_mermaid
 from .bedrock_updater import BedrockFlowUpdater
+from .deployment import FlowSpec
+from .estimator import estimate_flow, format_estimate
 
 
 def main():
@@ -39,6 +41,7 @@ def main():
 
     print("\nKnowledge Base Flow:")
     print(generate_mermaid(kb_flow))
+    print(format_estimate(estimate_flow(kb_flow)))
 
     kb_simulator = FlowSimulator(kb_flow)
     kb_result = kb_simulator.simulate("What is Amazon Bedrock?")
@@ -48,16 +51,16 @@ def main():
     updater = BedrockFlowUpdater()
     role_arn = "arn:aws:iam::123456789012:role/BedrockFlowRole"
 
-    identity_flow_arn = updater.create_or_update_flow(
-        identity_flow, "IdentityFlow", role_arn
-    )
-    upcase_flow_arn = updater.create_or_update_flow(upcase_flow, "UpcaseFlow", role_arn)
-    kb_flow_arn = updater.create_or_update_flow(kb_flow, "KnowledgeBaseFlow", role_arn)
+    specs = [
+        FlowSpec(name="IdentityFlow", definition=identity_flow, role_arn=role_arn),
+        FlowSpec(name="UpcaseFlow", definition=upcase_flow, role_arn=role_arn),
+        FlowSpec(name="KnowledgeBaseFlow", definition=kb_flow, role_arn=role_arn),
+    ]
+    results = updater.deploy(specs)
 
     print("\nUpdated Flow ARNs:")
-    print(f"Identity Flow ARN: {identity_flow_arn}")
-    print(f"Upcase Flow ARN: {upcase_flow_arn}")
-    print(f"Knowledge Base Flow ARN: {kb_flow_arn}")
+    for result in results:
+        print(f"{result.name} ARN: {result.flow_arn}")
 
 
 if __name__ == "__main__":
@@ -1,5 +1,14 @@
-from typing import List, Dict, Any, Optional
-from pydantic import BaseModel, Field
+from typing import Annotated, List, Dict, Any, Literal, Optional, Union
+from pydantic import (
+    BaseModel,
+    ConfigDict,
+    Discriminator,
+    Field,
+    PrivateAttr,
+    SerializeAsAny,
+    Tag,
+)
+from .graph import FlowGraph
 
 
 class FlowNodeInput(BaseModel):
@@ -14,7 +23,21 @@ class FlowNodeOutput(BaseModel):
 
 
 class FlowNodeConfiguration(BaseModel):
-    pass
+    # Keep settings this package does not model (e.g. a knowledge base
+    # node's modelId) so they survive a load/save round trip.
+    model_config = ConfigDict(extra="allow")
+
+
+class LambdaFunctionFlowNodeConfiguration(FlowNodeConfiguration):
+    lambdaArn: str
+
+
+class PromptFlowNodeConfiguration(FlowNodeConfiguration):
+    prompt: Dict[str, Any]
+
+
+class KnowledgeBaseFlowNodeConfiguration(FlowNodeConfiguration):
+    knowledgeBaseId: str
 
 
 class FlowNode(BaseModel):
@@ -22,7 +45,62 @@ class FlowNode(BaseModel):
     type: str
     inputs: List[FlowNodeInput] = []
     outputs: List[FlowNodeOutput] = []
-    configuration: FlowNodeConfiguration
+    configuration: SerializeAsAny[FlowNodeConfiguration]
+
+
+class InputFlowNode(FlowNode):
+    type: Literal["Input"] = "Input"
+    configuration: FlowNodeConfiguration = FlowNodeConfiguration()
+
+
+class OutputFlowNode(FlowNode):
+    type: Literal["Output"] = "Output"
+    configuration: FlowNodeConfiguration = FlowNodeConfiguration()
+
+
+class LambdaFunctionFlowNode(FlowNode):
+    type: Literal["LambdaFunction"] = "LambdaFunction"
+    configuration: LambdaFunctionFlowNodeConfiguration
+
+
+class PromptFlowNode(FlowNode):
+    type: Literal["Prompt"] = "Prompt"
+    configuration: PromptFlowNodeConfiguration
+
+
+class KnowledgeBaseFlowNode(FlowNode):
+    type: Literal["KnowledgeBase"] = "KnowledgeBase"
+    configuration: KnowledgeBaseFlowNodeConfiguration
+
+
+TYPED_NODES = {
+    cls.model_fields["type"].default: cls
+    for cls in (
+        InputFlowNode,
+        OutputFlowNode,
+        LambdaFunctionFlowNode,
+        PromptFlowNode,
+        KnowledgeBaseFlowNode,
+    )
+}
+
+
+def _node_tag(value) -> str:
+    # Node objects are kept as built; raw data is validated by its type, and
+    # types without a typed model fall back to a plain FlowNode.
+    if isinstance(value, FlowNode):
+        return "object"
+    node_type = value.get("type") if isinstance(value, dict) else None
+    return node_type if node_type in TYPED_NODES else "other"
+
+
+AnyFlowNode = Annotated[
+    Union[
+        tuple(Annotated[cls, Tag(tag)] for tag, cls in TYPED_NODES.items())
+        + (Annotated[FlowNode, Tag("object")], Annotated[FlowNode, Tag("other")])
+    ],
+    Discriminator(_node_tag),
+]
 
 
 class FlowDataConnectionConfiguration(BaseModel):
@@ -39,31 +117,57 @@ class FlowConnection(BaseModel):
 
 
 class FlowDefinition(BaseModel):
-    nodes: List[FlowNode]
+    nodes: List[AnyFlowNode]
     connections: List[FlowConnection]
 
-
-class LambdaFunctionFlowNodeConfiguration(FlowNodeConfiguration):
-    lambdaArn: str
-
-
-class PromptFlowNodeConfiguration(FlowNodeConfiguration):
-    prompt: Dict[str, Any]
-
-
-class KnowledgeBaseFlowNodeConfiguration(FlowNodeConfiguration):
-    knowledgeBaseId: str
+    _graph: Optional[FlowGraph] = PrivateAttr(default=None)
+    _graph_key: Optional[tuple] = PrivateAttr(default=None)
+
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        if name in ("nodes", "connections"):
+            self.invalidate_graph()
+
+    def _current_graph_key(self) -> tuple:
+        return (
+            id(self.nodes),
+            len(self.nodes),
+            id(self.connections),
+            len(self.connections),
+        )
+
+    @property
+    def graph(self) -> FlowGraph:
+        """The flow's ``FlowGraph``, built on first use and then cached.
+
+        The cache is dropped when ``nodes`` or ``connections`` is reassigned
+        or changes length; call ``invalidate_graph`` after editing a node or
+        connection in place.
+        """
+        key = self._current_graph_key()
+        if self._graph is None or self._graph_key != key:
+            self._graph = FlowGraph(self)
+            self._graph_key = key
+        return self._graph
+
+    def invalidate_graph(self):
+        self._graph = None
+        self._graph_key = None
+
+    def validate_graph(self):
+        """Raise ``FlowGraphError`` if the flow is not a well-formed graph."""
+        self.graph.check()
 
 
 def create_identity_flow() -> FlowDefinition:
-    input_node = FlowNode(
+    input_node = InputFlowNode(
         name="Start",
         type="Input",
         outputs=[FlowNodeOutput(name="document", type="String")],
         configuration=FlowNodeConfiguration(),
     )
 
-    output_node = FlowNode(
+    output_node = OutputFlowNode(
         name="End",
         type="Output",
         inputs=[FlowNodeInput(name="document", type="String")],
@@ -85,14 +189,14 @@ def create_identity_flow() -> FlowDefinition:
 
 
 def create_upcase_flow(lambda_arn: str) -> FlowDefinition:
-    input_node = FlowNode(
+    input_node = InputFlowNode(
         name="Start",
         type="Input",
         outputs=[FlowNodeOutput(name="document", type="String")],
         configuration=FlowNodeConfiguration(),
     )
 
-    upcase_node = FlowNode(
+    upcase_node = LambdaFunctionFlowNode(
         name="Upcase",
         type="LambdaFunction",
         inputs=[FlowNodeInput(name="input", type="String")],
@@ -100,7 +204,7 @@ def create_upcase_flow(lambda_arn: str) -> FlowDefinition:
         configuration=LambdaFunctionFlowNodeConfiguration(lambdaArn=lambda_arn),
     )
 
-    output_node = FlowNode(
+    output_node = OutputFlowNode(
         name="End",
         type="Output",
         inputs=[FlowNodeInput(name="document", type="String")],
@@ -138,14 +242,14 @@ def create_upcase_flow(lambda_arn: str) -> FlowDefinition:
 def create_knowledge_base_flow(
     knowledge_base_id: str, prompt_arn: str
 ) -> FlowDefinition:
-    input_node = FlowNode(
+    input_node = InputFlowNode(
         name="Start",
         type="Input",
         outputs=[FlowNodeOutput(name="document", type="String")],
         configuration=FlowNodeConfiguration(),
     )
 
-    kb_node = FlowNode(
+    kb_node = KnowledgeBaseFlowNode(
         name="QueryKnowledgeBase",
         type="KnowledgeBase",
         inputs=[FlowNodeInput(name="retrievalQuery", type="String")],
@@ -155,7 +259,7 @@ def create_knowledge_base_flow(
         ),
     )
 
-    prompt_node = FlowNode(
+    prompt_node = PromptFlowNode(
         name="GenerateResponse",
         type="Prompt",
         inputs=[
@@ -168,7 +272,7 @@ def create_knowledge_base_flow(
         ),
     )
 
-    output_node = FlowNode(
+    output_node = OutputFlowNode(
         name="End",
         type="Output",
         inputs=[FlowNodeInput(name="document", type="String")],
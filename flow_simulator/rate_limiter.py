@@ -0,0 +1,113 @@
+import fcntl
+import json
+import os
+import random
+import re
+import tempfile
+import time
+from typing import Dict, Optional
+
+DEFAULT_DIRECTORY = os.path.join(tempfile.gettempdir(), "bedrock-rate-limits")
+
+
+def estimate_tokens(text: str) -> int:
+    # Roughly four characters per token for English text.
+    return len(text) // 4 + 1
+
+
+class SharedRateLimiter:
+    """Token buckets per model id, shared by every process on the host.
+
+    Each model's bucket lives in a small JSON file under ``directory`` and is
+    updated under an exclusive ``flock``, so worker processes draw from one
+    budget without a broker. ``limits`` maps a model id to ``{"rpm": ...,
+    "tpm": ...}``; models without an entry are not limited. Buckets hold at
+    most ``burst_seconds`` worth of requests and tokens.
+    """
+
+    def __init__(
+        self,
+        limits: Dict[str, Dict[str, float]],
+        directory: str = DEFAULT_DIRECTORY,
+        burst_seconds: float = 1.0,
+    ):
+        self.limits = limits
+        self.directory = directory
+        self.burst_seconds = burst_seconds
+        os.makedirs(directory, exist_ok=True)
+
+    @classmethod
+    def from_config(cls, config: dict) -> Optional["SharedRateLimiter"]:
+        """Build a limiter from the ``rateLimits`` section of bedrock_config.json."""
+        if not config.get("rateLimits"):
+            return None
+        return cls(
+            config["rateLimits"],
+            directory=config.get("rateLimitDirectory", DEFAULT_DIRECTORY),
+        )
+
+    def _path(self, model_id: str) -> str:
+        return os.path.join(
+            self.directory, re.sub(r"[^A-Za-z0-9._-]", "_", model_id) + ".bucket"
+        )
+
+    def try_acquire(self, model_id: str, tokens: int = 0) -> float:
+        """Take one request and ``tokens`` tokens if available.
+
+        The bucket level may go negative after a request larger than its
+        capacity. Returns 0 on success, otherwise the seconds to wait before retrying.
+        """
+        limit = self.limits.get(model_id)
+        if not limit:
+            return 0.0
+
+        rates = {key: limit[key] / 60.0 for key in ("rpm", "tpm") if limit.get(key)}
+        wanted = {"rpm": 1, "tpm": tokens}
+
+        fd = os.open(self._path(model_id), os.O_RDWR | os.O_CREAT, 0o644)
+        with os.fdopen(fd, "r+") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                raw = f.read()
+                state = json.loads(raw) if raw else {}
+                now = time.time()
+                elapsed = max(0.0, now - state.get("updated", now))
+
+                available = {}
+                wait = 0.0
+                for key, rate in rates.items():
+                    capacity = max(rate * self.burst_seconds, 1.0)
+                    level = min(capacity, state.get(key, capacity) + elapsed * rate)
+                    # A request larger than the bucket goes through once it is
+                    # full; it is still charged in full, and the debt it leaves
+                    # holds back later requests until it is repaid.
+                    need = min(wanted[key], capacity)
+                    if level < need:
+                        wait = max(wait, (need - level) / rate)
+                    available[key] = level
+
+                if wait == 0.0:
+                    for key in rates:
+                        available[key] -= wanted[key]
+                available["updated"] = now
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps(available))
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+        return wait
+
+    def acquire(
+        self, model_id: str, tokens: int = 0, timeout: Optional[float] = None
+    ) -> float:
+        """Block until a request for ``model_id`` is allowed; returns seconds waited."""
+        start = time.monotonic()
+        while True:
+            wait = self.try_acquire(model_id, tokens)
+            if wait == 0.0:
+                return time.monotonic() - start
+            if timeout is not None and time.monotonic() - start + wait > timeout:
+                raise TimeoutError(f"Rate limit for {model_id} not available")
+            # Jitter keeps waiting processes from retrying in lockstep.
+            time.sleep(wait * random.uniform(1.0, 1.2))
@@ -0,0 +1,160 @@
+import json
+import os
+import time
+from typing import Dict, Iterable, Optional
+
+from pydantic import BaseModel
+
+DEFAULT_CACHE_PATH = ".bedrock_resource_index.json"
+
+# kind -> (paginated list operation, result key)
+LISTINGS = {
+    "flows": ("list_flows", "flowSummaries"),
+    "prompts": ("list_prompts", "promptSummaries"),
+}
+
+
+class ResourceRef(BaseModel):
+    id: str
+    arn: str
+    version: Optional[str] = None
+    status: Optional[str] = None
+
+
+class ResourceIndex:
+    """Name lookups for Bedrock flows and prompts from one paginated listing.
+
+    Each kind is listed in full at most once per ``ttl`` seconds and cached in
+    ``cache_path`` (per region), so a deploy of many flows resolves all of
+    their names with a single ``list_flows`` pass. A name missing from a
+    cached listing triggers one fresh listing before it is reported missing.
+    """
+
+    def __init__(
+        self,
+        bedrock_agent,
+        cache_path: Optional[str] = DEFAULT_CACHE_PATH,
+        ttl: float = 300.0,
+        region: Optional[str] = None,
+    ):
+        self.bedrock_agent = bedrock_agent
+        self.cache_path = cache_path
+        self.ttl = ttl
+        self.region = region or str(bedrock_agent.meta.region_name)
+        self._entries = self._load_cache()
+
+    def _key(self, kind: str) -> str:
+        return f"{self.region}:{kind}"
+
+    def _load_cache(self) -> dict:
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return {}
+        try:
+            with open(self.cache_path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable resource index cache: {e}")
+            return {}
+
+    def _save_cache(self):
+        if not self.cache_path:
+            return
+        tmp_path = self.cache_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self._entries, f)
+        os.replace(tmp_path, self.cache_path)
+
+    def _list(self, kind: str) -> Dict[str, dict]:
+        operation, result_key = LISTINGS[kind]
+        paginator = self.bedrock_agent.get_paginator(operation)
+        items = {}
+        for page in paginator.paginate():
+            for summary in page.get(result_key, []):
+                items[summary["name"]] = {
+                    "id": summary["id"],
+                    "arn": summary["arn"],
+                    "version": summary.get("version"),
+                    "status": summary.get("status"),
+                }
+        return items
+
+    def _items(self, kind: str, refresh: bool = False) -> Dict[str, dict]:
+        entry = self._entries.get(self._key(kind))
+        if refresh or entry is None or time.time() - entry["fetchedAt"] > self.ttl:
+            entry = {"fetchedAt": time.time(), "items": self._list(kind)}
+            self._entries[self._key(kind)] = entry
+            self._save_cache()
+        return entry["items"]
+
+    def _lookup(self, kind: str, names: Iterable[str], refresh: bool):
+        names = list(names)
+        cached = self._entries.get(self._key(kind))
+        items = self._items(kind, refresh)
+        # The resource may have been created since the cached listing.
+        if self._entries.get(self._key(kind)) is cached and any(
+            name not in items for name in names
+        ):
+            items = self._items(kind, refresh=True)
+        return {
+            name: ResourceRef(**items[name]) if name in items else None
+            for name in names
+        }
+
+    def flows(self, refresh: bool = False) -> Dict[str, ResourceRef]:
+        return {
+            name: ResourceRef(**item)
+            for name, item in self._items("flows", refresh).items()
+        }
+
+    def prompts(self, refresh: bool = False) -> Dict[str, ResourceRef]:
+        return {
+            name: ResourceRef(**item)
+            for name, item in self._items("prompts", refresh).items()
+        }
+
+    def lookup_flows(
+        self, names: Iterable[str], refresh: bool = False
+    ) -> Dict[str, Optional[ResourceRef]]:
+        return self._lookup("flows", names, refresh)
+
+    def lookup_prompts(
+        self, names: Iterable[str], refresh: bool = False
+    ) -> Dict[str, Optional[ResourceRef]]:
+        return self._lookup("prompts", names, refresh)
+
+    def get_flow(self, name: str) -> Optional[ResourceRef]:
+        return self.lookup_flows([name])[name]
+
+    def get_prompt(self, name: str) -> Optional[ResourceRef]:
+        return self.lookup_prompts([name])[name]
+
+    def record(self, kind: str, name: str, ref: ResourceRef):
+        """Add a resource created after the last listing without re-listing."""
+        entry = self._entries.get(self._key(kind))
+        if entry is not None:
+            entry["items"][name] = ref.model_dump()
+            self._save_cache()
+
+    def forget(self, kind: str, name: str):
+        entry = self._entries.get(self._key(kind))
+        if entry is not None and entry["items"].pop(name, None) is not None:
+            self._save_cache()
+
+    def forget_ids(self, kind: str, resource_ids: Iterable[str]):
+        """Drop deleted resources known only by id, e.g. after a teardown."""
+        entry = self._entries.get(self._key(kind))
+        if entry is None:
+            return
+        resource_ids = set(resource_ids)
+        names = [
+            name for name, item in entry["items"].items() if item["id"] in resource_ids
+        ]
+        for name in names:
+            del entry["items"][name]
+        if names:
+            self._save_cache()
+
+    def invalidate(self, kind: Optional[str] = None):
+        for listed in [kind] if kind else list(LISTINGS):
+            self._entries.pop(self._key(listed), None)
+        self._save_cache()
@@ -1,34 +1,63 @@
+from typing import Dict, Optional, Tuple
 from .models import FlowDefinition, FlowNode, FlowConnection
+from .rate_limiter import SharedRateLimiter, estimate_tokens
 import boto3
 import json
 
 
 class FlowSimulator:
-    def __init__(self, flow: FlowDefinition):
+    def __init__(
+        self,
+        flow: FlowDefinition,
+        rate_limiter: Optional[SharedRateLimiter] = None,
+        lambda_client=None,
+        bedrock_runtime=None,
+        bedrock_agent=None,
+    ):
         self.flow = flow
-        self.node_map = {node.name: node for node in flow.nodes}
-        self.connection_map = {conn.source: conn for conn in flow.connections}
-        self.lambda_client = boto3.client("lambda")
-        self.bedrock_runtime = boto3.client("bedrock-runtime")
-        self.bedrock_agent = boto3.client("bedrock-agent-runtime")
+        self.rate_limiter = rate_limiter
+        self.lambda_client = lambda_client or boto3.client("lambda")
+        self.bedrock_runtime = bedrock_runtime or boto3.client("bedrock-runtime")
+        self.bedrock_agent = bedrock_agent or boto3.client("bedrock-agent-runtime")
 
     def simulate(self, input_data: str) -> str:
-        current_node = self.node_map["Start"]
-        data = input_data
+        """Run every node reachable from the flow's Input node in topological order.
 
-        while current_node.type != "Output":
-            connection = self.connection_map[current_node.name]
-            next_node = self.node_map[connection.target]
-            data = self._process_node(next_node, data)
-            current_node = next_node
-
-        return data
+        A node receives every input a connection delivered, by name, and
+        sends its result along all outgoing connections. Returns the value
+        that reaches the Output node.
+        """
+        graph = self.flow.graph
+        graph.check()
+        values: Dict[Tuple[str, str], str] = {}
+        result = None
+        for name in graph.topological_order:
+            node = graph.nodes[name]
+            if node.type == "Input":
+                data = input_data
+            else:
+                inputs = {
+                    port.name: values[(name, port.name)]
+                    for port in node.inputs
+                    if (name, port.name) in values
+                }
+                if not inputs:
+                    continue
+                data = self._process_node(node, inputs)
+            if node.type == "Output":
+                result = data
+            for conn in graph.outgoing.get(name, ()):
+                port = conn.configuration.get("data")
+                if port is not None:
+                    values[(conn.target, port.targetInput)] = data
+        return result
 
-    def _process_node(self, node: FlowNode, data: str) -> str:
+    def _process_node(self, node: FlowNode, inputs: Dict[str, str]) -> str:
+        data = next(iter(inputs.values()))
         if node.type == "LambdaFunction":
             return self._invoke_lambda(node, data)
         elif node.type == "Prompt":
-            return self._invoke_prompt(node, data)
+            return self._invoke_prompt(node, inputs)
         elif node.type == "KnowledgeBase":
             return self._query_knowledge_base(node, data)
         else:
@@ -41,12 +70,19 @@ class FlowSimulator:
         )
         return json.loads(response["Payload"].read())["output"]
 
-    def _invoke_prompt(self, node: FlowNode, data: str) -> str:
+    def _invoke_prompt(self, node: FlowNode, inputs: Dict[str, str]) -> str:
         prompt_config = node.configuration.prompt
         model_id = prompt_config["sourceConfiguration"]["resource"].get(
             "modelId", "anthropic.claude-v2"
         )
-        prompt_text = f"{prompt_config['sourceConfiguration']['resource']['promptArn']}\n\nInput: {data}"
+        variables = "\n".join(f"{name}: {value}" for name, value in inputs.items())
+        prompt_text = f"{prompt_config['sourceConfiguration']['resource']['promptArn']}\n\n{variables}"
+        max_tokens = 500
+
+        if self.rate_limiter:
+            self.rate_limiter.acquire(
+                model_id, estimate_tokens(prompt_text) + max_tokens
+            )
 
         response = self.bedrock_runtime.invoke_model(
             modelId=model_id,
@@ -55,7 +91,7 @@ class FlowSimulator:
             body=json.dumps(
                 {
                     "prompt": prompt_text,
-                    "max_tokens_to_sample": 500,
+                    "max_tokens_to_sample": max_tokens,
                     "temperature": 0.7,
                     "top_p": 1,
                     "top_k": 250,
@@ -69,6 +105,10 @@ class FlowSimulator:
     def _query_knowledge_base(self, node: FlowNode, data: str) -> str:
         kb_id = node.configuration.knowledgeBaseId
         response = self.bedrock_agent.retrieve(
-            knowledgeBaseId=kb_id, retrievalQuery=data, numberOfResults=5
+            knowledgeBaseId=kb_id,
+            retrievalQuery={"text": data},
+            retrievalConfiguration={
+                "vectorSearchConfiguration": {"numberOfResults": 5}
+            },
         )
         return json.dumps(response["retrievalResults"])
@@ -0,0 +1,380 @@
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from botocore.exceptions import ClientError
+from botocore.exceptions import ConnectionError as BotoConnectionError
+from botocore.exceptions import HTTPClientError
+from pydantic import BaseModel
+
+from .resource_index import ResourceIndex
+
+NOT_FOUND_CODES = ("ResourceNotFoundException", "NoSuchEntity", "NoSuchEntityException")
+RETRYABLE_CODES = (
+    "ThrottlingException",
+    "Throttling",
+    "TooManyRequestsException",
+    "ConflictException",
+    "DeleteConflict",
+    "ServiceUnavailableException",
+    "InternalServerException",
+)
+# Network failures and timeouts raised by botocore itself rather than the
+# service, e.g. EndpointConnectionError and ReadTimeoutError.
+RETRYABLE_ERRORS = (BotoConnectionError, HTTPClientError)
+
+# A step key is the resource kind followed by its identifiers, e.g.
+# ("flowAlias", flow_id, alias_id) or ("role", role_name).
+StepKey = Tuple[str, ...]
+
+
+class TeardownStep(BaseModel):
+    key: StepKey
+    depends_on: List[StepKey] = []
+
+
+class TeardownOutcome(BaseModel):
+    key: StepKey
+    status: str  # deleted, missing, failed or skipped
+    attempts: int = 0
+    error: Optional[str] = None
+
+
+def _error_code(error: ClientError) -> str:
+    return error.response.get("Error", {}).get("Code", "")
+
+
+def prompt_id_from_arn(arn: str) -> str:
+    """``arn:aws:bedrock:<region>:<account>:prompt/<id>[:<version>]`` -> ``<id>``."""
+    return arn.rsplit("/", 1)[-1].split(":", 1)[0]
+
+
+def _paginate(client, operation, result_key, **kwargs):
+    for page in client.get_paginator(operation).paginate(**kwargs):
+        yield from page.get(result_key, [])
+
+
+class TeardownPlan:
+    """Resources to delete and the order constraints between them.
+
+    Aliases go before the versions they route to, versions before their flow,
+    flows before the prompts they use, and attached role policies before the
+    role. Steps with no path between them are independent.
+    """
+
+    def __init__(self):
+        self.steps: Dict[StepKey, TeardownStep] = {}
+
+    def add(self, key: StepKey, depends_on: Iterable[StepKey] = ()) -> StepKey:
+        step = self.steps.setdefault(key, TeardownStep(key=key))
+        for dependency in depends_on:
+            if dependency not in step.depends_on:
+                step.depends_on.append(dependency)
+        return key
+
+    def __len__(self):
+        return len(self.steps)
+
+    def __contains__(self, key):
+        return key in self.steps
+
+
+class TeardownEngine:
+    """Discover and delete flows with everything attached to them.
+
+    Deletions run on a thread pool as soon as their dependencies are gone.
+    Throttling, conflict and connection errors are retried with jittered
+    backoff, any other error fails only its own step, and a resource that no
+    longer exists counts as deleted, so a teardown can be re-run after a
+    partial failure. Deleted flows and prompts are dropped from ``index`` so
+    later lookups do not return them.
+    """
+
+    def __init__(
+        self,
+        bedrock_agent,
+        iam=None,
+        max_workers: int = 16,
+        max_attempts: int = 6,
+        base_delay: float = 1.0,
+        max_delay: float = 20.0,
+        sleep=time.sleep,
+        index: Optional[ResourceIndex] = None,
+    ):
+        self.bedrock_agent = bedrock_agent
+        self.iam = iam
+        self.index = index
+        self.max_workers = max_workers
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.sleep = sleep
+        self._print_lock = threading.Lock()
+
+    def _describe_flow(self, flow_id: str):
+        """Return ``(aliases, versions, prompt ids)`` for a flow, or None if it is gone."""
+        try:
+            flow = self.bedrock_agent.get_flow(flowIdentifier=flow_id)
+            aliases = [
+                summary["id"]
+                for summary in _paginate(
+                    self.bedrock_agent,
+                    "list_flow_aliases",
+                    "flowAliasSummaries",
+                    flowIdentifier=flow_id,
+                )
+            ]
+            versions = [
+                summary["version"]
+                for summary in _paginate(
+                    self.bedrock_agent,
+                    "list_flow_versions",
+                    "flowVersionSummaries",
+                    flowIdentifier=flow_id,
+                )
+                if summary["version"] != "DRAFT"
+            ]
+        except ClientError as e:
+            if _error_code(e) in NOT_FOUND_CODES:
+                return None
+            raise
+        prompts = []
+        for node in (flow.get("definition") or {}).get("nodes", []):
+            prompt = node.get("configuration", {}).get("prompt", {})
+            arn = prompt.get("sourceConfiguration", {}).get("resource", {})
+            if arn.get("promptArn"):
+                prompts.append(prompt_id_from_arn(arn["promptArn"]))
+        return aliases, versions, prompts
+
+    def _prompt_versions(self, prompt_id: str) -> List[str]:
+        try:
+            return [
+                summary["version"]
+                for summary in _paginate(
+                    self.bedrock_agent,
+                    "list_prompts",
+                    "promptSummaries",
+                    promptIdentifier=prompt_id,
+                )
+                if summary.get("version") not in (None, "DRAFT")
+            ]
+        except ClientError as e:
+            if _error_code(e) in NOT_FOUND_CODES:
+                return []
+            raise
+
+    def _role_policies(self, role_name: str):
+        try:
+            attached = [
+                policy["PolicyArn"]
+                for policy in _paginate(
+                    self.iam,
+                    "list_attached_role_policies",
+                    "AttachedPolicies",
+                    RoleName=role_name,
+                )
+            ]
+            inline = list(
+                _paginate(
+                    self.iam, "list_role_policies", "PolicyNames", RoleName=role_name
+                )
+            )
+        except ClientError as e:
+            if _error_code(e) in NOT_FOUND_CODES:
+                return [], []
+            raise
+        return attached, inline
+
+    def plan(
+        self,
+        flow_ids: Iterable[str],
+        prompt_ids: Iterable[str] = (),
+        role_names: Iterable[str] = (),
+        include_flow_prompts: bool = False,
+    ) -> TeardownPlan:
+        """Discover the aliases, versions, prompts and policies to delete.
+
+        Prompts used by the flows are only included with
+        ``include_flow_prompts``, since flows outside ``flow_ids`` may share
+        them. A prompt waits only for the planned flows that use it. Roles are
+        only deleted when named in ``role_names``, since they are often shared.
+        """
+        flow_ids = list(dict.fromkeys(flow_ids))
+        plan = TeardownPlan()
+        prompts = list(prompt_ids)
+        users: Dict[str, List[StepKey]] = {}  # prompt id -> flows using it
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            described = list(executor.map(self._describe_flow, flow_ids))
+            flow_keys = []
+            for flow_id, details in zip(flow_ids, described):
+                if details is None:
+                    continue
+                aliases, versions, flow_prompts = details
+                alias_keys = [
+                    plan.add(("flowAlias", flow_id, alias)) for alias in aliases
+                ]
+                version_keys = [
+                    plan.add(("flowVersion", flow_id, version), alias_keys)
+                    for version in versions
+                ]
+                flow_key = plan.add(("flow", flow_id), alias_keys + version_keys)
+                flow_keys.append(flow_key)
+                for prompt_id in flow_prompts:
+                    users.setdefault(prompt_id, []).append(flow_key)
+                if include_flow_prompts:
+                    prompts.extend(flow_prompts)
+
+            prompts = list(dict.fromkeys(prompts))
+            for prompt_id, versions in zip(
+                prompts, executor.map(self._prompt_versions, prompts)
+            ):
+                used_by = users.get(prompt_id, [])
+                version_keys = [
+                    plan.add(("promptVersion", prompt_id, version), used_by)
+                    for version in versions
+                ]
+                plan.add(("prompt", prompt_id), used_by + version_keys)
+
+            role_names = list(dict.fromkeys(role_names))
+            for role_name, (attached, inline) in zip(
+                role_names, executor.map(self._role_policies, role_names)
+            ):
+                policy_keys = [
+                    plan.add(("rolePolicy", role_name, arn)) for arn in attached
+                ] + [plan.add(("inlinePolicy", role_name, name)) for name in inline]
+                plan.add(("role", role_name), flow_keys + policy_keys)
+        return plan
+
+    def _delete(self, key: StepKey):
+        kind, *ids = key
+        agent, iam = self.bedrock_agent, self.iam
+        if kind == "flowAlias":
+            agent.delete_flow_alias(flowIdentifier=ids[0], aliasIdentifier=ids[1])
+        elif kind == "flowVersion":
+            agent.delete_flow_version(flowIdentifier=ids[0], flowVersion=ids[1])
+        elif kind == "flow":
+            agent.delete_flow(flowIdentifier=ids[0])
+        elif kind == "promptVersion":
+            agent.delete_prompt(promptIdentifier=ids[0], promptVersion=ids[1])
+        elif kind == "prompt":
+            agent.delete_prompt(promptIdentifier=ids[0])
+        elif kind == "rolePolicy":
+            iam.detach_role_policy(RoleName=ids[0], PolicyArn=ids[1])
+        elif kind == "inlinePolicy":
+            iam.delete_role_policy(RoleName=ids[0], PolicyName=ids[1])
+        elif kind == "role":
+            iam.delete_role(RoleName=ids[0])
+        else:
+            raise ValueError(f"Unknown resource kind: {kind}")
+
+    def _backoff(self, attempt: int):
+        delay = min(self.base_delay * 2 ** (attempt - 1), self.max_delay)
+        self.sleep(random.uniform(delay / 2, delay))
+
+    def _run_step(self, key: StepKey) -> TeardownOutcome:
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                self._delete(key)
+                status = "deleted"
+            except ClientError as e:
+                code = _error_code(e)
+                if code in NOT_FOUND_CODES:
+                    status = "missing"
+                elif code in RETRYABLE_CODES and attempt < self.max_attempts:
+                    self._backoff(attempt)
+                    continue
+                else:
+                    return TeardownOutcome(
+                        key=key, status="failed", attempts=attempt, error=str(e)
+                    )
+            except RETRYABLE_ERRORS as e:
+                if attempt < self.max_attempts:
+                    self._backoff(attempt)
+                    continue
+                return TeardownOutcome(
+                    key=key, status="failed", attempts=attempt, error=str(e)
+                )
+            except Exception as e:
+                # Anything else fails this step only; the rest of the
+                # teardown carries on.
+                return TeardownOutcome(
+                    key=key, status="failed", attempts=attempt, error=str(e)
+                )
+            with self._print_lock:
+                print(
+                    f"{'Deleted' if status == 'deleted' else 'Already gone'}: "
+                    f"{' '.join(key)}"
+                )
+            return TeardownOutcome(key=key, status=status, attempts=attempt)
+
+    def run(self, plan: TeardownPlan) -> Dict[StepKey, TeardownOutcome]:
+        """Delete everything in ``plan``, each step once its dependencies are done.
+
+        A step whose dependency failed is skipped rather than attempted.
+        """
+        waiting_on = {
+            key: {dep for dep in step.depends_on if dep in plan}
+            for key, step in plan.steps.items()
+        }
+        dependents: Dict[StepKey, List[StepKey]] = {key: [] for key in plan.steps}
+        for key, deps in waiting_on.items():
+            for dep in deps:
+                dependents[dep].append(key)
+
+        outcomes: Dict[StepKey, TeardownOutcome] = {}
+
+        def skip(key, reason):
+            outcomes[key] = TeardownOutcome(key=key, status="skipped", error=reason)
+            for dependent in dependents[key]:
+                if dependent not in outcomes:
+                    skip(dependent, reason)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            running = {
+                executor.submit(self._run_step, key): key
+                for key, deps in waiting_on.items()
+                if not deps
+            }
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    key = running.pop(future)
+                    outcome = future.result()
+                    outcomes[key] = outcome
+                    if outcome.status == "failed":
+                        for dependent in dependents[key]:
+                            if dependent not in outcomes:
+                                skip(dependent, f"{' '.join(key)} was not deleted")
+                        continue
+                    for dependent in dependents[key]:
+                        waiting_on[dependent].discard(key)
+                        if not waiting_on[dependent] and dependent not in outcomes:
+                            running[executor.submit(self._run_step, dependent)] = (
+                                dependent
+                            )
+
+        for key in plan.steps:
+            if key not in outcomes:
+                outcomes[key] = TeardownOutcome(
+                    key=key, status="skipped", error="dependency cycle"
+                )
+        if self.index:
+            for kind, listed in (("flow", "flows"), ("prompt", "prompts")):
+                self.index.forget_ids(
+                    listed,
+                    [
+                        key[1]
+                        for key, outcome in outcomes.items()
+                        if key[0] == kind and outcome.status in ("deleted", "missing")
+                    ],
+                )
+        return outcomes
+
+
+def summarize(outcomes: Dict[StepKey, TeardownOutcome]) -> Dict[str, int]:
+    counts: Dict[str, int] = {}
+    for outcome in outcomes.values():
+        counts[outcome.status] = counts.get(outcome.status, 0) + 1
+    return counts
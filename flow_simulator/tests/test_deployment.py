@@ -0,0 +1,250 @@
+import copy
+import threading
+from types import SimpleNamespace
+
+from botocore.exceptions import ClientError
+from flow_simulator.bedrock_updater import BedrockFlowUpdater
+from flow_simulator.deployment import (
+    DeploymentPlanner,
+    FlowSpec,
+    flow_hash,
+    format_plan,
+    to_bedrock_definition,
+)
+from flow_simulator.models import create_identity_flow, create_upcase_flow
+from flow_simulator.resource_index import ResourceIndex
+
+ROLE_ARN = "arn:aws:iam::123456789012:role/BedrockFlowRole"
+LAMBDA_ARN = "arn:aws:lambda:us-west-2:123456789012:function:UpcaseFunction"
+
+
+class FakePaginator:
+    def __init__(self, pages):
+        self.pages = pages
+
+    def paginate(self, **kwargs):
+        return iter(self.pages(**kwargs))
+
+
+class FakeBedrockAgent:
+    def __init__(self):
+        self.flows = {}
+        self.aliases = {}
+        self.calls = []
+        self.lock = threading.Lock()
+        self.meta = SimpleNamespace(region_name="us-east-1")
+
+    def _record(self, name):
+        with self.lock:
+            self.calls.append(name)
+
+    def get_paginator(self, operation):
+        if operation == "list_flows":
+            return FakePaginator(
+                lambda: [
+                    {
+                        "flowSummaries": [
+                            {"name": f["name"], "id": f["id"], "arn": f["arn"]}
+                            for f in self.flows.values()
+                        ]
+                    }
+                ]
+            )
+        return FakePaginator(
+            lambda flowIdentifier: [
+                {"flowAliasSummaries": self.aliases.get(flowIdentifier, [])}
+            ]
+        )
+
+    def create_flow(self, name, description, executionRoleArn, definition):
+        self._record("create_flow")
+        with self.lock:
+            flow_id = f"FLOW{len(self.flows)}"
+            self.flows[flow_id] = {
+                "name": name,
+                "id": flow_id,
+                "arn": f"arn:flow/{flow_id}",
+                "description": description,
+                "executionRoleArn": executionRoleArn,
+                "definition": copy.deepcopy(definition),
+                "status": "NotPrepared",
+            }
+        return self.flows[flow_id]
+
+    def update_flow(
+        self, flowIdentifier, name, description, executionRoleArn, definition
+    ):
+        self._record("update_flow")
+        flow = self.flows[flowIdentifier]
+        flow.update(
+            description=description,
+            executionRoleArn=executionRoleArn,
+            definition=copy.deepcopy(definition),
+            status="NotPrepared",
+        )
+        return flow
+
+    def get_flow(self, flowIdentifier):
+        if flowIdentifier not in self.flows:
+            raise ClientError(
+                {"Error": {"Code": "ResourceNotFoundException", "Message": ""}},
+                "GetFlow",
+            )
+        return self.flows[flowIdentifier]
+
+    def prepare_flow(self, flowIdentifier):
+        self._record("prepare_flow")
+        self.flows[flowIdentifier]["status"] = "Prepared"
+        return {"id": flowIdentifier, "status": "Preparing"}
+
+    def create_flow_version(self, flowIdentifier):
+        self._record("create_flow_version")
+        return {"version": "1"}
+
+    def create_flow_alias(
+        self, flowIdentifier, name, description, routingConfiguration
+    ):
+        self._record("create_flow_alias")
+        alias = {
+            "id": f"ALIAS{flowIdentifier}",
+            "name": name,
+            "routingConfiguration": routingConfiguration,
+        }
+        self.aliases.setdefault(flowIdentifier, []).append(alias)
+        return alias
+
+    def update_flow_alias(
+        self, flowIdentifier, aliasIdentifier, name, routingConfiguration
+    ):
+        self._record("update_flow_alias")
+        return {"id": aliasIdentifier}
+
+
+def make_planner(client, tmp_path):
+    index = ResourceIndex(
+        client, cache_path=str(tmp_path / "index.json"), region="test"
+    )
+    return DeploymentPlanner(client, index=index)
+
+
+def test_to_bedrock_definition_nests_node_configuration():
+    definition = to_bedrock_definition(create_upcase_flow(LAMBDA_ARN))
+    nodes = {node["name"]: node for node in definition["nodes"]}
+    assert nodes["Start"]["configuration"] == {"input": {}}
+    assert nodes["Upcase"]["configuration"] == {
+        "lambdaFunction": {"lambdaArn": LAMBDA_ARN}
+    }
+    assert "inputs" not in nodes["Start"]
+
+
+def test_flow_hash_ignores_ordering():
+    flow = create_upcase_flow(LAMBDA_ARN)
+    reordered = flow.model_copy(
+        update={"nodes": flow.nodes[::-1], "connections": flow.connections[::-1]}
+    )
+    assert flow_hash(flow) == flow_hash(reordered)
+    assert flow_hash(flow) != flow_hash(create_upcase_flow(LAMBDA_ARN + "-v2"))
+
+
+def test_plan_create_then_noop_then_update(tmp_path):
+    client = FakeBedrockAgent()
+    planner = make_planner(client, tmp_path)
+    specs = [
+        FlowSpec(name=f"flow-{i}", definition=create_identity_flow(), role_arn=ROLE_ARN)
+        for i in range(5)
+    ]
+
+    plan = planner.plan(specs)
+    assert [change.action for change in plan] == ["create"] * 5
+    results = planner.apply(specs, plan)
+    assert all(result.error is None for result in results)
+    assert client.calls.count("create_flow") == 5
+
+    assert [change.action for change in planner.plan(specs)] == ["noop"] * 5
+
+    specs[2] = FlowSpec(
+        name="flow-2", definition=create_upcase_flow(LAMBDA_ARN), role_arn=ROLE_ARN
+    )
+    plan = planner.plan(specs)
+    assert [change.action for change in plan] == ["noop"] * 2 + ["update"] + [
+        "noop"
+    ] * 2
+    assert plan[2].reasons == ["definition changed"]
+    planner.apply(specs, plan)
+    assert client.calls.count("update_flow") == 1
+
+
+def test_flow_deleted_behind_cached_index_is_recreated(tmp_path):
+    client = FakeBedrockAgent()
+    planner = make_planner(client, tmp_path)
+    spec = FlowSpec(name="flow", definition=create_identity_flow(), role_arn=ROLE_ARN)
+    planner.apply([spec])
+    client.flows.clear()
+
+    (change,) = planner.plan([spec])
+    assert change.action == "create"
+    assert planner.index.get_flow("flow") is None
+
+
+def test_apply_creates_version_and_alias(tmp_path):
+    client = FakeBedrockAgent()
+    planner = make_planner(client, tmp_path)
+    spec = FlowSpec(
+        name="aliased",
+        definition=create_identity_flow(),
+        role_arn=ROLE_ARN,
+        alias="live",
+    )
+
+    (result,) = planner.apply([spec])
+    assert result.version == "1"
+    assert result.alias_id.startswith("ALIAS")
+
+    spec = spec.model_copy(update={"description": "changed"})
+    planner.apply([spec])
+    assert client.calls.count("update_flow_alias") == 1
+
+
+def test_partial_deploy_is_repaired(tmp_path):
+    client = FakeBedrockAgent()
+    planner = make_planner(client, tmp_path)
+    spec = FlowSpec(
+        name="aliased",
+        definition=create_identity_flow(),
+        role_arn=ROLE_ARN,
+        alias="live",
+    )
+    (result,) = planner.apply([spec])
+    assert [change.action for change in planner.plan([spec])] == ["noop"]
+
+    client.flows[result.flow_id]["status"] = "Failed"
+    client.aliases[result.flow_id][0]["routingConfiguration"] = []
+    (change,) = planner.plan([spec])
+    assert change.action == "update"
+    assert change.reasons == ["flow is Failed", "alias has no routing"]
+
+    client.aliases.clear()
+    assert planner.plan([spec])[0].reasons == ["flow is Failed", "alias missing"]
+    planner.apply([spec])
+    assert [change.action for change in planner.plan([spec])] == ["noop"]
+
+
+def test_format_plan_summarizes_changes(tmp_path):
+    client = FakeBedrockAgent()
+    planner = make_planner(client, tmp_path)
+    spec = FlowSpec(name="flow", definition=create_identity_flow(), role_arn=ROLE_ARN)
+    output = format_plan(planner.plan([spec]))
+    assert "+ flow: create (flow does not exist)" in output
+    assert "1 to create, 0 to update, 0 unchanged" in output
+
+
+def test_updater_skips_unchanged_flow(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    client = FakeBedrockAgent()
+    updater = BedrockFlowUpdater(bedrock_agent=client)
+    flow = create_identity_flow()
+
+    arn = updater.create_or_update_flow(flow, "IdentityFlow", ROLE_ARN)
+    assert updater.create_or_update_flow(flow, "IdentityFlow", ROLE_ARN) == arn
+    assert client.calls.count("create_flow") == 1
+    assert "update_flow" not in client.calls
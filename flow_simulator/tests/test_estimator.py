@@ -0,0 +1,137 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from flow_simulator.estimator import (
+    CostModel,
+    NodeCost,
+    estimate_flow,
+    format_estimate,
+    trace_latencies,
+)
+from flow_simulator.graph import FlowGraphError
+from flow_simulator.models import (
+    FlowConnection,
+    FlowDataConnectionConfiguration,
+    FlowDefinition,
+    FlowNode,
+    FlowNodeConfiguration,
+    FlowNodeInput,
+    FlowNodeOutput,
+    create_identity_flow,
+    create_knowledge_base_flow,
+)
+
+
+def kb_flow():
+    return create_knowledge_base_flow("KB1", "arn:prompt")
+
+
+def test_knowledge_base_flow_estimate():
+    estimate = estimate_flow(kb_flow())
+    assert estimate.critical_path == [
+        "Start",
+        "QueryKnowledgeBase",
+        "GenerateResponse",
+        "End",
+    ]
+    assert estimate.dominant_node == "GenerateResponse"
+    assert estimate.latency == pytest.approx(0.8 + 3.0)
+    assert estimate.cost == pytest.approx(0.0004 + 0.006)
+    assert estimate.slack["GenerateResponse"] == pytest.approx(0.0)
+
+    report = format_estimate(estimate)
+    assert "Dominant node: GenerateResponse (79% of latency)" in report
+
+
+def test_parallel_branches_save_time():
+    def node(name, node_type, inputs, outputs):
+        return FlowNode(
+            name=name,
+            type=node_type,
+            inputs=[FlowNodeInput(name=port, type="String") for port in inputs],
+            outputs=[FlowNodeOutput(name=port, type="String") for port in outputs],
+            configuration=FlowNodeConfiguration(),
+        )
+
+    def connect(source, target, target_input):
+        return FlowConnection(
+            name=f"{source}To{target}{target_input}",
+            source=source,
+            target=target,
+            configuration={
+                "data": FlowDataConnectionConfiguration(
+                    sourceOutput="out", targetInput=target_input
+                )
+            },
+        )
+
+    # Start fans out to A and B, which both feed C.
+    flow = FlowDefinition(
+        nodes=[
+            node("Start", "Input", [], ["out"]),
+            node("A", "LambdaFunction", ["in"], ["out"]),
+            node("B", "Prompt", ["in"], ["out"]),
+            node("C", "LambdaFunction", ["a", "b"], ["out"]),
+            node("End", "Output", ["in"], []),
+        ],
+        connections=[
+            connect("Start", "A", "in"),
+            connect("Start", "B", "in"),
+            connect("A", "C", "a"),
+            connect("B", "C", "b"),
+            connect("C", "End", "in"),
+        ],
+    )
+    model = CostModel(by_name={"A": NodeCost(latency=1.0)})
+    estimate = estimate_flow(flow, model)
+    assert estimate.critical_path == ["Start", "B", "C", "End"]
+    assert estimate.latency == pytest.approx(3.0 + 0.2)
+    assert estimate.sequential_latency == pytest.approx(1.0 + 3.0 + 0.2)
+    assert estimate.parallel_savings == pytest.approx(1.0)
+    assert estimate.slack["A"] == pytest.approx(2.0)
+
+
+def test_cost_model_learned_from_traces():
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+    def trace(kind, node, seconds):
+        return {
+            "trace": {
+                kind: {
+                    "nodeName": node,
+                    "timestamp": start + timedelta(seconds=seconds),
+                }
+            }
+        }
+
+    traces = [
+        trace("nodeInputTrace", "QueryKnowledgeBase", 0),
+        trace("nodeOutputTrace", "QueryKnowledgeBase", 0.5),
+        trace("nodeInputTrace", "GenerateResponse", 0.5),
+        {"flowTraceEvent": trace("nodeOutputTrace", "GenerateResponse", 5.5)},
+        trace("nodeInputTrace", "GenerateResponse", 10),
+        trace("nodeOutputTrace", "GenerateResponse", 13),
+    ]
+    assert trace_latencies(traces) == [
+        ("QueryKnowledgeBase", 0.5),
+        ("GenerateResponse", 5.0),
+        ("GenerateResponse", 3.0),
+    ]
+
+    model = CostModel.from_traces(kb_flow(), traces)
+    assert model.by_type["Prompt"].latency == pytest.approx(4.0)
+    assert model.by_type["Prompt"].cost == pytest.approx(0.006)
+    assert model.by_type["LambdaFunction"].latency == pytest.approx(0.2)
+    assert estimate_flow(kb_flow(), model).latency == pytest.approx(4.5)
+
+
+def test_identity_flow_and_invalid_flow():
+    assert estimate_flow(create_identity_flow()).latency == 0.0
+
+    flow = create_identity_flow()
+    flow.connections.append(flow.connections[0].model_copy(update={"name": "Loop"}))
+    flow.connections[-1] = flow.connections[-1].model_copy(
+        update={"source": "End", "target": "Start"}
+    )
+    with pytest.raises(FlowGraphError):
+        estimate_flow(flow)
@@ -0,0 +1,104 @@
+import json
+import os
+import time
+
+import pytest
+from flow_simulator.deployment import flow_hash, to_bedrock_definition
+from flow_simulator.generator import (
+    FlowTemplate,
+    from_bedrock_definition,
+    parameter_grid,
+    prompt_eval_template,
+)
+from flow_simulator.models import create_knowledge_base_flow, create_upcase_flow
+
+TEMPLATE_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "..", "07_prompt_eval_flow_defn.json"
+)
+MODELS = [f"anthropic.model-{i}" for i in range(10)]
+PROMPTS = [f"arn:aws:bedrock:us-east-1:123456789012:prompt/P{i}" for i in range(5)]
+
+
+def invoke_config(definition):
+    (invoke,) = [node for node in definition["nodes"] if node["name"] == "Invoke"]
+    return invoke["configuration"]["prompt"]["sourceConfiguration"]["inline"]
+
+
+def test_from_bedrock_definition_round_trips():
+    for flow in [
+        create_upcase_flow("arn:aws:lambda:us-west-2:123456789012:function:Upcase"),
+        create_knowledge_base_flow("KB1", PROMPTS[0]),
+    ]:
+        definition = to_bedrock_definition(flow)
+        assert to_bedrock_definition(from_bedrock_definition(definition)) == definition
+
+
+def test_render_fills_placeholders_without_touching_template():
+    template = prompt_eval_template(TEMPLATE_PATH)
+    assert template.required == {"MODEL_INVOKE_ID", "PROMPT_EVAL_ARN"}
+    original = json.dumps(template.template, sort_keys=True)
+
+    definition = template.render_definition(
+        {
+            "MODEL_INVOKE_ID": MODELS[0],
+            "PROMPT_EVAL_ARN": PROMPTS[0],
+            "INFERENCE_CONFIG": {"text": {"maxTokens": 512, "temperature": 0.5}},
+        }
+    )
+    assert invoke_config(definition)["modelId"] == MODELS[0]
+    assert invoke_config(definition)["inferenceConfiguration"]["text"] == {
+        "maxTokens": 512,
+        "temperature": 0.5,
+    }
+    assert json.dumps(template.template, sort_keys=True) == original
+
+    # Unbound parameters keep the template's value.
+    definition = template.render_definition(
+        {"MODEL_INVOKE_ID": MODELS[0], "PROMPT_EVAL_ARN": PROMPTS[0]}
+    )
+    assert invoke_config(definition)["inferenceConfiguration"]["text"] == {
+        "maxTokens": 2000,
+        "temperature": 0,
+    }
+
+
+def test_text_placeholders_and_missing_parameters():
+    template = FlowTemplate(
+        {"nodes": [{"name": "N", "description": "model $MODEL on $.data"}]},
+        defaults={"MODEL": "default"},
+    )
+    assert template.render_definition({})["nodes"][0]["description"] == (
+        "model default on $.data"
+    )
+    with pytest.raises(ValueError, match="PROMPT_EVAL_ARN"):
+        prompt_eval_template(TEMPLATE_PATH).render({"MODEL_INVOKE_ID": MODELS[0]})
+
+
+def test_render_grid_hashes_match_deployment():
+    template = prompt_eval_template(TEMPLATE_PATH)
+    grid = parameter_grid(
+        MODEL_INVOKE_ID=MODELS[:2],
+        PROMPT_EVAL_ARN=PROMPTS[:2],
+        INFERENCE_CONFIG=[{"text": {"temperature": t}} for t in (0, 1)],
+    )
+    variants = template.render_grid(grid + grid[:3])
+    assert len(variants) == 8
+    assert len({variant.name for variant in variants}) == 8
+    for variant in variants:
+        assert variant.content_hash == flow_hash(variant.definition)
+    assert variants[0].name.startswith("prompt-eval-")
+    assert variants[0].to_spec("arn:role").definition == variants[0].definition
+
+
+def test_hundred_variants_render_quickly():
+    template = prompt_eval_template(TEMPLATE_PATH)
+    grid = parameter_grid(
+        MODEL_INVOKE_ID=MODELS,
+        PROMPT_EVAL_ARN=PROMPTS,
+        INFERENCE_CONFIG=[{"text": {"temperature": t}} for t in (0, 1)],
+    )
+    start = time.perf_counter()
+    variants = template.render_grid(grid)
+    elapsed = time.perf_counter() - start
+    assert len(variants) == 100
+    assert elapsed < 1.0
@@ -0,0 +1,144 @@
+import time
+
+import pytest
+from flow_simulator.deployment import DeploymentPlanner, FlowSpec
+from flow_simulator.graph import FlowGraphError
+from flow_simulator.models import (
+    FlowConnection,
+    FlowDataConnectionConfiguration,
+    FlowDefinition,
+    FlowNode,
+    FlowNodeConfiguration,
+    FlowNodeInput,
+    FlowNodeOutput,
+    create_knowledge_base_flow,
+    create_upcase_flow,
+)
+
+
+def node(name, node_type="LambdaFunction", inputs=("input",), outputs=("output",)):
+    return FlowNode(
+        name=name,
+        type=node_type,
+        inputs=[FlowNodeInput(name=port, type="String") for port in inputs],
+        outputs=[FlowNodeOutput(name=port, type="String") for port in outputs],
+        configuration=FlowNodeConfiguration(),
+    )
+
+
+def connect(source, target, source_output="output", target_input="input"):
+    return FlowConnection(
+        name=f"{source}To{target}",
+        source=source,
+        target=target,
+        configuration={
+            "data": FlowDataConnectionConfiguration(
+                sourceOutput=source_output, targetInput=target_input
+            )
+        },
+    )
+
+
+def test_graph_indexes_knowledge_base_flow():
+    flow = create_knowledge_base_flow("kb", "arn:prompt")
+    graph = flow.graph
+    assert graph.is_valid
+    assert graph.topological_order == [
+        "Start",
+        "QueryKnowledgeBase",
+        "GenerateResponse",
+        "End",
+    ]
+    assert graph.out_degree("Start") == 2
+    assert graph.in_degree("GenerateResponse") == 2
+    assert graph.successors("Start") == ["QueryKnowledgeBase", "GenerateResponse"]
+    assert [c.name for c in graph.to_port[("GenerateResponse", "context")]] == [
+        "KBToPrompt"
+    ]
+    assert [n.name for n in graph.nodes_of_type("Prompt")] == ["GenerateResponse"]
+
+
+def test_graph_is_cached_until_mutation():
+    flow = create_upcase_flow("arn:lambda")
+    graph = flow.graph
+    assert flow.graph is graph
+
+    flow.connections.append(connect("Upcase", "End", "functionResponse", "document"))
+    assert flow.graph is not graph
+    graph = flow.graph
+
+    flow.nodes = list(flow.nodes)
+    assert flow.graph is not graph
+
+    # In-place edits need an explicit invalidation.
+    graph = flow.graph
+    flow.nodes[1].name = "Renamed"
+    flow.invalidate_graph()
+    assert "Renamed" in flow.graph.nodes
+
+
+def test_graph_reports_port_and_type_problems():
+    flow = create_knowledge_base_flow("kb", "arn:prompt")
+    flow.connections.append(connect("Start", "Missing"))
+    flow.connections.append(connect("Start", "End", "nope", "document"))
+    flow.connections.append(
+        connect("QueryKnowledgeBase", "End", "retrievalResults", "document")
+    )
+    with pytest.raises(FlowGraphError) as excinfo:
+        flow.validate_graph()
+    problems = "\n".join(excinfo.value.problems)
+    assert "'Missing' is not a node" in problems
+    assert "'Start' has no output 'nope'" in problems
+    assert "retrievalResults is Array but End.document is String" in problems
+
+
+def test_graph_finds_cycle():
+    flow = FlowDefinition(
+        nodes=[node("Start", "Input", inputs=()), node("A"), node("B"), node("C")],
+        connections=[
+            connect("Start", "A"),
+            connect("A", "B"),
+            connect("B", "C"),
+            connect("C", "A"),
+        ],
+    )
+    graph = flow.graph
+    assert graph.topological_order == ["Start"]
+    assert graph.cycle[0] == graph.cycle[-1]
+    assert set(graph.cycle) == {"A", "B", "C"}
+    assert any(problem.startswith("cycle:") for problem in graph.problems)
+
+
+def test_planner_rejects_invalid_flow_before_calling_the_api():
+    flow = create_upcase_flow("arn:lambda")
+    flow.connections.append(connect("End", "Start"))
+    client = object()  # any API call would fail
+    planner = DeploymentPlanner(client, index=object())
+    with pytest.raises(FlowGraphError, match="bad: connection"):
+        planner.plan([FlowSpec(name="bad", definition=flow, role_arn="arn:role")])
+
+
+def test_graph_scales_to_thousands_of_nodes():
+    size = 5000
+    nodes = [node("Start", "Input", inputs=())] + [node(f"N{i}") for i in range(size)]
+    connections = [connect("Start", "N0")]
+    for i in range(1, size):
+        # A chain with extra fan-out edges.
+        connections.append(connect(f"N{i - 1}", f"N{i}"))
+        if i >= 2:
+            connections.append(
+                connect(f"N{i - 2}", f"N{i}").model_copy(update={"name": f"skip{i}"})
+            )
+    flow = FlowDefinition(nodes=nodes, connections=connections)
+
+    start = time.perf_counter()
+    graph = flow.graph
+    elapsed = time.perf_counter() - start
+    assert graph.is_valid
+    assert graph.topological_order[-1] == f"N{size - 1}"
+    assert elapsed < 1.0
+
+    start = time.perf_counter()
+    for _ in range(1000):
+        flow.graph
+    assert time.perf_counter() - start < 0.1
@@ -0,0 +1,99 @@
+import time
+from unittest.mock import MagicMock
+
+from flow_simulator.resource_index import ResourceIndex, ResourceRef
+
+
+def make_client(flow_count, page_size=100):
+    summaries = [
+        {
+            "name": f"flow-{i}",
+            "id": f"ID{i}",
+            "arn": f"arn:flow/{i}",
+            "version": "DRAFT",
+            "status": "Prepared",
+        }
+        for i in range(flow_count)
+    ]
+    pages = [
+        {"flowSummaries": summaries[i : i + page_size]}
+        for i in range(0, flow_count, page_size)
+    ]
+    client = MagicMock()
+    client.get_paginator.return_value.paginate.side_effect = lambda: iter(pages)
+    return client
+
+
+def test_lookup_pages_through_every_flow(tmp_path):
+    client = make_client(350)
+    index = ResourceIndex(client, cache_path=str(tmp_path / "index.json"))
+
+    found = index.lookup_flows(["flow-0", "flow-349", "missing"])
+
+    assert found["flow-349"] == ResourceRef(
+        id="ID349", arn="arn:flow/349", version="DRAFT", status="Prepared"
+    )
+    assert found["missing"] is None
+    client.get_paginator.assert_called_once_with("list_flows")
+
+
+def test_bulk_lookups_share_one_listing(tmp_path):
+    client = make_client(10)
+    index = ResourceIndex(client, cache_path=str(tmp_path / "index.json"))
+    for i in range(10):
+        assert index.get_flow(f"flow-{i}").id == f"ID{i}"
+    assert client.get_paginator.return_value.paginate.call_count == 1
+
+
+def test_cache_is_reused_across_instances_until_ttl(tmp_path):
+    cache_path = str(tmp_path / "index.json")
+    client = make_client(3)
+    ResourceIndex(client, cache_path=cache_path, region="us-east-1").get_flow("flow-1")
+
+    fresh_client = make_client(3)
+    index = ResourceIndex(fresh_client, cache_path=cache_path, region="us-east-1")
+    assert index.get_flow("flow-2").id == "ID2"
+    fresh_client.get_paginator.assert_not_called()
+
+    expired = ResourceIndex(
+        fresh_client, cache_path=cache_path, region="us-east-1", ttl=0
+    )
+    time.sleep(0.01)
+    expired.get_flow("flow-2")
+    fresh_client.get_paginator.assert_called_once()
+
+
+def test_cache_is_per_region(tmp_path):
+    cache_path = str(tmp_path / "index.json")
+    ResourceIndex(make_client(3), cache_path=cache_path, region="us-east-1").flows()
+    other = make_client(1)
+    ResourceIndex(other, cache_path=cache_path, region="us-west-2").flows()
+    other.get_paginator.assert_called_once()
+
+
+def test_record_and_forget_update_cache(tmp_path):
+    client = make_client(1)
+    index = ResourceIndex(client, cache_path=str(tmp_path / "index.json"))
+    index.flows()
+    index.record("flows", "new-flow", ResourceRef(id="NEW", arn="arn:new"))
+    assert index.get_flow("new-flow").id == "NEW"
+    assert client.get_paginator.return_value.paginate.call_count == 1
+    index.forget("flows", "new-flow")
+    # A miss re-lists once before reporting the flow as missing.
+    assert index.get_flow("new-flow") is None
+    assert client.get_paginator.return_value.paginate.call_count == 2
+    index.forget_ids("flows", ["ID0"])
+    assert "flow-0" not in index.flows()
+
+
+def test_miss_in_cached_listing_refreshes_once(tmp_path):
+    cache_path = str(tmp_path / "index.json")
+    ResourceIndex(make_client(1), cache_path=cache_path, region="us-east-1").flows()
+
+    client = make_client(3)
+    index = ResourceIndex(client, cache_path=cache_path, region="us-east-1")
+    found = index.lookup_flows(["flow-2", "missing"])
+    assert found["flow-2"].id == "ID2" and found["missing"] is None
+    client.get_paginator.assert_called_once()
+    assert index.get_flow("flow-0").id == "ID0"
+    client.get_paginator.assert_called_once()
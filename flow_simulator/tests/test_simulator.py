@@ -1,3 +1,5 @@
+import json
+
 import pytest
 from unittest.mock import MagicMock
 from flow_simulator.simulator import FlowSimulator
@@ -59,3 +61,29 @@ def test_flow_simulator_knowledge_base():
 
     result = simulator.simulate("Test question")
     assert result == "Mocked response"
+    # The prompt node sees both the question and the retrieved context.
+    prompt = json.loads(simulator.bedrock_runtime.invoke_model.call_args.kwargs["body"])
+    assert "query: Test question" in prompt["prompt"]
+    assert "Mocked KB result" in prompt["prompt"]
+
+
+def test_flow_simulator_prompt_waits_for_rate_limiter():
+    knowledge_base_id = (
+        "arn:aws:bedrock:us-west-2:123456789012:knowledge-base/MyKnowledgeBase"
+    )
+    prompt_arn = "arn:aws:bedrock:us-west-2:123456789012:prompt/MyResponsePrompt"
+    flow = create_knowledge_base_flow(knowledge_base_id, prompt_arn)
+    rate_limiter = MagicMock()
+    simulator = FlowSimulator(flow, rate_limiter=rate_limiter)
+
+    simulator.bedrock_runtime = MagicMock()
+    simulator.bedrock_runtime.invoke_model.return_value = {
+        "body": MagicMock(read=lambda: '{"completion": "Mocked response"}')
+    }
+    simulator.bedrock_agent = MagicMock()
+    simulator.bedrock_agent.retrieve.return_value = {"retrievalResults": []}
+
+    simulator.simulate("Test question")
+    model_id, tokens = rate_limiter.acquire.call_args.args
+    assert model_id == "anthropic.claude-v2"
+    assert tokens > 500
@@ -0,0 +1,263 @@
+import threading
+from unittest.mock import MagicMock
+
+from botocore.exceptions import ClientError, EndpointConnectionError
+from flow_simulator.resource_index import ResourceIndex
+from flow_simulator.teardown import TeardownEngine, prompt_id_from_arn, summarize
+
+
+def client_error(code):
+    return ClientError({"Error": {"Code": code, "Message": code}}, "Operation")
+
+
+class FakePaginator:
+    def __init__(self, list_items, result_key):
+        self.list_items = list_items
+        self.result_key = result_key
+
+    def paginate(self, **kwargs):
+        # One item per page, to check every page is read.
+        return iter({self.result_key: [item]} for item in self.list_items(**kwargs))
+
+
+class FakeAccount:
+    """Bedrock agent and IAM in one, tracking what exists and deletion order."""
+
+    def __init__(self, flows, prompts, roles):
+        # flow id -> {"aliases": [...], "versions": [...], "prompts": [...]}
+        self.flows = flows
+        self.prompts = prompts  # prompt id -> versions
+        self.roles = roles  # role name -> attached policy arns
+        self.deleted = []
+        self.lock = threading.Lock()
+        self.fail_once = set()
+        self.always_fail = set()
+        self.raise_once = {}  # key -> exception raised on the first attempt
+
+    def _delete(self, key):
+        with self.lock:
+            if key in self.raise_once:
+                raise self.raise_once.pop(key)
+            if key in self.always_fail:
+                raise client_error("AccessDeniedException")
+            if key in self.fail_once:
+                self.fail_once.discard(key)
+                raise client_error("ThrottlingException")
+            if key in self.deleted:
+                raise client_error("ResourceNotFoundException")
+            self.deleted.append(key)
+
+    def get_paginator(self, operation):
+        listings = {
+            "list_flow_aliases": lambda flowIdentifier: [
+                {"id": alias} for alias in self.flows[flowIdentifier]["aliases"]
+            ],
+            "list_flow_versions": lambda flowIdentifier: [
+                {"version": version}
+                for version in ["DRAFT"] + self.flows[flowIdentifier]["versions"]
+            ],
+            "list_prompts": lambda promptIdentifier: [
+                {"version": version}
+                for version in ["DRAFT"] + self.prompts[promptIdentifier]
+            ],
+            "list_attached_role_policies": lambda RoleName: [
+                {"PolicyArn": arn} for arn in self.roles[RoleName]
+            ],
+            "list_role_policies": lambda RoleName: [],
+        }
+        result_keys = {
+            "list_flow_aliases": "flowAliasSummaries",
+            "list_flow_versions": "flowVersionSummaries",
+            "list_prompts": "promptSummaries",
+            "list_attached_role_policies": "AttachedPolicies",
+            "list_role_policies": "PolicyNames",
+        }
+        return FakePaginator(listings[operation], result_keys[operation])
+
+    def get_flow(self, flowIdentifier):
+        if flowIdentifier not in self.flows:
+            raise client_error("ResourceNotFoundException")
+        nodes = [
+            {
+                "name": prompt,
+                "type": "Prompt",
+                "configuration": {
+                    "prompt": {
+                        "sourceConfiguration": {
+                            "resource": {
+                                "promptArn": "arn:aws:bedrock:us-east-1:1:prompt/"
+                                + prompt
+                            }
+                        }
+                    }
+                },
+            }
+            for prompt in self.flows[flowIdentifier]["prompts"]
+        ]
+        return {"id": flowIdentifier, "definition": {"nodes": nodes}}
+
+    def delete_flow_alias(self, flowIdentifier, aliasIdentifier):
+        self._delete(("flowAlias", flowIdentifier, aliasIdentifier))
+
+    def delete_flow_version(self, flowIdentifier, flowVersion):
+        self._delete(("flowVersion", flowIdentifier, flowVersion))
+
+    def delete_flow(self, flowIdentifier):
+        self._delete(("flow", flowIdentifier))
+
+    def delete_prompt(self, promptIdentifier, promptVersion=None):
+        if promptVersion:
+            self._delete(("promptVersion", promptIdentifier, promptVersion))
+        else:
+            self._delete(("prompt", promptIdentifier))
+
+    def detach_role_policy(self, RoleName, PolicyArn):
+        self._delete(("rolePolicy", RoleName, PolicyArn))
+
+    def delete_role(self, RoleName):
+        self._delete(("role", RoleName))
+
+
+def make_account(flow_count=3):
+    flows = {
+        f"flow{i}": {
+            "aliases": [f"alias{i}a", f"alias{i}b"],
+            "versions": ["1", "2", "3"],
+            "prompts": ["shared"],
+        }
+        for i in range(flow_count)
+    }
+    return FakeAccount(
+        flows, {"shared": ["1", "2"]}, {"FlowRole": ["arn:aws:iam::aws:policy/X"]}
+    )
+
+
+def make_engine(account, **kwargs):
+    return TeardownEngine(account, account, sleep=lambda seconds: None, **kwargs)
+
+
+def test_prompt_id_from_arn():
+    assert prompt_id_from_arn("arn:aws:bedrock:us-east-1:1:prompt/ABC") == "ABC"
+    assert prompt_id_from_arn("arn:aws:bedrock:us-east-1:1:prompt/ABC:3") == "ABC"
+
+
+def test_plan_discovers_everything_attached():
+    account = make_account()
+    assert ("prompt", "shared") not in make_engine(account).plan(["flow0"])
+    plan = make_engine(account).plan(
+        ["flow0", "flow1", "flow2", "gone"],
+        role_names=["FlowRole"],
+        include_flow_prompts=True,
+    )
+    kinds = [key[0] for key in plan.steps]
+    assert kinds.count("flowAlias") == 6
+    assert kinds.count("flowVersion") == 9
+    assert kinds.count("flow") == 3
+    assert kinds.count("promptVersion") == 2
+    assert kinds.count("prompt") == 1
+    assert ("flowVersion", "flow0", "DRAFT") not in plan
+    assert ("rolePolicy", "FlowRole", "arn:aws:iam::aws:policy/X") in plan
+
+
+def test_run_respects_dependency_order():
+    account = make_account(flow_count=20)
+    engine = make_engine(account, max_workers=8)
+    outcomes = engine.run(
+        engine.plan(
+            list(account.flows), role_names=["FlowRole"], include_flow_prompts=True
+        )
+    )
+
+    assert summarize(outcomes) == {"deleted": len(outcomes)}
+    position = {key: i for i, key in enumerate(account.deleted)}
+    for flow_id in account.flows:
+        flow_at = position[("flow", flow_id)]
+        for alias in account.flows[flow_id]["aliases"]:
+            alias_at = position[("flowAlias", flow_id, alias)]
+            for version in account.flows[flow_id]["versions"]:
+                assert alias_at < position[("flowVersion", flow_id, version)]
+        assert flow_at < position[("prompt", "shared")]
+        assert flow_at < position[("role", "FlowRole")]
+    assert position[("rolePolicy", "FlowRole", "arn:aws:iam::aws:policy/X")] < (
+        position[("role", "FlowRole")]
+    )
+
+
+def test_retries_and_reruns_are_idempotent():
+    account = make_account(flow_count=1)
+    account.fail_once.add(("flow", "flow0"))
+    engine = make_engine(account)
+    plan = engine.plan(["flow0"])
+    outcomes = engine.run(plan)
+    assert outcomes[("flow", "flow0")].attempts == 2
+    assert summarize(outcomes) == {"deleted": len(plan)}
+
+    # Running the same plan again finds everything already gone.
+    assert summarize(engine.run(plan)) == {"missing": len(plan)}
+
+
+def test_failure_skips_dependents_only():
+    account = make_account(flow_count=2)
+    account.always_fail.add(("flowAlias", "flow0", "alias0a"))
+    engine = make_engine(account)
+    outcomes = engine.run(engine.plan(["flow0", "flow1"], include_flow_prompts=True))
+
+    assert outcomes[("flowAlias", "flow0", "alias0a")].status == "failed"
+    assert outcomes[("flow", "flow0")].status == "skipped"
+    assert outcomes[("prompt", "shared")].status == "skipped"
+    assert outcomes[("flow", "flow1")].status == "deleted"
+    assert outcomes[("flowAlias", "flow0", "alias0b")].status == "deleted"
+
+
+def test_prompts_wait_only_for_the_flows_that_use_them():
+    flows = {
+        f"flow{i}": {"aliases": [f"alias{i}"], "versions": [], "prompts": [f"p{i}"]}
+        for i in range(2)
+    }
+    account = FakeAccount(flows, {"p0": ["1"], "p1": ["1"]}, {})
+    account.always_fail.add(("flow", "flow0"))
+    engine = make_engine(account)
+    outcomes = engine.run(engine.plan(list(flows), include_flow_prompts=True))
+
+    assert outcomes[("prompt", "p0")].status == "skipped"
+    assert outcomes[("promptVersion", "p0", "1")].status == "skipped"
+    assert outcomes[("prompt", "p1")].status == "deleted"
+
+
+def test_connection_errors_are_retried_and_other_errors_fail_one_step():
+    account = make_account(flow_count=2)
+    account.raise_once[("flow", "flow0")] = EndpointConnectionError(
+        endpoint_url="https://bedrock-agent"
+    )
+    account.raise_once[("flow", "flow1")] = RuntimeError("unexpected")
+    engine = make_engine(account)
+    outcomes = engine.run(engine.plan(["flow0", "flow1"]))
+
+    assert outcomes[("flow", "flow0")].status == "deleted"
+    assert outcomes[("flow", "flow0")].attempts == 2
+    assert outcomes[("flow", "flow1")].status == "failed"
+    assert "unexpected" in outcomes[("flow", "flow1")].error
+    assert outcomes[("flowAlias", "flow1", "alias1a")].status == "deleted"
+
+
+def test_deleted_resources_are_dropped_from_index(tmp_path):
+    listing = MagicMock()
+    listing.get_paginator.return_value.paginate.side_effect = lambda: iter(
+        [
+            {
+                "flowSummaries": [
+                    {"name": f"name{i}", "id": f"flow{i}", "arn": f"arn:{i}"}
+                    for i in range(2)
+                ]
+            }
+        ]
+    )
+    index = ResourceIndex(listing, cache_path=str(tmp_path / "index.json"), region="r")
+    index.flows()
+
+    account = make_account(flow_count=2)
+    account.always_fail.add(("flowAlias", "flow0", "alias0a"))
+    engine = make_engine(account, index=index)
+    engine.run(engine.plan(["flow0", "flow1"]))
+
+    assert list(index.flows()) == ["name0"]
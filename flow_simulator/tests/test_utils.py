@@ -0,0 +1,133 @@
+import json
+import time
+from unittest.mock import MagicMock
+
+from flow_simulator.models import (
+    FlowConnection,
+    FlowDataConnectionConfiguration,
+    FlowDefinition,
+    FlowNodeInput,
+    FlowNodeOutput,
+    InputFlowNode,
+    KnowledgeBaseFlowNodeConfiguration,
+    LambdaFunctionFlowNode,
+    LambdaFunctionFlowNodeConfiguration,
+    OutputFlowNode,
+    PromptFlowNode,
+    create_knowledge_base_flow,
+    create_upcase_flow,
+)
+from flow_simulator.simulator import FlowSimulator
+from flow_simulator.utils import load_flow_from_json, save_flow_to_json
+
+LAMBDA_ARN = "arn:aws:lambda:us-west-2:123456789012:function:UpcaseFunction"
+
+
+def test_round_trip_keeps_typed_configuration(tmp_path):
+    path = str(tmp_path / "flow.json")
+    for flow in [
+        create_upcase_flow(LAMBDA_ARN),
+        create_knowledge_base_flow("KB1", "arn:prompt"),
+    ]:
+        save_flow_to_json(flow, path)
+        loaded = load_flow_from_json(path)
+        assert loaded == flow
+
+    loaded = load_flow_from_json(path)
+    assert isinstance(loaded.nodes[1].configuration, KnowledgeBaseFlowNodeConfiguration)
+    assert isinstance(loaded.nodes[2], PromptFlowNode)
+
+
+def test_loaded_flow_can_be_simulated(tmp_path):
+    path = str(tmp_path / "upcase.json")
+    save_flow_to_json(create_upcase_flow(LAMBDA_ARN), path)
+    simulator = FlowSimulator(load_flow_from_json(path))
+    simulator.lambda_client = MagicMock()
+    simulator.lambda_client.invoke.return_value = {
+        "Payload": MagicMock(read=lambda: '{"output": "TEST INPUT"}')
+    }
+    assert simulator.simulate("Test input") == "TEST INPUT"
+    assert simulator.lambda_client.invoke.call_args.kwargs["FunctionName"] == (
+        LAMBDA_ARN
+    )
+
+
+def test_unknown_node_types_keep_their_configuration():
+    data = {
+        "nodes": [
+            {
+                "name": "Check",
+                "type": "Condition",
+                "configuration": {"conditions": [{"name": "default"}]},
+            },
+            {
+                "name": "Retrieve",
+                "type": "KnowledgeBase",
+                "configuration": {"knowledgeBaseId": "KB1", "modelId": "m"},
+            },
+        ],
+        "connections": [],
+    }
+    flow = FlowDefinition.model_validate_json(json.dumps(data))
+    assert type(flow.nodes[0]).__name__ == "FlowNode"
+    assert json.loads(flow.model_dump_json()) == {
+        "nodes": [{**node, "inputs": [], "outputs": []} for node in data["nodes"]],
+        "connections": [],
+    }
+
+
+def large_flow(size):
+    nodes = [
+        InputFlowNode(
+            name="Start", outputs=[FlowNodeOutput(name="document", type="String")]
+        )
+    ]
+    connections = []
+    previous, output = "Start", "document"
+    for i in range(size):
+        nodes.append(
+            LambdaFunctionFlowNode(
+                name=f"Step{i}",
+                inputs=[FlowNodeInput(name="input", type="String")],
+                outputs=[FlowNodeOutput(name="functionResponse", type="String")],
+                configuration=LambdaFunctionFlowNodeConfiguration(
+                    lambdaArn=f"{LAMBDA_ARN}{i}"
+                ),
+            )
+        )
+        connections.append(
+            FlowConnection(
+                name=f"To{i}",
+                source=previous,
+                target=f"Step{i}",
+                configuration={
+                    "data": FlowDataConnectionConfiguration(
+                        sourceOutput=output, targetInput="input"
+                    )
+                },
+            )
+        )
+        previous, output = f"Step{i}", "functionResponse"
+    nodes.append(
+        OutputFlowNode(
+            name="End", inputs=[FlowNodeInput(name="document", type="String")]
+        )
+    )
+    return FlowDefinition(nodes=nodes, connections=connections)
+
+
+def test_benchmark_thousands_of_nodes(tmp_path):
+    flow = large_flow(5000)
+    path = str(tmp_path / "large.json")
+
+    start = time.perf_counter()
+    save_flow_to_json(flow, path)
+    saved = time.perf_counter() - start
+
+    start = time.perf_counter()
+    loaded = load_flow_from_json(path)
+    loaded_in = time.perf_counter() - start
+
+    assert loaded.nodes[-2].configuration.lambdaArn == f"{LAMBDA_ARN}4999"
+    assert saved < 0.5
+    assert loaded_in < 0.5
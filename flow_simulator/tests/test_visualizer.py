@@ -1,6 +1,15 @@
+import time
+
 import pytest
 from flow_simulator.visualizer import generate_mermaid
 from flow_simulator.models import (
+    FlowConnection,
+    FlowDataConnectionConfiguration,
+    FlowDefinition,
+    FlowNode,
+    FlowNodeConfiguration,
+    FlowNodeInput,
+    FlowNodeOutput,
     create_identity_flow,
     create_upcase_flow,
     create_knowledge_base_flow,
@@ -44,3 +53,114 @@ def test_generate_mermaid_knowledge_base():
     assert "Start --> |StartToPrompt| GenerateResponse" in mermaid_code
     assert "QueryKnowledgeBase --> |KBToPrompt| GenerateResponse" in mermaid_code
     assert "GenerateResponse --> |PromptToEnd| End" in mermaid_code
+
+
+def _node(name, node_type, inputs=("in",), outputs=("out",)):
+    return FlowNode(
+        name=name,
+        type=node_type,
+        inputs=[FlowNodeInput(name=port, type="String") for port in inputs],
+        outputs=[FlowNodeOutput(name=port, type="String") for port in outputs],
+        configuration=FlowNodeConfiguration(),
+    )
+
+
+def _connect(source, target):
+    return FlowConnection(
+        name=f"{source}To{target}",
+        source=source,
+        target=target,
+        configuration={
+            "data": FlowDataConnectionConfiguration(
+                sourceOutput="out", targetInput="in"
+            )
+        },
+    )
+
+
+def _variant_matrix(count):
+    nodes = [_node("Start", "Input", inputs=()), _node("End", "Output", outputs=())]
+    connections = []
+    for i in range(count):
+        nodes += [_node(f"Invoke{i}", "Prompt"), _node(f"Evaluate{i}", "Prompt")]
+        connections += [
+            _connect("Start", f"Invoke{i}"),
+            _connect(f"Invoke{i}", f"Evaluate{i}"),
+            _connect(f"Evaluate{i}", "End"),
+        ]
+    return FlowDefinition(nodes=nodes, connections=connections)
+
+
+def test_generate_mermaid_collapses_repeated_branches():
+    mermaid_code = generate_mermaid(_variant_matrix(100))
+    lines = mermaid_code.splitlines()
+    assert len(lines) < 10
+    assert 'repeated_0[["100 x repeated branch <br> 2 Prompt each"]]' in mermaid_code
+    assert "Start --> |100 connections| repeated_0" in mermaid_code
+    assert "repeated_0 --> |100 connections| End" in mermaid_code
+
+    flat = generate_mermaid(_variant_matrix(100), collapse=False)
+    assert "Invoke99 --> |Invoke99ToEvaluate99| Evaluate99" in flat
+
+
+def test_generate_mermaid_keeps_differently_configured_branches():
+    flow = _variant_matrix(100)
+    for node in flow.nodes:
+        if node.name == "Invoke7":
+            node.configuration = FlowNodeConfiguration(modelId="other-model")
+    mermaid_code = generate_mermaid(flow)
+    assert 'repeated_0[["99 x repeated branch <br> 2 Prompt each"]]' in mermaid_code
+    assert "Invoke7 --> |Invoke7ToEvaluate7| Evaluate7" in mermaid_code
+
+    small = generate_mermaid(_variant_matrix(3))
+    assert "repeated_0" not in small
+    assert "repeated_0" in generate_mermaid(_variant_matrix(3), collapse=True)
+
+
+def test_generate_mermaid_collapses_iterator_body():
+    flow = FlowDefinition(
+        nodes=[
+            _node("Start", "Input", inputs=()),
+            _node("Split", "Iterator"),
+            _node("Summarize", "Prompt"),
+            _node("Check", "LambdaFunction"),
+            _node("Gather", "Collector"),
+            _node("End", "Output", outputs=()),
+        ],
+        connections=[
+            _connect("Start", "Split"),
+            _connect("Split", "Summarize"),
+            _connect("Summarize", "Check"),
+            _connect("Check", "Gather"),
+            _connect("Gather", "End"),
+        ],
+    )
+    assert "Summarize --> |SummarizeToCheck| Check" in generate_mermaid(flow)
+    mermaid_code = generate_mermaid(flow, collapse=True)
+    assert 'Split_body[["Split body <br> 1 Prompt, 1 LambdaFunction"]]' in mermaid_code
+    assert "Split --> |SplitToSummarize| Split_body" in mermaid_code
+    assert "Split_body --> |CheckToGather| Gather" in mermaid_code
+    assert "Summarize[" not in mermaid_code
+
+
+def test_generate_mermaid_latency_overlay():
+    knowledge_base_id = "MyKnowledgeBase"
+    prompt_arn = "arn:aws:bedrock:us-west-2:123456789012:prompt/MyResponsePrompt"
+    flow = create_knowledge_base_flow(knowledge_base_id, prompt_arn)
+    latencies = [("GenerateResponse", s) for s in [1.0] * 19 + [4.0]] + [
+        ("QueryKnowledgeBase", 0.3)
+    ]
+    mermaid_code = generate_mermaid(flow, latencies=latencies)
+    assert "GenerateResponse <br> Type: Prompt <br> p95: 1.00s" in mermaid_code
+    assert "QueryKnowledgeBase <br> Type: KnowledgeBase <br> p95: 0.30s" in mermaid_code
+    assert "class GenerateResponse heat4" in mermaid_code
+    assert "class QueryKnowledgeBase heat1" in mermaid_code
+    assert "classDef heat4 fill:#d73027" in mermaid_code
+
+
+def test_generate_mermaid_large_flow_is_fast():
+    flow = _variant_matrix(2000)
+    start = time.perf_counter()
+    generate_mermaid(flow)
+    generate_mermaid(flow, collapse=False)
+    assert time.perf_counter() - start < 1.0
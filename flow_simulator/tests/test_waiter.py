@@ -0,0 +1,96 @@
+from botocore.exceptions import ClientError
+from flow_simulator.waiter import FlowPreparationWaiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class ScriptedAgent:
+    """Reports each flow as Preparing until its ready time, then its final status."""
+
+    def __init__(self, clock, ready_at, final=None):
+        self.clock = clock
+        self.ready_at = ready_at
+        self.final = final or {}
+        self.polls = {flow_id: 0 for flow_id in ready_at}
+        self.prepared = []
+        self.throttle = set()
+
+    def prepare_flow(self, flowIdentifier):
+        self.prepared.append(flowIdentifier)
+
+    def get_flow(self, flowIdentifier):
+        self.polls[flowIdentifier] += 1
+        if flowIdentifier in self.throttle:
+            self.throttle.discard(flowIdentifier)
+            raise ClientError(
+                {"Error": {"Code": "ThrottlingException", "Message": "slow down"}},
+                "GetFlow",
+            )
+        if self.clock() >= self.ready_at[flowIdentifier]:
+            return {"status": self.final.get(flowIdentifier, "Prepared")}
+        return {"status": "Preparing"}
+
+
+def make_waiter(agent, clock, **kwargs):
+    return FlowPreparationWaiter(
+        agent, clock=clock, sleep=clock.sleep, max_workers=1, **kwargs
+    )
+
+
+def test_fast_flows_are_not_quantized_to_max_delay():
+    clock = FakeClock()
+    agent = ScriptedAgent(clock, {"a": 1.0})
+    results = make_waiter(agent, clock).wait(["a"])
+    assert results["a"].prepared
+    assert results["a"].latency < 2.0
+    assert clock.sleeps[:2] == [0.5, 0.75]
+
+
+def test_many_flows_share_one_loop_and_finish_independently():
+    clock = FakeClock()
+    ready_at = {"fast": 1.0, "slow": 60.0, "broken": 3.0}
+    agent = ScriptedAgent(clock, ready_at, final={"broken": "Failed"})
+    finished = []
+    results = make_waiter(agent, clock, max_delay=5.0).prepare_and_wait(
+        list(ready_at), on_result=lambda result: finished.append(result.flow_id)
+    )
+
+    assert agent.prepared == ["fast", "slow", "broken"]
+    assert finished == ["fast", "broken", "slow"]
+    assert results["fast"].latency < 2.0
+    assert results["broken"].status == "Failed"
+    assert 60.0 <= results["slow"].latency <= 65.0
+    # Delays are capped, so a long preparation is polled every max_delay.
+    assert max(clock.sleeps) <= 5.0
+    assert agent.polls["fast"] < agent.polls["slow"]
+
+
+def test_timeout_and_throttling():
+    clock = FakeClock()
+    agent = ScriptedAgent(clock, {"stuck": float("inf"), "throttled": 0.0})
+    agent.throttle.add("throttled")
+    results = make_waiter(agent, clock, timeout=30.0).wait(["stuck", "throttled"])
+
+    assert results["stuck"].status == "Timeout"
+    assert results["stuck"].latency == 30.0
+    assert results["throttled"].prepared
+    assert results["throttled"].polls == 2
+
+
+def test_started_at_counts_time_before_waiting():
+    clock = FakeClock()
+    agent = ScriptedAgent(clock, {"a": 12.0})
+    clock.now = 10.0
+    results = make_waiter(agent, clock).wait(["a"], started_at={"a": 0.0})
+    assert results["a"].latency >= 12.0
@@ -1,13 +1,17 @@
-import json
+from typing import Optional
 from .models import FlowDefinition
 
 
-def save_flow_to_json(flow: FlowDefinition, filename: str):
+def save_flow_to_json(flow: FlowDefinition, filename: str, indent: Optional[int] = 2):
     with open(filename, "w") as f:
-        json.dump(flow.dict(), f, indent=2)
+        f.write(flow.model_dump_json(indent=indent))
 
 
 def load_flow_from_json(filename: str) -> FlowDefinition:
-    with open(filename, "r") as f:
-        data = json.load(f)
-    return FlowDefinition(**data)
+    """Load a flow saved by ``save_flow_to_json``.
+
+    Each node is validated as the typed model for its ``type``, so a loaded
+    flow keeps its Lambda ARNs, prompts and knowledge base ids.
+    """
+    with open(filename, "rb") as f:
+        return FlowDefinition.model_validate_json(f.read())
@@ -1,13 +1,213 @@
+import json
+import math
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
+
 from .models import FlowDefinition
 
+# Cool to hot, for nodes from fastest to slowest p95 latency.
+HEAT_COLORS = ["#1a9850", "#91cf60", "#fee08b", "#fc8d59", "#d73027"]
+
+Latencies = Union[Mapping[str, Sequence[float]], Iterable[Tuple[str, float]]]
+
+# Flows with more nodes than this are collapsed unless told otherwise.
+COLLAPSE_THRESHOLD = 50
+
+
+def percentile(samples: Sequence[float], q: float = 95) -> float:
+    """Nearest-rank percentile."""
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+def latency_percentiles(latencies: Latencies, q: float = 95) -> Dict[str, float]:
+    """Per-node percentile from ``{node: [seconds, ...]}`` or from
+    ``(node, seconds)`` pairs such as ``estimator.trace_latencies`` returns."""
+    if isinstance(latencies, Mapping):
+        samples = latencies
+    else:
+        samples = defaultdict(list)
+        for name, seconds in latencies:
+            samples[name].append(seconds)
+    return {name: percentile(values, q) for name, values in samples.items() if values}
+
+
+def _iterator_bodies(flow: FlowDefinition) -> Dict[str, List[str]]:
+    """Nodes between each Iterator and the Collectors it reaches."""
+    graph = flow.graph
+    bodies = {}
+    for iterator in graph.nodes_of_type("Iterator"):
+        body, stack = [], graph.successors(iterator.name)
+        seen = set(stack)
+        while stack:
+            name = stack.pop()
+            if graph.nodes[name].type in ("Collector", "Output"):
+                continue
+            body.append(name)
+            for successor in graph.successors(name):
+                if successor not in seen:
+                    seen.add(successor)
+                    stack.append(successor)
+        if body:
+            bodies[f"{iterator.name}_body"] = body
+    return bodies
+
+
+def _repeated_groups(
+    flow: FlowDefinition, excluded: set, min_repeats: int
+) -> Dict[str, List[List[str]]]:
+    """Group connected pieces of the flow that have the same shape.
+
+    Input and Output nodes are left out, so the branches of a flow that fans
+    out from Start become separate pieces. Pieces match when their node
+    types, node configurations and internal connections are the same in
+    declaration order.
+    """
+    graph = flow.graph
+    candidates = [
+        name
+        for name, node in graph.nodes.items()
+        if name not in excluded and node.type not in ("Input", "Output")
+    ]
+    parent = {name: name for name in candidates}
+
+    def find(name):
+        while parent[name] != name:
+            parent[name] = parent[parent[name]]
+            name = parent[name]
+        return name
+
+    for conn in flow.connections:
+        if conn.source in parent and conn.target in parent:
+            parent[find(conn.source)] = find(conn.target)
 
-def generate_mermaid(flow: FlowDefinition) -> str:
-    mermaid_code = ["graph TD"]
+    pieces = defaultdict(list)
+    for name in candidates:
+        pieces[find(name)].append(name)
 
+    by_shape = defaultdict(list)
+    for members in pieces.values():
+        position = {name: i for i, name in enumerate(members)}
+        edges = sorted(
+            (position[conn.source], position[conn.target])
+            for name in members
+            for conn in graph.outgoing.get(name, ())
+            if conn.target in position
+        )
+        nodes = tuple(
+            (graph.nodes[name].type, _configuration_key(graph.nodes[name]))
+            for name in members
+        )
+        shape = (nodes, tuple(edges))
+        by_shape[shape].append(members)
+
+    groups = {}
+    for instances in by_shape.values():
+        if len(instances) >= min_repeats:
+            groups[f"repeated_{len(groups)}"] = instances
+    return groups
+
+
+def _configuration_key(node) -> str:
+    return json.dumps(
+        node.configuration.model_dump(mode="json", exclude_none=True), sort_keys=True
+    )
+
+
+def _type_summary(flow: FlowDefinition, names: Iterable[str]) -> str:
+    counts = Counter(flow.graph.nodes[name].type for name in names)
+    return ", ".join(f"{count} {node_type}" for node_type, count in counts.items())
+
+
+def _heat_class(value: float, hottest: float) -> str:
+    if hottest <= 0:
+        return "heat0"
+    bucket = min(len(HEAT_COLORS) - 1, int(value / hottest * len(HEAT_COLORS)))
+    return f"heat{bucket}"
+
+
+def generate_mermaid(
+    flow: FlowDefinition,
+    latencies: Optional[Latencies] = None,
+    collapse: Optional[bool] = None,
+    min_repeats: int = 2,
+) -> str:
+    """Render ``flow`` as a Mermaid flowchart.
+
+    With ``collapse``, the bodies of Iterator nodes and identically configured
+    pieces of the flow that repeat at least ``min_repeats`` times are each
+    drawn as one summary node. By default only flows with more than
+    ``COLLAPSE_THRESHOLD`` nodes are collapsed. ``latencies`` (recorded
+    seconds per node) adds each node's p95 to its label and colors nodes
+    from cool to hot.
+    """
+    p95 = latency_percentiles(latencies) if latencies is not None else {}
+
+    clusters: Dict[str, str] = {}  # cluster id -> label
+    members: Dict[str, List[str]] = {}
+    if collapse is None:
+        collapse = len(flow.nodes) > COLLAPSE_THRESHOLD
+    if collapse:
+        for cluster, body in _iterator_bodies(flow).items():
+            clusters[cluster] = (
+                f"{cluster[: -len('_body')]} body <br> {_type_summary(flow, body)}"
+            )
+            members[cluster] = body
+        excluded = {name for body in members.values() for name in body}
+        for cluster, instances in _repeated_groups(flow, excluded, min_repeats).items():
+            names = [name for instance in instances for name in instance]
+            clusters[cluster] = (
+                f"{len(instances)} x repeated branch <br> "
+                f"{_type_summary(flow, instances[0])} each"
+            )
+            members[cluster] = names
+    owner = {name: cluster for cluster, names in members.items() for name in names}
+
+    node_lines = []
+    heat = {}
     for node in flow.nodes:
-        mermaid_code.append(f"    {node.name}[{node.name} <br> Type: {node.type}]")
+        if node.name in owner:
+            continue
+        label = f"{node.name} <br> Type: {node.type}"
+        if node.name in p95:
+            label += f" <br> p95: {p95[node.name]:.2f}s"
+            heat[node.name] = p95[node.name]
+        node_lines.append(f"    {node.name}[{label}]")
+
+    for cluster, label in clusters.items():
+        recorded = [p95[name] for name in members[cluster] if name in p95]
+        if recorded:
+            label += f" <br> max p95: {max(recorded):.2f}s"
+            heat[cluster] = max(recorded)
+        node_lines.append(f'    {cluster}[["{label}"]]')
 
+    edge_lines = []
+    collapsed_edges: Dict[Tuple[str, str], List[str]] = {}
     for conn in flow.connections:
-        mermaid_code.append(f"    {conn.source} --> |{conn.name}| {conn.target}")
+        source = owner.get(conn.source, conn.source)
+        target = owner.get(conn.target, conn.target)
+        if source == target and source in clusters:
+            continue
+        if source == conn.source and target == conn.target:
+            edge_lines.append(f"    {source} --> |{conn.name}| {target}")
+        else:
+            collapsed_edges.setdefault((source, target), []).append(conn.name)
+    for (source, target), names in collapsed_edges.items():
+        label = names[0] if len(names) == 1 else f"{len(names)} connections"
+        edge_lines.append(f"    {source} --> |{label}| {target}")
+
+    style_lines = []
+    if heat:
+        hottest = max(heat.values())
+        style_lines = [
+            f"    classDef heat{i} fill:{color}" for i, color in enumerate(HEAT_COLORS)
+        ]
+        by_class = defaultdict(list)
+        for name, value in heat.items():
+            by_class[_heat_class(value, hottest)].append(name)
+        style_lines += [
+            f"    class {','.join(names)} {heat_class}"
+            for heat_class, names in sorted(by_class.items())
+        ]
 
-    return "\n".join(mermaid_code)
+    return "\n".join(["graph TD"] + node_lines + edge_lines + style_lines)
@@ -0,0 +1,141 @@
+import heapq
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Optional
+
+from botocore.exceptions import ClientError
+from pydantic import BaseModel
+
+TERMINAL_STATUSES = ("Prepared", "Failed")
+THROTTLING_CODES = ("ThrottlingException", "TooManyRequestsException")
+
+
+class PreparationResult(BaseModel):
+    flow_id: str
+    status: str
+    latency: float
+    polls: int
+    error: Optional[str] = None
+
+    @property
+    def prepared(self) -> bool:
+        return self.status == "Prepared"
+
+
+class FlowPreparationWaiter:
+    """Wait for many flows to finish preparing from a single polling loop.
+
+    Each flow is polled on its own schedule, starting at ``initial_delay`` and
+    growing by ``multiplier`` up to ``max_delay``, so short preparations are
+    noticed within a fraction of a second while long ones are not polled
+    hard. Flows are reported as soon as they reach ``Prepared`` or
+    ``Failed``; ``latency`` is measured from when preparation started.
+    """
+
+    def __init__(
+        self,
+        bedrock_agent,
+        initial_delay: float = 0.5,
+        max_delay: float = 10.0,
+        multiplier: float = 1.5,
+        timeout: float = 300.0,
+        max_workers: int = 8,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.bedrock_agent = bedrock_agent
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self.clock = clock
+        self.sleep = sleep
+
+    def _poll(self, flow_id: str):
+        try:
+            return self.bedrock_agent.get_flow(flowIdentifier=flow_id)["status"], None
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in THROTTLING_CODES:
+                return None, None
+            return "Failed", str(e)
+
+    def wait(
+        self,
+        flow_ids: Iterable[str],
+        started_at: Optional[Dict[str, float]] = None,
+        on_result: Optional[Callable[[PreparationResult], None]] = None,
+    ) -> Dict[str, PreparationResult]:
+        """Poll until every flow is prepared, failed or past ``timeout``.
+
+        ``started_at`` maps flow ids to ``clock()`` readings taken when
+        preparation was requested; flows without one start now. Flows that
+        run out of time are reported with status ``Timeout``.
+        """
+        now = self.clock()
+        started_at = dict(started_at or {})
+        flow_ids = list(dict.fromkeys(flow_ids))
+        for flow_id in flow_ids:
+            started_at.setdefault(flow_id, now)
+
+        delays = {flow_id: self.initial_delay for flow_id in flow_ids}
+        polls = {flow_id: 0 for flow_id in flow_ids}
+        results: Dict[str, PreparationResult] = {}
+        # (next poll time, flow id); the first poll happens right away.
+        schedule = [(now, flow_id) for flow_id in flow_ids]
+        heapq.heapify(schedule)
+
+        def finish(flow_id, status, error=None):
+            results[flow_id] = PreparationResult(
+                flow_id=flow_id,
+                status=status,
+                latency=self.clock() - started_at[flow_id],
+                polls=polls[flow_id],
+                error=error,
+            )
+            if on_result:
+                on_result(results[flow_id])
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while schedule:
+                wake_at = schedule[0][0]
+                now = self.clock()
+                if wake_at > now:
+                    self.sleep(wake_at - now)
+                    now = self.clock()
+
+                due = []
+                while schedule and schedule[0][0] <= now:
+                    due.append(heapq.heappop(schedule)[1])
+                statuses = executor.map(self._poll, due)
+
+                for flow_id, (status, error) in zip(due, statuses):
+                    polls[flow_id] += 1
+                    if status in TERMINAL_STATUSES:
+                        finish(flow_id, status, error)
+                        continue
+                    remaining = self.timeout - (self.clock() - started_at[flow_id])
+                    if remaining <= 0:
+                        finish(flow_id, "Timeout", f"last status: {status}")
+                        continue
+                    if status is None:
+                        # Throttled: back off harder than the normal schedule.
+                        delays[flow_id] *= 2
+                    delay = min(delays[flow_id], self.max_delay)
+                    delays[flow_id] = min(delay * self.multiplier, self.max_delay)
+                    delay = min(delay, remaining)
+                    heapq.heappush(schedule, (self.clock() + delay, flow_id))
+
+        return {flow_id: results[flow_id] for flow_id in flow_ids}
+
+    def prepare_and_wait(
+        self,
+        flow_ids: Iterable[str],
+        on_result: Optional[Callable[[PreparationResult], None]] = None,
+    ) -> Dict[str, PreparationResult]:
+        """Start preparing each flow, then wait for all of them."""
+        started_at = {}
+        for flow_id in flow_ids:
+            started_at[flow_id] = self.clock()
+            self.bedrock_agent.prepare_flow(flowIdentifier=flow_id)
+        return self.wait(started_at, started_at, on_result)
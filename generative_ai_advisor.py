@@ -6,254 +6,141 @@ Generative AI Advisor CLI with Project Assessment
 This script provides a command-line interface for getting advice on AI projects
 from different C-suite perspectives, decomposes the chosen project, assesses its feasibility,
 and coordinates project implementation across teams.
+
+Only click is imported at startup, so --help and argument errors are immediate.
+LangChain, boto3 and pydantic are loaded with advisor_pipeline when a command runs;
+the pipeline's names are also available as attributes of this module.
 """
 
 import json
-from typing import List, Dict
-from itertools import cycle
+import sys
+from typing import Optional
 
 import click
-from pydantic import BaseModel, Field
-import boto3
-from langchain.chains import MultiPromptChain, LLMChain
-from langchain_community.llms import Bedrock
-from langchain.prompts import PromptTemplate
+from click.core import ParameterSource
 
-class PromptInfo(BaseModel):
-    """
-    Represents information about a specific prompt.
-    """
-    name: str
-    description: str
-    prompt_template: str
+DEFAULT_QUESTION = "What are some good initial projects for getting started with AI?"
 
-class AdvisorConfig(BaseModel):
-    """
-    Configuration for the Generative AI Advisor.
-    """
-    model_id: str = Field(default="anthropic.claude-instant-v1")
-    prompt_infos: List[PromptInfo] = Field(default_factory=list)
+def __getattr__(name: str):
+    import advisor_pipeline
 
-    class Config:
-        protected_namespaces = ()
+    try:
+        return getattr(advisor_pipeline, name)
+    except AttributeError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
 
-def create_prompt_infos() -> List[PromptInfo]:
+def pipeline_options(command):
     """
-    Create a list of PromptInfo objects with predefined C-suite roles.
-    
-    Returns:
-        List[PromptInfo]: A list of PromptInfo objects.
-    """
-    prompts = [
-        PromptInfo(
-            name="CTO",
-            description="Good for overseeing technological needs and operations, including developing technology strategy, managing IT systems and infrastructure, and directing technology initiatives.",
-            prompt_template="""You're the CTO, CIO, and CDO of the company. You oversee all the technological, data needs and operations, including developing technology strategy, managing IT systems and infrastructure, and directing technology initiatives.
-Your job is keeping the company technologically updated in an efficient way.
-Human: {input}"""
-        ),
-        PromptInfo(
-            name="CFO",
-            description="Good for overseeing all financial activities, including financial planning, cash flow management, accounting, reporting, and risk management.",
-            prompt_template="""You're the Chief Financial Officer (CFO) of the company. You oversee all financial activities, including financial planning, cash flow management, accounting, reporting, and risk management.
-Your job is keeping the company financially profitable while ensuring growth.
-Human: {input}"""
-        ),
-        PromptInfo(
-            name="COO",
-            description="Good for overseeing day-to-day business operations and corporate strategy implementation.",
-            prompt_template="""You're the Chief Operating Officer (COO) of the company. You oversee the day-to-day business operations and corporate strategy implementation.
-Your job is ensuring the company operates efficiently and effectively by having a good strategy and culture.
-Human: {input}"""
-        )
-    ]
-    return prompts
+    Add the options shared by every command that runs the pipeline.
 
-def create_multi_prompt_chain(config: AdvisorConfig) -> MultiPromptChain:
-    """
-    Create a MultiPromptChain using the provided configuration.
-    
     Args:
-        config (AdvisorConfig): The configuration for the advisor.
-    
-    Returns:
-        MultiPromptChain: A configured MultiPromptChain object.
-    """
-    llm = Bedrock(model_id=config.model_id)
-    return MultiPromptChain.from_prompts(
-        llm,
-        prompt_infos=[prompt_info.dict() for prompt_info in config.prompt_infos],
-        verbose=True
-    )
+        command: The click command function.
 
-def decompose_project(project: str, model_id: str) -> str:
-    """
-    Decompose the chosen project into smaller, manageable tasks.
-    
-    Args:
-        project (str): The chosen project to decompose.
-        model_id (str): The model ID to use for the LLM.
-    
     Returns:
-        str: A detailed breakdown of the project into smaller tasks.
-    """
-    llm = Bedrock(model_id=model_id)
-    
-    decomposer_template = """
-    You are a project decomposition specialist. Your task is to break down the following AI project into smaller, manageable tasks:
-
-    Project: {project}
-
-    Please provide a detailed breakdown of this project into:
-    1. Main phases
-    2. Specific tasks within each phase
-    3. Estimated time for each task
-    4. Dependencies between tasks
+        The command with the options added.
+    """
+    options = [
+        click.option('--model', default="anthropic.claude-instant-v1", help='The model ID to use for the LLM'),
+        click.option('--teams', default=None, help='Comma-separated teams to coordinate [default: all]'),
+        click.option('--max-concurrency', default=4, type=click.IntRange(min=1),
+                     help='Maximum concurrent model calls per question'),
+        click.option('--cache-path', default=".advisor_cache.db", help='SQLite file caching model responses'),
+        click.option('--cache-size', default=10000, type=click.IntRange(min=1),
+                     help='Maximum number of cached responses'),
+        click.option('--no-cache', is_flag=True, help='Always call the model'),
+    ]
+    for option in reversed(options):
+        command = option(command)
+    return command
 
-    Your decomposition:
+def load_config(model: str, teams: str, max_concurrency: int, cache_path: str, cache_size: int,
+                no_cache: bool):
     """
-    
-    decomposer_prompt = PromptTemplate(
-        input_variables=["project"],
-        template=decomposer_template
-    )
-    
-    decomposer_chain = LLMChain(llm=llm, prompt=decomposer_prompt)
-    return decomposer_chain.run(project=project)
+    Import the pipeline, turn on the response cache and build the advisor configuration.
 
-def assess_project(project: str, decomposition: str, model_id: str) -> str:
-    """
-    Assess the feasibility and potential challenges of the project.
-    
-    Args:
-        project (str): The chosen project to assess.
-        decomposition (str): The project decomposition.
-        model_id (str): The model ID to use for the LLM.
-    
     Returns:
-        str: An assessment of the project's feasibility and potential challenges.
+        AdvisorConfig: The configuration for the advisor.
     """
-    llm = Bedrock(model_id=model_id)
-    
-    assessor_template = """
-    You are a project assessment specialist. Your task is to evaluate the feasibility and potential challenges of the following AI project:
-
-    Project: {project}
+    from advisor_pipeline import AdvisorConfig, create_prompt_infos, enable_response_cache
 
-    Project Decomposition:
-    {decomposition}
+    if not no_cache:
+        enable_response_cache(cache_path, cache_size)
 
-    Please provide an assessment that includes:
-    1. Overall feasibility of the project
-    2. Potential technical challenges
-    3. Resource requirements (personnel, technology, time)
-    4. Risks and mitigation strategies
-    5. Recommendations for successful implementation
+    config = AdvisorConfig(model_id=model, prompt_infos=create_prompt_infos(), max_concurrency=max_concurrency)
+    if teams:
+        config.teams = [team.strip() for team in teams.split(",") if team.strip()]
+    return config
 
-    Your assessment:
-    """
-    
-    assessor_prompt = PromptTemplate(
-        input_variables=["project", "decomposition"],
-        template=assessor_template
-    )
-    
-    assessor_chain = LLMChain(llm=llm, prompt=assessor_prompt)
-    return assessor_chain.run(project=project, decomposition=decomposition)
-
-def coordinate_project(project: str, decomposition: str, assessment: str, model_id: str):
-    """
-    Coordinate the project implementation across different teams.
-    
-    Args:
-        project (str): The chosen project to implement.
-        decomposition (str): The project decomposition.
-        assessment (str): The project assessment.
-        model_id (str): The model ID to use for the LLM.
-    """
-    llm = Bedrock(model_id=model_id)
-    
-    teams = [
-        "backend-developer",
-        "code-architect",
-        "database-specialist",
-        "devops-engineer",
-        "frontend-developer",
-        "project-manager",
-        "qa-tester",
-        "security-specialist",
-        "technical-writer"
-    ]
-    
-    coordinator_template = """
-    You are the project coordinator for an AI implementation project. The chosen project is: {project}
-
-    Project Decomposition:
-    {decomposition}
-
-    Project Assessment:
-    {assessment}
-
-    You need to provide specific tasks and guidelines for the {team} team.
-
-    Please outline the key responsibilities, tasks, and considerations for the {team} team in implementing this AI project.
-    Be specific and provide actionable items, considering the project decomposition and assessment.
-
-    {team} team tasks and guidelines:
-    """
-    
-    coordinator_prompt = PromptTemplate(
-        input_variables=["project", "decomposition", "assessment", "team"],
-        template=coordinator_template
-    )
-    
-    coordinator_chain = LLMChain(llm=llm, prompt=coordinator_prompt)
-    
-    click.echo("\nProject Coordination Plan:")
-    for team in teams:
-        result = coordinator_chain.run(project=project, decomposition=decomposition, assessment=assessment, team=team)
-        click.echo(f"\n{team.upper()}:")
-        click.echo(result.strip())
-
-@click.command()
-@click.option('--question', default="What are some good initial projects for getting started with AI?", 
-              prompt='Enter your question about AI projects', help='The question to ask the advisors')
-@click.option('--model', default="anthropic.claude-instant-v1", help='The model ID to use for the LLM')
-def main(question: str, model: str):
+@click.group(invoke_without_command=True)
+@click.option('--question', default=None, help='The question to ask the advisors [prompted if omitted]')
+@click.option('--speculate', default=0, type=click.IntRange(min=0),
+              help='Prepare the top N suggested projects while you choose')
+@pipeline_options
+@click.pass_context
+def main(ctx, question: Optional[str], speculate: int, **options):
     """
     Run the Generative AI Advisor CLI with Project Assessment and Team Coordination.
-    
+
     This CLI tool provides advice on AI projects from different C-suite perspectives,
-    decomposes the chosen project, assesses its feasibility, and coordinates project 
-    implementation across teams.
-    """
-    config = AdvisorConfig(model_id=model, prompt_infos=create_prompt_infos())
-    mpc = create_multi_prompt_chain(config)
-    
-    result = mpc.run(input=question)
-    click.echo(result)
-    
-    projects = result.split('\n')
-    projects = [p.strip() for p in projects if p.strip()]
-    
-    click.echo("\nSuggested projects:")
-    for i, project in enumerate(projects, 1):
-        click.echo(f"{i}. {project}")
-    
-    project_choice = click.prompt("Choose a project number to implement", type=int, default=1)
-    chosen_project = projects[project_choice - 1]
-    
-    click.echo(f"\nYou've chosen to implement: {chosen_project}")
-    
-    click.echo("\nDecomposing the project...")
-    decomposition = decompose_project(chosen_project, model)
-    click.echo(decomposition)
-    
-    click.echo("\nAssessing the project...")
-    assessment = assess_project(chosen_project, decomposition, model)
-    click.echo(assessment)
-    
-    coordinate_project(chosen_project, decomposition, assessment, model)
+    decomposes the chosen project, assesses its feasibility, and coordinates project
+    implementation across teams. Without a command, runs ask with the options given
+    here, so `generative_ai_advisor.py --question ... --model ...` still works. Options
+    given here before a command become that command's defaults.
+    """
+    if ctx.invoked_subcommand is None:
+        if question is None:
+            question = click.prompt('Enter your question about AI projects', default=DEFAULT_QUESTION)
+        ctx.invoke(ask, question=question, speculate=speculate, **options)
+        return
+
+    given = {name: value for name, value in ctx.params.items()
+             if ctx.get_parameter_source(name) is not ParameterSource.DEFAULT}
+    command = main.get_command(ctx, ctx.invoked_subcommand)
+    unsupported = [name for name in given if name not in {param.name for param in command.params}]
+    if unsupported:
+        flags = ", ".join("--" + name.replace("_", "-") for name in unsupported)
+        raise click.UsageError(f"{flags} cannot be used with {ctx.invoked_subcommand}")
+    ctx.default_map = {ctx.invoked_subcommand: given}
+
+@main.command()
+@click.option('--question', default=DEFAULT_QUESTION, prompt='Enter your question about AI projects',
+              help='The question to ask the advisors')
+@click.option('--speculate', default=0, type=click.IntRange(min=0),
+              help='Prepare the top N suggested projects while you choose')
+@pipeline_options
+def ask(question: str, speculate: int, **options):
+    """
+    Ask one question and choose the project to implement interactively.
+    """
+    from advisor_pipeline import run_advisor
+
+    config = load_config(**options)
+    config.speculate = speculate
+    run_advisor(question, config)
+
+@main.command()
+@click.argument('questions', type=click.File('r'))
+@click.option('--output', type=click.File('w'), default='-', help='JSONL file for the reports [default: stdout]')
+@click.option('--max-questions', default=4, type=click.IntRange(min=1), help='Questions advised on at once')
+@pipeline_options
+def batch(questions, output, max_questions: int, **options):
+    """
+    Advise on every question in a JSONL file without prompting.
+
+    Each line is {"question": ..., "project": ...}; "project" is optional and is a
+    1-based number among the suggested projects or a project description. One
+    JSON report per question is written as soon as it finishes, with the seconds
+    spent in each stage.
+    """
+    from advisor_pipeline import run_batch
+
+    items = [json.loads(line) for line in questions if line.strip()]
+    missing = [i for i, item in enumerate(items) if not item.get("question")]
+    if missing:
+        raise click.BadParameter(f'lines {missing} have no "question"', param_hint='QUESTIONS')
+    failures = run_batch(items, load_config(**options), output, max_questions=max_questions)
+    click.echo(f"{len(items)} questions advised on, {failures} failed", err=True)
+    sys.exit(1 if failures else 0)
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,239 @@
+import json
+import re
+
+JUDGE_KEYS = ("answer-score", "prompt-score", "justification", "prompt-recommendations")
+SCORE_KEYS = ("answer-score", "prompt-score")
+
+_FENCE = re.compile(r"```[A-Za-z0-9_-]*[ \t]*\n?(.*?)(?:```|\Z)", re.DOTALL)
+_SIGNIFICANT = re.compile(r'[{}"\\]')
+_TRAILING_COMMA = re.compile(r",(\s*[}\]])")
+_KEY_SEPARATORS = re.compile(r"[\s_]+")
+_CAMEL = re.compile(r"(?<=[a-z])(?=[A-Z])")
+_SCORE = re.compile(r"-?\d+(?:\.\d+)?")
+
+# Spellings judges use instead of the keys the evaluator template asks for.
+_KEY_ALIASES = {
+    "answer-score": "answer-score",
+    "answerscore": "answer-score",
+    "prompt-score": "prompt-score",
+    "promptscore": "prompt-score",
+    "justification": "justification",
+    "justifications": "justification",
+    "prompt-recommendations": "prompt-recommendations",
+    "prompt-recommendation": "prompt-recommendations",
+    "promptrecommendations": "prompt-recommendations",
+    "recommendations": "prompt-recommendations",
+}
+
+
+class JudgeOutputError(ValueError):
+    """Raised when judge output cannot be turned into an evaluation.
+
+    ``reason`` is a short machine-readable label ("empty", "no-json-object",
+    "unbalanced-braces", "invalid-json", "not-an-object", "missing-keys") that
+    the scale runner stores next to the failed item.
+    """
+
+    def __init__(self, reason, message, raw=None):
+        super().__init__(message)
+        self.reason = reason
+        self.raw = raw
+
+
+def strip_code_fences(text):
+    """Return the body of the first fenced block, or ``text`` if there is none."""
+    match = _FENCE.search(text)
+    if match and "{" in match.group(1):
+        return match.group(1)
+    return text
+
+
+class JsonObjectScanner:
+    """Find top-level balanced ``{...}`` spans in text that arrives in chunks.
+
+    Scanning only visits braces, quotes and backslashes, so prose around the
+    objects is skipped at regex speed. Only the chunks of an object that is
+    still open are retained between calls.
+    """
+
+    def __init__(self):
+        self.depth = 0
+        self._in_string = False
+        self._escape_next = False
+        self._parts = []
+
+    @property
+    def partial(self):
+        return "".join(self._parts)
+
+    def feed(self, chunk):
+        """Return the objects completed by ``chunk``, in order."""
+        objects = []
+        start = 0
+        escaped_at = 0 if self._escape_next else -1
+        self._escape_next = False
+        for match in _SIGNIFICANT.finditer(chunk):
+            pos = match.start()
+            char = chunk[pos]
+            if pos == escaped_at:
+                continue
+            if char == "\\":
+                if self._in_string:
+                    escaped_at = pos + 1
+            elif char == '"':
+                self._in_string = self.depth > 0 and not self._in_string
+            elif self._in_string:
+                continue
+            elif char == "{":
+                if self.depth == 0:
+                    start = pos
+                self.depth += 1
+            elif self.depth > 0:
+                self.depth -= 1
+                if self.depth == 0:
+                    self._parts.append(chunk[start : pos + 1])
+                    objects.append("".join(self._parts))
+                    self._parts = []
+
+        if self.depth > 0:
+            self._parts.append(chunk[start:])
+            self._escape_next = escaped_at == len(chunk)
+        return objects
+
+
+def iter_json_objects(text):
+    """Yield each top-level balanced ``{...}`` span in ``text``.
+
+    Raises ``JudgeOutputError`` if no object starts or the last one is never
+    closed.
+    """
+    if "{" not in text:
+        raise JudgeOutputError("no-json-object", "No JSON object found", text)
+
+    scanner = JsonObjectScanner()
+    yield from scanner.feed(text)
+    if scanner.depth > 0:
+        raise JudgeOutputError(
+            "unbalanced-braces", "JSON object is not closed", scanner.partial
+        )
+
+
+def find_json_object(text):
+    """Return the first balanced ``{...}`` span in ``text``."""
+    for candidate in iter_json_objects(text):
+        return candidate
+    raise JudgeOutputError("no-json-object", "No JSON object found", text)
+
+
+def normalize_key(key):
+    """Map a judge key such as ``answer_score`` or ``Answer Score`` to ``answer-score``.
+
+    Keys that are not spellings of a judge key are returned unchanged.
+    """
+    folded = _KEY_SEPARATORS.sub("-", _CAMEL.sub("-", key.strip())).lower()
+    return _KEY_ALIASES.get(folded) or _KEY_ALIASES.get(folded.replace("-", ""), key)
+
+
+def normalize_score(value):
+    """Coerce scores like ``"85"``, ``"85/100"`` or ``85.0`` to a number."""
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str):
+        match = _SCORE.search(value)
+        if match:
+            number = float(match.group())
+            return int(number) if number.is_integer() else number
+    return value
+
+
+def normalize_judge_keys(evaluation):
+    normalized = {}
+    for key, value in evaluation.items():
+        name = normalize_key(key) if isinstance(key, str) else key
+        normalized[name] = normalize_score(value) if name in SCORE_KEYS else value
+    return normalized
+
+
+def _loads(candidate):
+    try:
+        return json.loads(candidate, strict=False)
+    except json.JSONDecodeError:
+        pass
+    # Trailing commas are the most common hand-written JSON slip.
+    return json.loads(_TRAILING_COMMA.sub(r"\1", candidate), strict=False)
+
+
+def _recover_object(text, raw):
+    error = None
+    try:
+        for candidate in iter_json_objects(text):
+            try:
+                evaluation = _loads(candidate)
+            except json.JSONDecodeError as e:
+                error = error or e
+                continue
+            if isinstance(evaluation, dict):
+                return evaluation
+    except JudgeOutputError as e:
+        # A stray brace in trailing prose should not hide an earlier error.
+        if error is None:
+            e.raw = raw
+            raise
+    if error is None:
+        raise JudgeOutputError("no-json-object", "No JSON object found", raw)
+    raise JudgeOutputError("invalid-json", f"Invalid JSON: {error}", raw)
+
+
+def parse_judge_output(text, required=()):
+    """Extract the evaluation object from raw judge output without re-invoking the model.
+
+    Tolerates prose around the JSON, code fences, raw newlines inside strings,
+    trailing commas and key spelling variants. Raises ``JudgeOutputError``
+    labelled with the reason when nothing usable can be recovered.
+    """
+    if text is None or not text.strip():
+        raise JudgeOutputError("empty", "Judge output is empty", text)
+
+    try:
+        evaluation = json.loads(text)
+    except json.JSONDecodeError:
+        evaluation = _recover_object(strip_code_fences(text), text)
+
+    if not isinstance(evaluation, dict):
+        raise JudgeOutputError(
+            "not-an-object", "Judge output is not a JSON object", text
+        )
+
+    evaluation = normalize_judge_keys(evaluation)
+    missing = [key for key in required if key not in evaluation]
+    if missing:
+        raise JudgeOutputError(
+            "missing-keys", f"Missing keys: {', '.join(missing)}", text
+        )
+    return evaluation
+
+
+def reparse_failed_results(results, required=()):
+    """Retry parsing of failed items from their stored ``raw-output``.
+
+    Returns the number of items repaired; repaired items are replaced in place.
+    """
+    repaired = 0
+    for i, result in enumerate(results):
+        raw = result.get("raw-output")
+        if "parse-error" not in result or raw is None:
+            continue
+        try:
+            evaluation = parse_judge_output(raw, required)
+        except JudgeOutputError as e:
+            result["parse-error"] = e.reason
+            result["error"] = str(e)
+            continue
+        for key in ("modelInvoke", "modelEval"):
+            if key in result:
+                evaluation[key] = result[key]
+        results[i] = evaluation
+        repaired += 1
+    return repaired
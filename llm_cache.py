@@ -0,0 +1,88 @@
+import hashlib
+import sqlite3
+import time
+from contextlib import contextmanager
+
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    llm_string TEXT NOT NULL,
+    prompt TEXT NOT NULL,
+    generations TEXT NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used);
+"""
+
+
+def cache_key(prompt, llm_string):
+    return hashlib.sha256(f"{llm_string}\0{prompt}".encode("utf-8")).hexdigest()
+
+
+class SQLiteLRUCache(BaseCache):
+    """LangChain response cache in a SQLite file, keyed by model and prompt.
+
+    ``llm_string`` carries the model id and parameters, so the same prompt
+    sent to another model or with another temperature is a miss. Once more
+    than ``max_entries`` responses are stored, the least recently used ones
+    are evicted. Each call opens its own connection, so the cache can be
+    shared by threads.
+    """
+
+    def __init__(self, path=".llm_cache.db", max_entries=10000, timeout=30.0):
+        self.path = path
+        self.max_entries = max_entries
+        self.timeout = timeout
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def lookup(self, prompt, llm_string):
+        key = cache_key(prompt, llm_string)
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT generations FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key)
+            )
+        return loads(row[0])
+
+    def update(self, prompt, llm_string, return_val):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                (
+                    cache_key(prompt, llm_string),
+                    llm_string,
+                    prompt,
+                    dumps(list(return_val)),
+                    time.time(),
+                ),
+            )
+            conn.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses "
+                "ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def clear(self, **kwargs):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM responses")
+
+    # Not __len__: LangChain skips caches that are falsy, as an empty one would be.
+    def size(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
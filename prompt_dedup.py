@@ -0,0 +1,251 @@
+import json
+import re
+from typing import Dict, List, Optional
+
+import click
+import numpy as np
+
+from prompt_prescorer import PASS_SCORE
+
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+SCORE_KEYS = ("answer-score", "prompt-score")
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def lsh_params(threshold, num_perm):
+    """Bands and rows per band whose S-curve ``(1 / bands) ** (1 / rows)``
+    crosses closest to ``threshold``."""
+    best = None
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        error = abs((1 / bands) ** (1 / rows) - threshold)
+        if best is None or error < best[0]:
+            best = (error, bands, rows)
+    return best[1], best[2]
+
+
+class MinHasher:
+    """MinHash signatures over character shingles of normalized text.
+
+    Shingles are hashed with a rolling polynomial over the UTF-8 bytes, so a
+    typo only changes the ``shingle_size`` shingles that cover it. Both the
+    shingle hashes and the ``num_perm`` permutations are computed with numpy.
+    """
+
+    def __init__(self, num_perm=128, shingle_size=3, seed=1):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, 1 << 31, num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, 1 << 31, num_perm, dtype=np.uint64)
+        self.powers = np.array(
+            [pow(31, i, 1 << 32) for i in reversed(range(shingle_size))],
+            dtype=np.uint64,
+        )
+
+    def shingles(self, text):
+        data = _WHITESPACE.sub(" ", text.lower()).strip().encode("utf-8")
+        data = np.frombuffer(data.ljust(self.shingle_size), dtype=np.uint8)
+        windows = np.lib.stride_tricks.sliding_window_view(data, self.shingle_size)
+        return np.unique((windows.astype(np.uint64) @ self.powers) & MAX_HASH)
+
+    def signature(self, text):
+        shingles = self.shingles(text)[:, None]
+        hashed = (shingles * self.a + self.b) % MERSENNE_PRIME & MAX_HASH
+        return hashed.min(axis=0).astype(np.uint32)
+
+
+def jaccard(signature, other):
+    """Estimated Jaccard similarity of the texts behind two signatures."""
+    return float(np.mean(signature == other))
+
+
+class NearDuplicateIndex:
+    """Streaming near-duplicate clustering with MinHash LSH.
+
+    Each added prompt joins the cluster of the most similar representative
+    at or above ``threshold``, or starts a new cluster as its representative.
+    Only representatives are kept (their signatures and LSH band keys), so
+    memory grows with the number of distinct prompts rather than the size of
+    the dataset; membership is returned from ``add`` for the caller to
+    stream out.
+    """
+
+    def __init__(self, threshold=0.8, num_perm=128, shingle_size=3, seed=1):
+        self.threshold = threshold
+        self.hasher = MinHasher(num_perm, shingle_size, seed)
+        self.bands, self.rows = lsh_params(threshold, num_perm)
+        self.buckets: List[Dict[int, int]] = [{} for _ in range(self.bands)]
+        self.signatures = np.empty((64, num_perm), dtype=np.uint32)
+        self.representatives = []  # cluster id -> key of its first member
+        self.sizes = []  # cluster id -> member count
+
+    def __len__(self):
+        return len(self.representatives)
+
+    def _band_keys(self, signature):
+        return [
+            hash(signature[band * self.rows : (band + 1) * self.rows].tobytes())
+            for band in range(self.bands)
+        ]
+
+    def _match(self, signature, band_keys):
+        candidates = {
+            bucket[key] for bucket, key in zip(self.buckets, band_keys) if key in bucket
+        }
+        best, best_similarity = None, self.threshold
+        for cluster in sorted(candidates):
+            similarity = jaccard(signature, self.signatures[cluster])
+            if similarity >= best_similarity:
+                best, best_similarity = cluster, similarity
+        return best
+
+    def query(self, text) -> Optional[int]:
+        """Cluster ``text`` would join, or None if it would start a new one."""
+        signature = self.hasher.signature(text)
+        return self._match(signature, self._band_keys(signature))
+
+    def add(self, key, text) -> int:
+        """Add a prompt and return its cluster id."""
+        signature = self.hasher.signature(text)
+        band_keys = self._band_keys(signature)
+        cluster = self._match(signature, band_keys)
+        if cluster is not None:
+            self.sizes[cluster] += 1
+            return cluster
+
+        cluster = len(self.representatives)
+        if cluster == len(self.signatures):
+            self.signatures = np.resize(
+                self.signatures, (2 * cluster, self.hasher.num_perm)
+            )
+        self.signatures[cluster] = signature
+        self.representatives.append(key)
+        self.sizes.append(1)
+        for bucket, band_key in zip(self.buckets, band_keys):
+            bucket.setdefault(band_key, cluster)
+        return cluster
+
+
+def cluster_dataset(dataset_path, output_path, index=None):
+    """Cluster every ``input`` of a JSONL dataset, streaming membership to
+    ``output_path`` as ``{"line", "cluster", "representative"}`` rows.
+
+    ``line`` is the raw line number in the file, blank lines included, as in
+    work_queue shards. Returns the index, which holds one entry per cluster.
+    """
+    index = index or NearDuplicateIndex()
+    with open(dataset_path) as dataset, open(output_path, "w") as output:
+        for line_number, line in enumerate(dataset):
+            if not line.strip():
+                continue
+            before = len(index)
+            cluster = index.add(line_number, json.loads(line)["input"])
+            row = {
+                "line": line_number,
+                "cluster": cluster,
+                "representative": len(index) > before,
+            }
+            output.write(json.dumps(row) + "\n")
+    return index
+
+
+def _attributed(samples, member, cluster):
+    """Result for an unevaluated ``member`` from the evaluated ``samples``."""
+    source_index, source = samples[0]
+    result = {
+        key: value
+        for key, value in source.items()
+        if key not in ("input", "output", "prescore", "prescore-audit")
+    }
+    for key in SCORE_KEYS:
+        scores = [
+            sample[key]
+            for _, sample in samples
+            if isinstance(sample.get(key), (int, float))
+        ]
+        if scores:
+            result[key] = round(sum(scores) / len(scores), 1)
+    result.update(
+        {
+            "input": member["input"],
+            "cluster": cluster,
+            "attributed-from": source_index,
+        }
+    )
+    return result
+
+
+def evaluate_clustered(
+    items: List[dict], evaluate, index=None, sample=1, pass_score=PASS_SCORE
+):
+    """Evaluate ``sample`` members of each near-duplicate cluster and
+    attribute their scores to the rest.
+
+    ``evaluate`` takes and returns a list of items. Attributed results carry
+    the cluster id and the index of the item their scores came from. The
+    report flags clusters whose evaluated members disagree about passing,
+    since an attributed score would hide that difference.
+    """
+    index = index or NearDuplicateIndex()
+    clusters = [index.add(i, item["input"]) for i, item in enumerate(items)]
+
+    chosen, seen = [], {}
+    for i, cluster in enumerate(clusters):
+        seen[cluster] = seen.get(cluster, 0) + 1
+        if seen[cluster] <= sample:
+            chosen.append(i)
+
+    evaluated = dict(zip(chosen, evaluate([items[i] for i in chosen])))
+    samples: Dict[int, list] = {}
+    for i, result in evaluated.items():
+        result["cluster"] = clusters[i]
+        samples.setdefault(clusters[i], []).append((i, result))
+
+    results = [
+        (
+            evaluated[i]
+            if i in evaluated
+            else _attributed(samples[cluster], items[i], cluster)
+        )
+        for i, cluster in enumerate(clusters)
+    ]
+
+    disagreements = []
+    for cluster, members in samples.items():
+        passed = {
+            result["prompt-score"] >= pass_score
+            for _, result in members
+            if isinstance(result.get("prompt-score"), (int, float))
+        }
+        if len(passed) > 1:
+            disagreements.append(cluster)
+    report = {
+        "items": len(items),
+        "clusters": len(samples),
+        "evaluated": len(chosen),
+        "attributed": len(items) - len(chosen),
+        "disagreeing-clusters": disagreements,
+    }
+    return results, report
+
+
+@click.command()
+@click.argument("dataset", default="prompts_dataset.jsonl")
+@click.option("--output", default="prompt_clusters.jsonl", show_default=True)
+@click.option("--threshold", default=0.8, show_default=True)
+@click.option("--num-perm", default=128, show_default=True)
+def main(dataset, output, threshold, num_perm):
+    """Cluster near-duplicate prompts in DATASET."""
+    index = cluster_dataset(dataset, output, NearDuplicateIndex(threshold, num_perm))
+    items = sum(index.sizes)
+    print(
+        f"{items} prompts in {len(index)} clusters "
+        f"({items - len(index)} near duplicates); membership in {output}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,336 @@
+import hashlib
+import json
+import os
+import re
+import sys
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+
+import click
+from pydantic import BaseModel
+
+PROMPT_EXTENSIONS = {".xml": "xml", ".json": "json", ".tmpl": "tmpl"}
+DEFAULT_CACHE_PATH = ".prompt_library_cache.json"
+TEMPLATE_VARIABLE = re.compile(r"\{\{\s*(\w+)\s*\}\}|\{(\w+)\}")
+
+
+class PromptRecord(BaseModel):
+    path: str
+    kind: str
+    content_hash: str
+    text: str = ""
+    sections: dict = {}
+    variables: list = []
+    errors: list = []
+    mtime_ns: int = 0
+    size: int = 0
+
+    @property
+    def valid(self):
+        return not self.errors
+
+
+class DTD:
+    """Element content models from a DTD, checked without external tools.
+
+    Supports the ELEMENT declarations used by ``prompts.dtd``: EMPTY, ANY,
+    (#PCDATA), mixed content and children models built from sequences,
+    choices and the ``? * +`` quantifiers. Attributes must be declared in an
+    ATTLIST; their types are not checked.
+    """
+
+    ELEMENT = re.compile(r"<!ELEMENT\s+([\w.:-]+)\s+(.+?)\s*>", re.S)
+    ATTLIST = re.compile(r"<!ATTLIST\s+([\w.:-]+)\s+(.+?)\s*>", re.S)
+    TOKEN = re.compile(r"[\w.:-]+|#PCDATA|[(),|?*+]")
+
+    def __init__(self, text):
+        self.models = {}
+        self.mixed = {}
+        self.attributes = {}
+        for name, model in self.ELEMENT.findall(text):
+            self.models[name], self.mixed[name] = self._compile(model.strip())
+        for name, body in self.ATTLIST.findall(text):
+            declared = re.findall(
+                r"([\w.:-]+)\s+(?:CDATA|ID|IDREFS?|NMTOKENS?|\()", body
+            )
+            self.attributes.setdefault(name, set()).update(declared)
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, "r") as f:
+            return cls(f.read())
+
+    def _compile(self, model):
+        """Return ``(regex over child names, allows text)`` for a content model."""
+        if model == "EMPTY":
+            return re.compile(r""), False
+        if model == "ANY":
+            return None, True
+        if "#PCDATA" in model:
+            names = re.findall(r"[\w.:-]+", model.replace("#PCDATA", ""))
+            if not names:
+                return re.compile(r""), True
+            choice = "|".join(re.escape(name) for name in names)
+            return re.compile(rf"(?:(?:{choice}) )*"), True
+
+        pattern = []
+        for token in self.TOKEN.findall(model):
+            if token == "(":
+                pattern.append("(?:")
+            elif token == ")":
+                pattern.append(")")
+            elif token == "|":
+                pattern.append("|")
+            elif token in "?*+":
+                pattern.append(token)
+            elif token != ",":
+                pattern.append(f"(?:{re.escape(token)} )")
+        return re.compile("".join(pattern)), False
+
+    def validate(self, root):
+        """Return a list of problems with ``root`` and its descendants."""
+        errors = []
+        for element in root.iter():
+            tag = element.tag
+            if tag not in self.models:
+                errors.append(f"No declaration for element {tag}")
+                continue
+            for attribute in element.attrib:
+                if attribute not in self.attributes.get(tag, ()):
+                    errors.append(
+                        f"No declaration for attribute {attribute} of element {tag}"
+                    )
+            model, mixed = self.models[tag], self.mixed[tag]
+            if model is None:
+                continue
+            if not mixed:
+                texts = [element.text] + [child.tail for child in element]
+                if any(text and text.strip() for text in texts):
+                    errors.append(f"Element {tag} does not allow text content")
+            children = "".join(f"{child.tag} " for child in element)
+            if not model.fullmatch(children):
+                found = children.strip() or "nothing"
+                errors.append(f"Element {tag} content does not follow the DTD: {found}")
+        return errors
+
+
+def _template_variables(text):
+    return sorted({a or b for a, b in TEMPLATE_VARIABLE.findall(text)})
+
+
+def _hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def parse_prompt(path, data, dtd=None):
+    """Normalize the raw bytes of a prompt file into a ``PromptRecord``."""
+    kind = PROMPT_EXTENSIONS[os.path.splitext(path)[1]]
+    record = PromptRecord(path=path, kind=kind, content_hash=_hash(data))
+    try:
+        text = data.decode("utf-8")
+    except UnicodeDecodeError as e:
+        record.errors.append(f"Not UTF-8: {e}")
+        return record
+
+    if kind == "xml":
+        try:
+            root = ET.fromstring(text)
+        except ET.ParseError as e:
+            record.errors.append(f"XML parse error: {e}")
+            return record
+        if dtd is not None:
+            record.errors.extend(dtd.validate(root))
+        record.sections = {
+            child.tag: (child.text or "").strip() for child in root if len(child) == 0
+        }
+        record.text = "\n\n".join(record.sections.values())
+    elif kind == "json":
+        try:
+            value = json.loads(text)
+        except ValueError as e:
+            record.errors.append(f"JSON parse error: {e}")
+            return record
+        if not isinstance(value, dict) or not isinstance(value.get("input"), str):
+            record.errors.append('Expected an object with a string "input"')
+            return record
+        record.sections = {k: v for k, v in value.items() if isinstance(v, str)}
+        record.text = value["input"]
+    else:
+        record.text = text
+        if not text.strip():
+            record.errors.append("Empty template")
+    record.variables = _template_variables(record.text)
+    return record
+
+
+_worker_dtd = None
+
+
+def _init_worker(dtd_path):
+    global _worker_dtd
+    _worker_dtd = DTD.from_file(dtd_path) if dtd_path else None
+
+
+def _load_batch(paths):
+    records = []
+    for path, mtime_ns, size in paths:
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError as e:
+            record = PromptRecord(path=path, kind="unknown", content_hash="")
+            record.errors.append(str(e))
+        else:
+            record = parse_prompt(path, data, _worker_dtd)
+        record.mtime_ns, record.size = mtime_ns, size
+        records.append(record.model_dump())
+    return records
+
+
+def scan_prompt_files(directory):
+    """Yield ``(path, mtime_ns, size)`` for every prompt file under ``directory``."""
+    stack = [directory]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif os.path.splitext(entry.name)[1] in PROMPT_EXTENSIONS:
+                    stat = entry.stat()
+                    yield entry.path, stat.st_mtime_ns, stat.st_size
+
+
+class PromptLibrary:
+    """All prompts under a directory, validated and indexed by content hash.
+
+    Records are cached in ``cache_path``; on reload only files whose mtime or
+    size changed are read again. Large batches are parsed in a process pool.
+    """
+
+    def __init__(
+        self,
+        directory="prompts",
+        dtd_path="prompts.dtd",
+        cache_path=DEFAULT_CACHE_PATH,
+        processes=None,
+        batch_size=500,
+    ):
+        self.directory = directory
+        self.dtd_path = dtd_path if dtd_path and os.path.exists(dtd_path) else None
+        self.cache_path = cache_path
+        self.processes = processes
+        self.batch_size = batch_size
+        self.records = {}
+        self.by_hash = {}
+        self.reloaded = 0
+
+    def _dtd_hash(self):
+        if not self.dtd_path:
+            return None
+        with open(self.dtd_path, "rb") as f:
+            return _hash(f.read())
+
+    def _load_cache(self, dtd_hash):
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return {}
+        try:
+            with open(self.cache_path, "r") as f:
+                cache = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable prompt cache: {e}")
+            return {}
+        # Validation results depend on the DTD, so a new DTD rebuilds everything.
+        if cache.get("dtdHash") != dtd_hash:
+            return {}
+        return cache.get("records", {})
+
+    def _save_cache(self, dtd_hash):
+        if not self.cache_path:
+            return
+        tmp_path = self.cache_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(
+                {
+                    "dtdHash": dtd_hash,
+                    "records": {
+                        path: record.model_dump()
+                        for path, record in self.records.items()
+                    },
+                },
+                f,
+            )
+        os.replace(tmp_path, self.cache_path)
+
+    def _parse(self, stale):
+        batches = [
+            stale[i : i + self.batch_size]
+            for i in range(0, len(stale), self.batch_size)
+        ]
+        if len(batches) <= 1 or self.processes == 1:
+            _init_worker(self.dtd_path)
+            return [record for batch in batches for record in _load_batch(batch)]
+        with ProcessPoolExecutor(
+            max_workers=self.processes,
+            initializer=_init_worker,
+            initargs=(self.dtd_path,),
+        ) as executor:
+            return [
+                record
+                for records in executor.map(_load_batch, batches)
+                for record in records
+            ]
+
+    def load(self):
+        """Scan the directory, re-reading only new or changed files."""
+        dtd_hash = self._dtd_hash()
+        cached = self._load_cache(dtd_hash)
+        files = sorted(scan_prompt_files(self.directory))
+        stale = []
+        records = {}
+        for path, mtime_ns, size in files:
+            entry = cached.get(path)
+            if entry and entry["mtime_ns"] == mtime_ns and entry["size"] == size:
+                records[path] = PromptRecord(**entry)
+            else:
+                stale.append((path, mtime_ns, size))
+
+        for entry in self._parse(stale):
+            records[entry["path"]] = PromptRecord(**entry)
+
+        self.records = {path: records[path] for path, _, _ in files}
+        self.by_hash = {}
+        for record in self.records.values():
+            self.by_hash.setdefault(record.content_hash, []).append(record)
+        self.reloaded = len(stale)
+        if stale or len(cached) != len(self.records):
+            self._save_cache(dtd_hash)
+        return self
+
+    def invalid(self):
+        return [record for record in self.records.values() if not record.valid]
+
+    def get(self, content_hash):
+        """The records whose file content has ``content_hash``."""
+        return self.by_hash.get(content_hash, [])
+
+
+@click.command()
+@click.argument("directory", default="prompts")
+@click.option("--dtd", "dtd_path", default="prompts.dtd", show_default=True)
+@click.option("--cache", "cache_path", default=DEFAULT_CACHE_PATH, show_default=True)
+@click.option("--processes", type=int, default=None)
+def main(directory, dtd_path, cache_path, processes):
+    """Validate and index every prompt under DIRECTORY."""
+    library = PromptLibrary(directory, dtd_path, cache_path, processes).load()
+    for record in library.invalid():
+        for error in record.errors:
+            print(f"{record.path}: {error}")
+    print(
+        f"{len(library.records)} prompts ({library.reloaded} re-read), "
+        f"{len(library.by_hash)} distinct, {len(library.invalid())} invalid"
+    )
+    sys.exit(1 if library.invalid() else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+import hashlib
+import re
+from typing import List, Optional, Sequence
+
+import numpy as np
+from pydantic import BaseModel
+
+# One column per prompt criterion of 03_ai_prompt_answer_evaluator.tmpl that
+# can be checked without a model.
+FEATURES = ("task", "detail", "grammar", "role", "examples", "format", "tone")
+DEFAULT_WEIGHTS = {
+    "task": 15.0,
+    "detail": 15.0,
+    "grammar": 15.0,
+    "role": 15.0,
+    "examples": 15.0,
+    "format": 10.0,
+    "tone": 5.0,
+}
+DEFAULT_BIAS = 10.0
+PASS_SCORE = 80  # Passing threshold drawn on the evaluation chart.
+
+_TAGS = re.compile(r"<[^>]+>")
+_ROLE = re.compile(r"^\s*(?:act as|you are|as an?)\b", re.I)
+_EXAMPLE = re.compile(r"\b(?:for example|for instance|e\.g\.|example:)", re.I)
+_TONE = re.compile(
+    r"\b(?:tone|formal|informal|casual|friendly|professional|technical|concise|"
+    r"simple|detailed|brief|single|short|bullet|paragraph|json|table|list)\b",
+    re.I,
+)
+_WORD = re.compile(r"[A-Za-z']+")
+_DOUBLED = re.compile(r"\b(\w+)\s+\1\b", re.I)
+DETAIL_WORDS = 20  # Task length at which the detail feature saturates.
+
+
+def _section(text, tag):
+    match = re.search(rf"<{tag}\b[^>]*>(.*?)</{tag}>", text, re.S | re.I)
+    return _TAGS.sub(" ", match.group(1)).strip() if match else None
+
+
+def _grammar(sentence):
+    """Share of surface checks passed: capitalized, terminal punctuation,
+    balanced quotes and brackets, no doubled words."""
+    if not sentence:
+        return 0.0
+    checks = (
+        sentence[0].isupper(),
+        sentence[-1] in ".?!:",
+        sentence.count('"') % 2 == 0 and sentence.count("(") == sentence.count(")"),
+        not _DOUBLED.search(sentence),
+    )
+    return sum(checks) / len(checks)
+
+
+def prompt_features(prompt):
+    """Feature row in ``FEATURES`` order, each in ``[0, 1]``.
+
+    Prompts in the ``<prompt><role/><task/><format/><examples/></prompt>``
+    shape of ``prompts_dataset.jsonl`` are read by section; other prompts are
+    treated as a bare task.
+    """
+    task = _section(prompt, "task")
+    if task is None:
+        task = _TAGS.sub(" ", prompt).strip()
+    role = _section(prompt, "role") or _section(prompt, "context")
+    fmt = _section(prompt, "format") or ""
+    examples = _section(prompt, "examples")
+    return (
+        1.0 if task else 0.0,
+        min(1.0, len(_WORD.findall(task)) / DETAIL_WORDS),
+        _grammar(task),
+        1.0 if role or _ROLE.search(task) else 0.0,
+        1.0 if examples or _EXAMPLE.search(task) else 0.0,
+        1.0 if fmt else 0.0,
+        1.0 if _TONE.search(fmt or task) else 0.0,
+    )
+
+
+class PreScorer:
+    """Cheap 0-100 estimate of the judge's prompt-score.
+
+    Features are extracted once per prompt and scored for the whole batch with
+    one matrix product. ``fit`` replaces the default weights with a least
+    squares fit against judge scores from earlier runs.
+    """
+
+    def __init__(self, weights=None, bias=DEFAULT_BIAS):
+        weights = weights or DEFAULT_WEIGHTS
+        self.weights = np.array([weights.get(name, 0.0) for name in FEATURES])
+        self.bias = bias
+
+    def features(self, prompts: Sequence[str]) -> np.ndarray:
+        matrix = np.fromiter(
+            (value for prompt in prompts for value in prompt_features(prompt)),
+            dtype=float,
+            count=len(prompts) * len(FEATURES),
+        )
+        return matrix.reshape(len(prompts), len(FEATURES))
+
+    def score(self, prompts: Sequence[str]) -> np.ndarray:
+        return np.clip(self.features(prompts) @ self.weights + self.bias, 0, 100)
+
+    def fit(self, prompts: Sequence[str], judge_scores: Sequence[float]):
+        """Fit weights and bias to ``judge_scores``; returns ``self``."""
+        matrix = np.column_stack([self.features(prompts), np.ones(len(prompts))])
+        solution, *_ = np.linalg.lstsq(
+            matrix, np.asarray(judge_scores, dtype=float), rcond=None
+        )
+        self.weights, self.bias = solution[:-1], float(solution[-1])
+        return self
+
+
+class TriagePlan(BaseModel):
+    order: List[int]  # Indices to send to the judge, most borderline first.
+    skipped: List[int]  # Indices whose pre-score alone is reported.
+    audited: List[int]  # Skippable indices sent to the judge anyway.
+
+
+def _audit_draw(prompt):
+    """Stable value in ``[0, 1)`` so the same prompts are audited on every run."""
+    digest = hashlib.sha256(prompt.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") / 2**64
+
+
+def triage(prompts, scores, skip_below, pass_score=PASS_SCORE, audit_rate=0.1):
+    """Split prompts into those to judge and those to skip.
+
+    Prompts pre-scored below ``skip_below`` are skipped, except for an
+    ``audit_rate`` sample that is judged anyway so false skips show up in the
+    report. Judged prompts are ordered by distance from ``pass_score``, so
+    the ones the heuristic is least sure about are evaluated first.
+    """
+    scores = np.asarray(scores, dtype=float)
+    below = scores < skip_below
+    audit = np.array([_audit_draw(prompt) < audit_rate for prompt in prompts])
+    audited = np.flatnonzero(below & audit)
+    judged = np.flatnonzero(~below)
+    judged = judged[np.argsort(np.abs(scores[judged] - pass_score), kind="stable")]
+    return TriagePlan(
+        order=judged.tolist() + audited.tolist(),
+        skipped=np.flatnonzero(below & ~audit).tolist(),
+        audited=audited.tolist(),
+    )
+
+
+def _ranks(values):
+    """Ranks with ties averaged, for Spearman correlation."""
+    order = np.argsort(values, kind="stable")
+    ranks = np.empty(len(values))
+    ranks[order] = np.arange(len(values))
+    _, inverse, counts = np.unique(values, return_inverse=True, return_counts=True)
+    sums = np.bincount(inverse, weights=ranks)
+    return sums[inverse] / counts[inverse]
+
+
+def correlation(prescores, judge_scores):
+    """Pearson and Spearman correlation, or None with fewer than two varied pairs."""
+    x = np.asarray(prescores, dtype=float)
+    y = np.asarray(judge_scores, dtype=float)
+    if len(x) < 2 or np.ptp(x) == 0 or np.ptp(y) == 0:
+        return None
+    return {
+        "pearson": round(float(np.corrcoef(x, y)[0, 1]), 3),
+        "spearman": round(float(np.corrcoef(_ranks(x), _ranks(y))[0, 1]), 3),
+    }
+
+
+def prescore_report(results, plan, pass_score=PASS_SCORE):
+    """Summarize how the pre-scores compared with the judge.
+
+    A false skip is an audited prompt the judge passed; the estimate scales
+    the audited rate up to every skipped prompt.
+    """
+    judged = [
+        (result["prescore"], result["prompt-score"])
+        for result in results
+        if isinstance(result.get("prompt-score"), (int, float)) and "prescore" in result
+    ]
+    false_skips = sum(
+        1
+        for i in plan.audited
+        if isinstance(results[i].get("prompt-score"), (int, float))
+        and results[i]["prompt-score"] >= pass_score
+    )
+    report = {
+        "judged": len(plan.order),
+        "skipped": len(plan.skipped),
+        "audited": len(plan.audited),
+        "false-skips": false_skips,
+        "correlation": correlation(*zip(*judged)) if judged else None,
+    }
+    if plan.audited:
+        report["estimated-false-skips"] = round(
+            false_skips / len(plan.audited) * len(plan.skipped), 1
+        )
+    return report
+
+
+def evaluate_triaged(
+    items,
+    evaluate,
+    skip_below,
+    scorer: Optional[PreScorer] = None,
+    pass_score=PASS_SCORE,
+    audit_rate=0.1,
+):
+    """Pre-score ``items`` and pass only the ones worth judging to ``evaluate``.
+
+    ``evaluate`` takes and returns a list, like
+    ``evaluate_prompts_at_scale.evaluate_dataset``. Results come back in item
+    order with a ``prescore`` on each; skipped items carry ``skipped``
+    instead of judge scores. Returns ``(results, report)``.
+    """
+    scorer = scorer or PreScorer()
+    prompts = [item["input"] for item in items]
+    scores = scorer.score(prompts)
+    plan = triage(prompts, scores, skip_below, pass_score, audit_rate)
+
+    results = [None] * len(items)
+    judged = evaluate([items[i] for i in plan.order]) if plan.order else []
+    for i, result in zip(plan.order, judged):
+        results[i] = result
+    audited = set(plan.audited)
+    for i, score in enumerate(scores):
+        if results[i] is None:
+            results[i] = {
+                "input": prompts[i],
+                "skipped": f"Pre-score below {skip_below}",
+            }
+        results[i]["prescore"] = round(float(score), 1)
+        if i in audited:
+            results[i]["prescore-audit"] = True
+    return results, prescore_report(results, plan, pass_score)
@@ -0,0 +1,195 @@
+import threading
+import time
+from typing import List, Optional
+
+from botocore.exceptions import (
+    ClientError,
+    ConnectTimeoutError,
+    EndpointConnectionError,
+    ReadTimeoutError,
+)
+from pydantic import BaseModel
+
+from flow_invocation import FlowDeadlineExceeded
+
+THROTTLE_CODES = {
+    "ThrottlingException",
+    "TooManyRequestsException",
+    "ServiceQuotaExceededException",
+}
+REGIONAL_ERROR_CODES = {
+    "ServiceUnavailableException",
+    "InternalServerException",
+    "ModelNotReadyException",
+    "BadGatewayException",
+    "DependencyFailedException",
+}
+
+_THROTTLE_CODES = {code.lower() for code in THROTTLE_CODES}
+_REGIONAL_ERROR_CODES = {code.lower() for code in REGIONAL_ERROR_CODES}
+
+
+class RegionTarget(BaseModel):
+    region: str
+    flowId: str
+    flowAliasId: Optional[str] = None
+    weight: float = 1.0
+
+
+class RegionUnavailableError(RuntimeError):
+    pass
+
+
+def load_region_targets(config, flow_id=None, flow_alias_id=None) -> List[RegionTarget]:
+    """Read the ``regions`` list from ``bedrock_config.json``.
+
+    Configs without one fall back to a single target in ``region``.
+    """
+    if config.get("regions"):
+        return [RegionTarget(**target) for target in config["regions"]]
+    return [
+        RegionTarget(
+            region=config.get("region", "us-east-1"),
+            flowId=flow_id,
+            flowAliasId=flow_alias_id,
+        )
+    ]
+
+
+def classify_error(error):
+    """Return "throttled", "regional" or None for errors that are not the region's fault.
+
+    Codes are compared case-insensitively: errors raised mid-stream by
+    ``invoke_flow`` arrive as ``EventStreamError`` with lower-camel codes such
+    as ``throttlingException``.
+    """
+    if isinstance(error, ClientError):
+        code = (error.response.get("Error", {}).get("Code") or "").lower()
+        if code in _THROTTLE_CODES:
+            return "throttled"
+        if code in _REGIONAL_ERROR_CODES:
+            return "regional"
+        return None
+    if isinstance(
+        error,
+        (
+            EndpointConnectionError,
+            ConnectTimeoutError,
+            ReadTimeoutError,
+            FlowDeadlineExceeded,
+        ),
+    ):
+        return "regional"
+    return None
+
+
+class _RegionState:
+    def __init__(self, target, client):
+        self.target = target
+        self.client = client
+        self.in_flight = 0
+        self.throttle_rate = 0.0
+        self.error_rate = 0.0
+        self.consecutive_failures = 0
+        self.unhealthy_until = 0.0
+        self.calls = 0
+        self.throttles = 0
+        self.errors = 0
+
+
+class RegionRouter:
+    """Spread calls over several regions by weight and live health.
+
+    Each region's share is its weight scaled down by its recent throttle and
+    error rates (exponentially weighted), divided by the calls it already has
+    in flight. A region that fails ``failure_threshold`` times in a row is
+    skipped for ``cooldown`` seconds. Throttled or regional errors fail the
+    call over to the next best region.
+    """
+
+    def __init__(
+        self,
+        targets,
+        client_factory,
+        alpha=0.2,
+        failure_threshold=3,
+        cooldown=30.0,
+    ):
+        if not targets:
+            raise ValueError("At least one region target is required")
+        self.alpha = alpha
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._states = [
+            _RegionState(target, client_factory(target.region)) for target in targets
+        ]
+
+    def _score(self, state):
+        health = (1 - state.throttle_rate) * (1 - state.error_rate)
+        return state.target.weight * max(health, 0.01) / (state.in_flight + 1)
+
+    def _acquire(self, exclude):
+        now = time.monotonic()
+        with self._lock:
+            candidates = [s for s in self._states if s.target.region not in exclude]
+            healthy = [s for s in candidates if s.unhealthy_until <= now]
+            pool = healthy or candidates
+            if not pool:
+                return None
+            state = max(pool, key=self._score)
+            state.in_flight += 1
+            state.calls += 1
+            return state
+
+    def _release(self, state, outcome):
+        throttled = outcome == "throttled"
+        failed = outcome == "regional"
+        with self._lock:
+            state.in_flight -= 1
+            state.throttle_rate += self.alpha * (throttled - state.throttle_rate)
+            state.error_rate += self.alpha * (failed - state.error_rate)
+            state.throttles += throttled
+            state.errors += failed
+            if outcome is None:
+                state.consecutive_failures = 0
+                return
+            state.consecutive_failures += 1
+            if state.consecutive_failures >= self.failure_threshold:
+                state.unhealthy_until = time.monotonic() + self.cooldown
+
+    def call(self, func):
+        """Call ``func(target, client)`` in the best region, failing over on regional errors."""
+        tried = set()
+        last_error = None
+        while True:
+            state = self._acquire(tried)
+            if state is None:
+                raise RegionUnavailableError(
+                    f"All regions failed: {last_error}"
+                ) from last_error
+            tried.add(state.target.region)
+            try:
+                result = func(state.target, state.client)
+            except Exception as e:
+                outcome = classify_error(e)
+                self._release(state, outcome)
+                if outcome is None:
+                    raise
+                last_error = e
+                continue
+            self._release(state, None)
+            return result
+
+    def stats(self):
+        with self._lock:
+            return {
+                s.target.region: {
+                    "calls": s.calls,
+                    "throttles": s.throttles,
+                    "errors": s.errors,
+                    "throttleRate": round(s.throttle_rate, 3),
+                    "errorRate": round(s.error_rate, 3),
+                }
+                for s in self._states
+            }
@@ -0,0 +1,278 @@
+import json
+import threading
+
+import boto3
+import pytest
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+from bedrock_standin import (
+    BedrockStandin,
+    Faults,
+    Latency,
+    StandinConfig,
+    endpoint_environment,
+    start_server,
+)
+from flow_events import FlowEventConsumer
+from flow_invocation import iter_flow_events
+from flow_simulator.generator import prompt_eval_template
+from flow_simulator.models import create_knowledge_base_flow, create_upcase_flow
+from flow_simulator.simulator import FlowSimulator
+from flow_simulator.teardown import TeardownEngine
+from flow_simulator.waiter import FlowPreparationWaiter
+from judge_output import JUDGE_KEYS
+
+MODEL_INVOKE_ID = "amazon.titan-text-premier-v1:0"
+MODEL_EVAL_ID = "anthropic.claude-3-sonnet-20240229-v1:0"
+NO_RETRIES = Config(retries={"total_max_attempts": 1, "mode": "standard"})
+
+
+def deploy_evaluation_flow(standin):
+    """Run what scripts 04-11 do and return ``(flow id, alias id)``."""
+    agent = standin.client("bedrock-agent")
+    with open("03_ai_prompt_answer_evaluator.tmpl") as f:
+        template = f.read()
+    prompt = agent.create_prompt(
+        name="prompt-evaluator",
+        variants=[
+            {
+                "modelId": MODEL_EVAL_ID,
+                "name": "variantOne",
+                "templateConfiguration": {"text": {"text": template}},
+                "templateType": "TEXT",
+            }
+        ],
+        defaultVariant="variantOne",
+    )
+    definition = prompt_eval_template().render_definition(
+        {"MODEL_INVOKE_ID": MODEL_INVOKE_ID, "PROMPT_EVAL_ARN": prompt["arn"]}
+    )
+    flow = agent.create_flow(
+        name="prompt-eval-flow",
+        executionRoleArn="arn:aws:iam::123456789012:role/FlowRole",
+        definition=definition,
+    )
+    agent.prepare_flow(flowIdentifier=flow["id"])
+    waiter = FlowPreparationWaiter(agent, initial_delay=0.01)
+    assert waiter.wait([flow["id"]])[flow["id"]].prepared
+    version = agent.create_flow_version(flowIdentifier=flow["id"])["version"]
+    alias = agent.create_flow_alias(
+        flowIdentifier=flow["id"],
+        name="latest",
+        routingConfiguration=[{"flowVersion": version}],
+    )
+    return flow["id"], alias["id"]
+
+
+def test_deployed_evaluation_flow_judges_prompts():
+    standin = BedrockStandin(StandinConfig(prepareSeconds=0.05))
+    flow_id, alias_id = deploy_evaluation_flow(standin)
+    runtime = standin.client("bedrock-agent-runtime")
+
+    def evaluate(prompt):
+        events = iter_flow_events(runtime, flow_id, alias_id, prompt)
+        return FlowEventConsumer().consume(events).evaluation()
+
+    result = evaluate("What is cloud computing?")
+    assert set(JUDGE_KEYS) <= set(result)
+    assert result["input"] == "What is cloud computing?"
+    assert f"from {MODEL_INVOKE_ID}" in result["output"]
+    assert (
+        evaluate("What is cloud computing?")["prompt-score"] == result["prompt-score"]
+    )
+
+    agent = standin.client("bedrock-agent")
+    plan = TeardownEngine(agent, standin.client("iam")).plan(
+        [flow_id], include_flow_prompts=True
+    )
+    outcomes = TeardownEngine(agent, standin.client("iam")).run(plan)
+    assert {outcome.status for outcome in outcomes.values()} == {"deleted"}
+    assert not standin.flows and not standin.prompts
+
+
+def test_unknown_flows_are_answered_unless_strict():
+    events = list(
+        iter_flow_events(
+            BedrockStandin().client("bedrock-agent-runtime"), "F", "A", "Hi"
+        )
+    )
+    assert (
+        json.loads(events[0]["flowOutputEvent"]["content"]["document"])["input"] == "Hi"
+    )
+    assert events[-1] == {"flowCompletionEvent": {"completionReason": "SUCCESS"}}
+
+    strict = BedrockStandin(StandinConfig(strict=True))
+    with pytest.raises(ClientError) as error:
+        list(iter_flow_events(strict.client("bedrock-agent-runtime"), "F", "A", "Hi"))
+    assert error.value.response["Error"]["Code"] == "ResourceNotFoundException"
+
+
+def test_prepare_reports_invalid_definitions():
+    standin = BedrockStandin()
+    agent = standin.client("bedrock-agent")
+    definition = prompt_eval_template().render_definition(
+        {"MODEL_INVOKE_ID": MODEL_INVOKE_ID, "PROMPT_EVAL_ARN": "arn"}
+    )
+    definition["connections"][0]["target"] = "Missing"
+    flow_id = agent.create_flow(
+        name="broken", executionRoleArn="r", definition=definition
+    )["id"]
+    agent.prepare_flow(flowIdentifier=flow_id)
+    flow = agent.get_flow(flowIdentifier=flow_id)
+    assert flow["status"] == "Failed" and flow["validations"]
+    with pytest.raises(ClientError):
+        agent.create_flow_version(flowIdentifier=flow_id)
+
+
+def test_invoke_model_answers_in_each_model_family():
+    runtime = BedrockStandin().client("bedrock-runtime")
+
+    def invoke(model_id, request):
+        response = runtime.invoke_model(modelId=model_id, body=json.dumps(request))
+        return json.loads(response["body"].read())
+
+    messages = {"messages": [{"role": "user", "content": "Hi"}], "max_tokens": 10}
+    text = invoke(MODEL_EVAL_ID, messages)["content"][0]["text"]
+    assert text == invoke(MODEL_EVAL_ID, messages)["content"][0]["text"]
+    assert "completion" in invoke("anthropic.claude-v2", {"prompt": "\n\nHuman: Hi"})
+    titan = invoke(MODEL_INVOKE_ID, {"inputText": "Hi"})
+    assert titan["results"][0]["completionReason"] == "FINISH"
+
+    stream = runtime.invoke_model_with_response_stream(
+        modelId=MODEL_INVOKE_ID, body=json.dumps({"inputText": "Hi"})
+    )
+    chunks = [json.loads(event["chunk"]["bytes"]) for event in stream["body"]]
+    assert (
+        "".join(chunk["outputText"] for chunk in chunks)
+        == titan["results"][0]["outputText"]
+    )
+
+
+def test_canned_completions_take_precedence():
+    config = StandinConfig(
+        completions=[{"pattern": "capital of France", "text": "Paris"}]
+    )
+    runtime = BedrockStandin(config).client("bedrock-runtime")
+    response = runtime.invoke_model(
+        modelId="anthropic.claude-v2",
+        body=json.dumps({"prompt": "What is the capital of France?"}),
+    )
+    assert json.loads(response["body"].read())["completion"] == "Paris"
+
+
+def test_flow_simulator_runs_against_injected_clients():
+    standin = BedrockStandin(
+        functions={"Upcase": lambda event: {"output": event["input"].upper()}}
+    )
+    clients = {
+        "lambda_client": standin.client("lambda"),
+        "bedrock_runtime": standin.client("bedrock-runtime"),
+        "bedrock_agent": standin.client("bedrock-agent-runtime"),
+    }
+    arn = "arn:aws:lambda:us-east-1:123456789012:function:Upcase"
+    assert FlowSimulator(create_upcase_flow(arn), **clients).simulate("hi") == "HI"
+
+    flow = create_knowledge_base_flow("KB12345678", "arn:aws:bedrock:prompt/P1")
+    assert (
+        FlowSimulator(flow, **clients)
+        .simulate("What is S3?")
+        .startswith("Canned answer")
+    )
+    assert standin.counts["bedrock-agent-runtime:Retrieve"] == 1
+
+
+def test_injects_throttling_errors_and_latency():
+    delays = []
+    config = StandinConfig(
+        default=Faults(latency=Latency(distribution="lognormal", seconds=0.2)),
+        operations={
+            "InvokeFlow": Faults(throttleRate=1.0),
+            "bedrock-runtime:InvokeModel": Faults(
+                errorRate=1.0, errorCode="ServiceUnavailableException"
+            ),
+        },
+    )
+    standin = BedrockStandin(config, sleep=delays.append)
+
+    for service, call, code in (
+        (
+            "bedrock-agent-runtime",
+            lambda c: list(iter_flow_events(c, "F", "A", "x")),
+            "ThrottlingException",
+        ),
+        (
+            "bedrock-runtime",
+            lambda c: c.invoke_model(modelId="m", body=b"{}"),
+            "ServiceUnavailableException",
+        ),
+    ):
+        with pytest.raises(ClientError) as error:
+            call(standin.client(service, config=NO_RETRIES))
+        assert error.value.response["Error"]["Code"] == code
+    assert standin.counts["bedrock-agent-runtime:InvokeFlow:ThrottlingException"] == 1
+
+    retrieve = standin.client("bedrock-agent-runtime").retrieve
+    for _ in range(200):
+        retrieve(knowledgeBaseId="KB12345678", retrievalQuery={"text": "x"})
+    delays.sort()
+    assert 0.15 < delays[len(delays) // 2] < 0.25 and delays[-1] > 0.3
+
+
+def test_max_concurrency_throttles_excess_calls():
+    entered, release = threading.Event(), threading.Event()
+
+    def sleep(seconds):
+        entered.set()
+        release.wait(5)
+
+    config = StandinConfig(operations={"InvokeModel": Faults(maxConcurrency=1)})
+    standin = BedrockStandin(config, sleep=sleep)
+    runtime = standin.client("bedrock-runtime", config=NO_RETRIES)
+    first = threading.Thread(
+        target=runtime.invoke_model, kwargs={"modelId": "m", "body": b"{}"}
+    )
+    first.start()
+    entered.wait(5)
+    with pytest.raises(ClientError) as error:
+        runtime.invoke_model(modelId="m", body=b"{}")
+    release.set()
+    first.join()
+    assert error.value.response["Error"]["Code"] == "ThrottlingException"
+
+
+def test_serves_clients_over_http():
+    standin = BedrockStandin()
+    server = start_server(standin)
+    try:
+        environment = endpoint_environment(server)
+
+        def client(service, variable):
+            return boto3.client(
+                service,
+                region_name="us-east-1",
+                endpoint_url=environment[variable],
+                aws_access_key_id="standin",
+                aws_secret_access_key="standin",
+            )
+
+        runtime = client(
+            "bedrock-agent-runtime", "AWS_ENDPOINT_URL_BEDROCK_AGENT_RUNTIME"
+        )
+        events = list(iter_flow_events(runtime, "F", "A", "Hi", deadline=10))
+        assert "flowOutputEvent" in events[0]
+
+        iam = client("iam", "AWS_ENDPOINT_URL_IAM")
+        iam.create_role(RoleName="FlowRole", AssumeRolePolicyDocument="{}")
+        iam.put_role_policy(
+            RoleName="FlowRole", PolicyName="Invoke", PolicyDocument="{}"
+        )
+        assert iam.list_role_policies(RoleName="FlowRole")["PolicyNames"] == ["Invoke"]
+        with pytest.raises(iam.exceptions.NoSuchEntityException):
+            iam.get_role(RoleName="Missing")
+
+        agent = client("bedrock-agent", "AWS_ENDPOINT_URL_BEDROCK_AGENT")
+        created = agent.create_prompt(name="p", variants=[])
+        assert agent.get_prompt(promptIdentifier=created["arn"])["name"] == "p"
+    finally:
+        server.shutdown()
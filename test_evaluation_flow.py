@@ -2,6 +2,9 @@ import pytest
 from unittest.mock import MagicMock
 import boto3
 import json
+import threading
+from flow_invocation import FlowDeadlineExceeded, iter_flow_events
+from flow_events import FlowEventConsumer
 
 @pytest.fixture
 def mock_bedrock_agent_runtime():
@@ -27,29 +30,58 @@ def test_evaluate_prompt(mock_bedrock_agent_runtime):
     
     assert result == {"result": "Mocked response", "modelInvoke": "mock_model_invoke_id", "modelEval": "mock_model_eval_id"}
 
-def evaluatePrompt(prompt, flowEvalId, flowEvalAliasId, modelInvokeId, modelEvalId):
-    bedrock_agent_runtime = boto3.client(service_name='bedrock-agent-runtime', region_name='us-east-1')
-    
-    response = bedrock_agent_runtime.invoke_flow(
-        flowIdentifier=flowEvalId,
-        flowAliasIdentifier=flowEvalAliasId,
-        inputs=[
-            {
-                "content": {
-                    "document": prompt
-                },
-                "nodeName": "Start",
-                "nodeOutputName": "document"
-            }
+def test_evaluate_prompt_tolerates_prose_around_json(mock_bedrock_agent_runtime):
+    document = 'Here is my evaluation:\n```json\n{"answer_score": "90", "Prompt Score": 75}\n```'
+    mock_bedrock_agent_runtime.invoke_flow.return_value = {
+        "responseStream": [{"flowOutputEvent": {"content": {"document": document}}}]
+    }
+
+    result = evaluatePrompt("What is cloud computing?", "mock_flow_id", "mock_alias_id", "mock_model_invoke_id", "mock_model_eval_id")
+
+    assert result["answer-score"] == 90
+    assert result["prompt-score"] == 75
+
+def test_evaluate_prompt_joins_chunked_output(mock_bedrock_agent_runtime):
+    document = json.dumps({"answer-score": 80, "prompt-score": 70})
+    mock_bedrock_agent_runtime.invoke_flow.return_value = {
+        "responseStream": [
+            {"flowOutputEvent": {"nodeName": "End", "content": {"document": document[:10]}}},
+            {"flowOutputEvent": {"nodeName": "End", "content": {"document": document[10:]}}},
+            {"flowCompletionEvent": {"completionReason": "SUCCESS"}},
         ]
-    )
-    
-    event_stream = response["responseStream"]
-    evalResponse = None
+    }
+
+    result = evaluatePrompt("What is cloud computing?", "mock_flow_id", "mock_alias_id", "mock_model_invoke_id", "mock_model_eval_id")
+
+    assert result["answer-score"] == 80
+    assert result["prompt-score"] == 70
+
+def test_evaluate_prompt_deadline_closes_stalled_stream():
+    class StalledStream:
+        def __init__(self):
+            self.closed = threading.Event()
+
+        def __iter__(self):
+            self.closed.wait(5)
+            raise ConnectionError("stream closed")
+
+        def close(self):
+            self.closed.set()
+
+    stream = StalledStream()
+    client = MagicMock()
+    client.invoke_flow.return_value = {"responseStream": stream}
+
+    with pytest.raises(FlowDeadlineExceeded):
+        evaluatePrompt("What is cloud computing?", "mock_flow_id", "mock_alias_id", "mock_model_invoke_id", "mock_model_eval_id", client=client, deadline=0.1)
+    assert stream.closed.is_set()
+
+def evaluatePrompt(prompt, flowEvalId, flowEvalAliasId, modelInvokeId, modelEvalId, client=None, deadline=None):
+    bedrock_agent_runtime = client or boto3.client(service_name='bedrock-agent-runtime', region_name='us-east-1')
     
-    for event in event_stream:
-        if "flowOutputEvent" in event:
-            evalResponse = json.loads(event["flowOutputEvent"]["content"]["document"])
+    event_stream = iter_flow_events(bedrock_agent_runtime, flowEvalId, flowEvalAliasId, prompt, deadline)
+    consumer = FlowEventConsumer().consume(event_stream)
+    evalResponse = consumer.evaluation() if consumer.has_output else None
     
     if evalResponse:
         evalResponse["modelInvoke"] = modelInvokeId
@@ -57,4 +89,3 @@ def evaluatePrompt(prompt, flowEvalId, flowEvalAliasId, modelInvokeId, modelEval
         return evalResponse
     
     return None
-
@@ -0,0 +1,92 @@
+import json
+import time
+
+import pytest
+
+from flow_events import FlowEventConsumer
+from judge_output import JudgeOutputError, parse_judge_output
+
+
+def output_event(document, node_name="End"):
+    return {
+        "flowOutputEvent": {"nodeName": node_name, "content": {"document": document}}
+    }
+
+
+def test_consumer_dispatches_callbacks():
+    seen = []
+    consumer = FlowEventConsumer(
+        on_output=lambda payload, c: seen.append("output"),
+        on_completion=lambda payload, c: seen.append(payload["completionReason"]),
+        on_trace=lambda payload, c: seen.append("trace"),
+    )
+    consumer.consume(
+        [
+            {"flowTraceEvent": {"trace": {}}},
+            output_event("hello"),
+            {"flowCompletionEvent": {"completionReason": "SUCCESS"}},
+        ]
+    )
+    assert seen == ["trace", "output", "SUCCESS"]
+    assert consumer.trace_count == 1
+    assert consumer.traces == []
+    assert consumer.completion_reason == "SUCCESS"
+    assert consumer.text() == "hello"
+
+
+def test_document_callback_fires_before_stream_ends():
+    document = json.dumps({"answer-score": 90, "justification": 'a {brace} \\" quote'})
+    parsed_at = []
+    consumer = FlowEventConsumer(
+        on_document=lambda node, doc, c: parsed_at.append((node, len(c.text())))
+    )
+    chunks = [document[i : i + 7] for i in range(0, len(document), 7)]
+    events = [output_event(chunk) for chunk in chunks]
+    events.append(output_event(" trailing prose that arrives later"))
+    consumer.consume(events)
+
+    assert parsed_at == [("End", len(document))]
+    assert consumer.evaluation()["answer-score"] == 90
+
+
+def test_outputs_are_kept_per_node():
+    consumer = FlowEventConsumer().consume(
+        [
+            output_event('{"answer-score": 1}', "First"),
+            output_event('{"answer-score": 2}', "Second"),
+        ]
+    )
+    assert consumer.evaluation("Second")["answer-score"] == 2
+    assert consumer.evaluation()["answer-score"] == 1
+
+
+def test_evaluation_agrees_with_parse_judge_output():
+    output = (
+        'Verdict: {"answer-score": 80, "prompt-score": 70}\n'
+        'For example: {"answer-score": 10, "prompt-score": 20}'
+    )
+    chunks = [output[i : i + 9] for i in range(0, len(output), 9)]
+    consumer = FlowEventConsumer().consume([output_event(c) for c in chunks])
+    assert consumer.evaluation() == parse_judge_output(output)
+    assert consumer.evaluation()["answer-score"] == 80
+
+
+def test_object_documents_are_used_directly():
+    consumer = FlowEventConsumer().consume([output_event({"answer_score": "75"})])
+    assert consumer.evaluation()["answer-score"] == 75
+
+
+def test_evaluation_reports_parse_failure():
+    consumer = FlowEventConsumer().consume([output_event("no json here")])
+    with pytest.raises(JudgeOutputError) as excinfo:
+        consumer.evaluation()
+    assert excinfo.value.reason == "no-json-object"
+
+
+def test_large_chunked_output_is_linear():
+    chunk = "x" * 100
+    events = [output_event(chunk) for _ in range(50000)]
+    start = time.perf_counter()
+    consumer = FlowEventConsumer().consume(events)
+    assert len(consumer.text()) == 5000000
+    assert time.perf_counter() - start < 2.0
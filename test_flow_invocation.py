@@ -0,0 +1,87 @@
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from flow_invocation import (
+    FlowDeadlineExceeded,
+    client_config,
+    iter_flow_events,
+    run_hedged,
+)
+
+
+def test_client_config_reads_timeouts():
+    config = client_config({"connectTimeout": 3, "readTimeout": 7})
+    assert config.connect_timeout == 3
+    assert config.read_timeout == 7
+
+
+def test_iter_flow_events_without_deadline_passes_events_through():
+    client = MagicMock()
+    client.invoke_flow.return_value = {"responseStream": [{"a": 1}, {"b": 2}]}
+    assert list(iter_flow_events(client, "flow", "alias", "doc")) == [
+        {"a": 1},
+        {"b": 2},
+    ]
+
+
+def test_iter_flow_events_deadline_covers_slow_drip_streams():
+    class SlowStream:
+        def __init__(self):
+            self.closed = threading.Event()
+
+        def __iter__(self):
+            while not self.closed.wait(0.02):
+                yield {"flowTraceEvent": {}}
+
+        def close(self):
+            self.closed.set()
+
+    client = MagicMock()
+    client.invoke_flow.return_value = {"responseStream": SlowStream()}
+    start = time.monotonic()
+    with pytest.raises(FlowDeadlineExceeded):
+        for _ in iter_flow_events(client, "flow", "alias", "doc", deadline=0.2):
+            pass
+    assert time.monotonic() - start < 1
+
+
+def test_run_hedged_preserves_order():
+    assert run_hedged(lambda x: x * 2, range(50), max_workers=4) == [
+        x * 2 for x in range(50)
+    ]
+
+
+def test_run_hedged_retries_stragglers():
+    calls = {}
+    lock = threading.Lock()
+
+    def func(item):
+        with lock:
+            calls[item] = calls.get(item, 0) + 1
+            attempt = calls[item]
+        # The first attempt at item 25 stalls; its hedge returns immediately.
+        if item == 25 and attempt == 1:
+            time.sleep(5)
+            return "stalled"
+        time.sleep(0.01)
+        return item
+
+    start = time.monotonic()
+    results = run_hedged(func, range(30), max_workers=4, min_samples=10)
+    assert results[25] == 25
+    assert calls[25] == 2
+    assert time.monotonic() - start < 2
+
+
+def test_run_hedged_returns_exceptions():
+    def func(item):
+        if item == 1:
+            raise ValueError("boom")
+        return item
+
+    results = run_hedged(func, range(3), hedge_percentile=None)
+    assert results[0] == 0
+    assert isinstance(results[1], ValueError)
@@ -0,0 +1,400 @@
+import io
+import json
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, List, Optional
+
+import pytest
+from langchain.globals import set_llm_cache
+from langchain_core.language_models.llms import LLM
+
+import advisor_pipeline as advisor
+from click.testing import CliRunner
+import generative_ai_advisor
+from advisor_pipeline import OrderedStreams, StreamingEcho, run_stage
+
+HEAVY_MODULES = ("langchain", "langchain_community", "boto3", "botocore", "pydantic")
+# Seconds of imports allowed before --help or an argument error is printed.
+STARTUP_BUDGET = 0.5
+IMPORT_LINE = re.compile(r"import time:\s+\d+ \|\s+(\d+) \|( +)([\w.]+)")
+
+
+class FakeTeamLLM(LLM):
+    """Answers with the team named in the prompt after a short delay."""
+
+    delay: float = 0.1
+    fail_for: Optional[str] = None
+    stream_tokens: bool = False
+    calls: int = 0
+    in_flight: int = 0
+    max_in_flight: int = 0
+    lock: Any = None
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.lock = threading.Lock()
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-team"
+
+    def _call(
+        self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs
+    ) -> str:
+        if "destination" in prompt:
+            # MultiPromptChain router prompt.
+            return '```json\n{"destination": "CTO", "next_inputs": "q"}\n```'
+        match = re.search(r"guidelines for the (\S+) team", prompt)
+        if match is None:
+            text = "Phase one. Phase two."
+            for token in text.split(" "):
+                run_manager.on_llm_new_token(token + " ")
+            return text
+        team = match.group(1)
+        with self.lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            # Later teams finish first, so printing must wait for earlier ones.
+            time.sleep(self.delay * (1 + advisor.DEFAULT_TEAMS[::-1].index(team) % 3))
+            if team == self.fail_for:
+                raise RuntimeError(f"{team} throttled")
+            if self.stream_tokens and run_manager:
+                for token in ("tasks ", "for ", team):
+                    run_manager.on_llm_new_token(token)
+                    time.sleep(0.01)
+            return f"  tasks for {team}  "
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    llm = FakeTeamLLM(fail_for="qa-tester")
+    monkeypatch.setattr(advisor, "Bedrock", lambda **kwargs: llm)
+    monkeypatch.setattr(advisor, "create_bedrock_client", lambda: None)
+    monkeypatch.setattr(advisor, "_llms", {})
+    return llm
+
+
+@pytest.fixture
+def response_cache(tmp_path):
+    cache = advisor.enable_response_cache(str(tmp_path / "cache.db"))
+    yield cache
+    set_llm_cache(None)
+
+
+def test_coordinate_project_runs_teams_concurrently_in_order(fake_llm, capsys):
+    start = time.perf_counter()
+    results = advisor.coordinate_project(
+        "Chatbot", "phases", "feasible", "model", max_concurrency=9
+    )
+    elapsed = time.perf_counter() - start
+
+    assert fake_llm.calls == 9
+    assert elapsed < 9 * fake_llm.delay
+    assert list(results) == advisor.DEFAULT_TEAMS
+    assert results["backend-developer"] == "  tasks for backend-developer  "
+    assert isinstance(results["qa-tester"], RuntimeError)
+
+    output = capsys.readouterr().out
+    headings = re.findall(r"^([A-Z-]+):$", output, re.M)
+    assert headings == [team.upper() for team in advisor.DEFAULT_TEAMS]
+    assert "Failed: qa-tester throttled" in output
+    assert "tasks for technical-writer" in output
+
+
+def test_coordinate_project_bounds_concurrency_and_takes_team_list(fake_llm):
+    teams = ["backend-developer", "qa-tester", "devops-engineer"]
+    results = advisor.coordinate_project(
+        "Chatbot", "phases", "feasible", "model", teams=teams, max_concurrency=2
+    )
+    assert list(results) == teams
+    assert fake_llm.max_in_flight == 2
+
+
+def test_get_llm_shares_one_instance_per_model(monkeypatch):
+    created = []
+    monkeypatch.setattr(advisor, "_llms", {})
+    monkeypatch.setattr(advisor, "create_bedrock_client", lambda: object())
+    monkeypatch.setattr(
+        advisor, "Bedrock", lambda **kwargs: created.append(kwargs) or object()
+    )
+    assert advisor.get_llm("a") is advisor.get_llm("a")
+    assert advisor.get_llm("a") is not advisor.get_llm("b")
+    assert [kwargs["model_id"] for kwargs in created] == ["a", "b"]
+
+
+def test_rerun_is_answered_from_the_cache(fake_llm, response_cache):
+    teams = ["backend-developer", "devops-engineer"]
+    first = advisor.coordinate_project(
+        "Chatbot", "phases", "feasible", "model", teams=teams
+    )
+    assert fake_llm.calls == 2 and response_cache.size() == 2
+
+    start = time.perf_counter()
+    second = advisor.coordinate_project(
+        "Chatbot", "phases", "feasible", "model", teams=teams
+    )
+    assert time.perf_counter() - start < fake_llm.delay
+    assert fake_llm.calls == 2
+    assert second == first
+
+    advisor.coordinate_project("Chatbot", "phases", "risky", "model", teams=teams)
+    assert fake_llm.calls == 4
+
+
+def test_ordered_streams_buffer_later_streams():
+    written = []
+    streams = OrderedStreams(["a", "b"], written.append)
+    streams.writer("b")("b1 ")
+    streams.writer("a")("a1 ")
+    streams.finish("b", "b-done")
+    assert "".join(written) == "\nA:\na1 "
+    streams.finish("a", "a-done")
+    assert "".join(written) == "\nA:\na1 a-done\nB:\nb1 b-done"
+
+
+def test_team_plans_stream_in_order_with_timing(fake_llm, capsys):
+    fake_llm.stream_tokens = True
+    teams = ["backend-developer", "qa-tester", "devops-engineer"]
+    advisor.coordinate_project(
+        "Chatbot", "phases", "feasible", "model", teams=teams, max_concurrency=3
+    )
+    output = capsys.readouterr().out
+    assert "BACKEND-DEVELOPER:\ntasks for backend-developer\n[first token" in output
+    assert "QA-TESTER:\nFailed: qa-tester throttled\n" in output
+    assert output.index("BACKEND") < output.index("QA") < output.index("DEVOPS")
+    assert output.count("[first token") == 2
+
+
+def test_run_stage_streams_answers_but_not_router_decisions(fake_llm, capsys):
+    config = advisor.AdvisorConfig(
+        model_id="model", prompt_infos=advisor.create_prompt_infos()
+    )
+    mpc = advisor.create_multi_prompt_chain(config)
+    mpc.verbose = False
+    result = run_stage(lambda callbacks: mpc.run(input="hi", callbacks=callbacks))
+    output = capsys.readouterr().out
+    assert result == "Phase one. Phase two."
+    assert "Phase one. Phase two." in output and "destination" not in output
+    assert "[first token" in output
+
+
+def test_run_stage_prints_results_that_did_not_stream(capsys):
+    handler_results = []
+
+    def run(callbacks):
+        handler_results.append(callbacks[0])
+        return "cached answer"
+
+    assert run_stage(run) == "cached answer"
+    assert isinstance(handler_results[0], StreamingEcho)
+    output = capsys.readouterr().out
+    assert output.startswith("cached answer\n[no tokens streamed")
+
+
+def run_cli_with_importtime(*args):
+    """Run the CLI under ``-X importtime``; return it with the imported modules
+    and the total import time in seconds."""
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "generative_ai_advisor.py", *args],
+        capture_output=True,
+        text=True,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    modules, total = set(), 0
+    for cumulative, indent, module in IMPORT_LINE.findall(process.stderr):
+        modules.add(module)
+        if len(indent) == 1:
+            total += int(cumulative)
+    return process, modules, total / 1e6
+
+
+@pytest.mark.parametrize(
+    "args,exit_code",
+    [
+        (["--help"], 0),
+        (["ask", "--max-concurrency", "0"], 2),
+        (["batch", "no-such-file.jsonl"], 2),
+    ],
+)
+def test_cli_starts_without_heavy_imports(args, exit_code):
+    process, modules, seconds = run_cli_with_importtime(*args)
+    assert process.returncode == exit_code
+    assert "click" in modules
+    heavy = {module for module in modules if module.split(".")[0] in HEAVY_MODULES}
+    assert not heavy
+    assert seconds < STARTUP_BUDGET
+
+
+def test_cli_module_exposes_the_pipeline():
+    assert generative_ai_advisor.coordinate_project is advisor.coordinate_project
+    with pytest.raises(AttributeError):
+        generative_ai_advisor.no_such_name
+
+
+def test_batch_writes_a_report_per_question(fake_llm):
+    config = advisor.AdvisorConfig(
+        model_id="model",
+        prompt_infos=advisor.create_prompt_infos(),
+        teams=["backend-developer", "qa-tester"],
+    )
+    items = [
+        {"question": "First?"},
+        {"question": "Second?", "project": "Build a chatbot"},
+        {"question": "Third?", "project": 5},
+    ]
+    output = io.StringIO()
+    assert advisor.run_batch(items, config, output, max_questions=3) == 1
+
+    reports = {
+        report["index"]: report
+        for report in map(json.loads, output.getvalue().splitlines())
+    }
+    assert sorted(reports) == [0, 1, 2]
+    assert reports[0]["project"] == "Phase one. Phase two."
+    assert reports[0]["teams"]["backend-developer"] == "tasks for backend-developer"
+    assert reports[0]["teams"]["qa-tester"] == {"error": "qa-tester throttled"}
+    assert set(reports[0]["latency"]) == {
+        "route",
+        "decompose",
+        "assess",
+        "coordinate",
+        "total",
+    }
+    assert reports[1]["project"] == "Build a chatbot"
+    assert reports[2]["stage"] == "choose" and "Project 5" in reports[2]["error"]
+    assert "decomposition" not in reports[2]
+
+
+def test_batch_command(fake_llm, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "questions.jsonl").write_text(
+        json.dumps({"question": "First?"}) + "\n\n"
+    )
+    result = CliRunner().invoke(
+        generative_ai_advisor.main,
+        [
+            "batch",
+            "questions.jsonl",
+            "--output",
+            "reports.jsonl",
+            "--teams",
+            "backend-developer",
+            "--no-cache",
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    (report,) = map(json.loads, (tmp_path / "reports.jsonl").read_text().splitlines())
+    assert list(report["teams"]) == ["backend-developer"]
+    assert "1 questions advised on, 0 failed" in result.output
+
+    (tmp_path / "bad.jsonl").write_text(json.dumps({"project": 1}) + "\n")
+    result = CliRunner().invoke(generative_ai_advisor.main, ["batch", "bad.jsonl"])
+    assert result.exit_code == 2
+
+
+@pytest.fixture
+def slow_stages(monkeypatch):
+    calls = []
+
+    def decompose(project, model_id, callbacks=None):
+        calls.append(("decompose", project))
+        time.sleep(0.2)
+        return f"steps for {project}"
+
+    def assess(project, decomposition, model_id, callbacks=None):
+        calls.append(("assess", project))
+        return f"risks of {decomposition}"
+
+    monkeypatch.setattr(advisor, "decompose_project", decompose)
+    monkeypatch.setattr(advisor, "assess_project", assess)
+    monkeypatch.setattr(advisor, "coordinate_project", lambda *args, **kwargs: {})
+    return calls
+
+
+def test_speculation_prepares_top_projects_and_discards_the_rest(slow_stages):
+    speculation = advisor.ProjectSpeculation(["A", "B", "C"], "model", top_k=2)
+    time.sleep(0.3)
+    prepared = speculation.take("B")
+    assert prepared.result() == ("steps for B", "risks of steps for B")
+    assert ("decompose", "C") not in slow_stages
+    assert advisor.ProjectSpeculation(["A"], "model", 1).take("Z") is None
+
+
+def test_options_without_a_command_are_forwarded_to_ask(monkeypatch):
+    calls = []
+    monkeypatch.setattr(
+        advisor,
+        "run_advisor",
+        lambda question, config: calls.append((question, config)),
+    )
+    result = CliRunner().invoke(
+        generative_ai_advisor.main,
+        ["--question", "Q", "--model", "m", "--teams", "qa-tester", "--no-cache"],
+    )
+    assert result.exit_code == 0, result.output
+    ((question, config),) = calls
+    assert (question, config.model_id, config.teams) == ("Q", "m", ["qa-tester"])
+
+    # Before a command, they become the command's defaults.
+    result = CliRunner().invoke(
+        generative_ai_advisor.main,
+        [
+            "--model",
+            "x",
+            "--no-cache",
+            "ask",
+            "--question",
+            "Q",
+            "--teams",
+            "qa-tester",
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    assert (calls[-1][1].model_id, calls[-1][1].teams) == ("x", ["qa-tester"])
+
+    result = CliRunner().invoke(
+        generative_ai_advisor.main, ["--question", "Q", "batch", "questions.jsonl"]
+    )
+    assert result.exit_code == 2
+    assert "--question cannot be used with batch" in result.output
+
+
+def test_discarded_projects_skip_their_assessment(slow_stages):
+    speculation = advisor.ProjectSpeculation(["A", "B"], "model", top_k=2)
+    prepared = speculation.take("B")
+    assert prepared.result() == ("steps for B", "risks of steps for B")
+    speculation.executor.shutdown(wait=True)
+    assert ("decompose", "A") in slow_stages
+    assert ("assess", "A") not in slow_stages
+
+
+@pytest.mark.parametrize("choice,speculated", [("2", True), ("3", False)])
+def test_ask_reuses_speculated_projects(
+    slow_stages, monkeypatch, tmp_path, choice, speculated
+):
+    class Router:
+        def run(self, input, callbacks=None):
+            return "A\nB\nC"
+
+    monkeypatch.setattr(
+        advisor, "create_multi_prompt_chain", lambda config, verbose=True: Router()
+    )
+    result = CliRunner().invoke(
+        generative_ai_advisor.main,
+        ["ask", "--question", "Q", "--speculate", "2", "--no-cache"],
+        input=choice + "\n",
+    )
+    assert result.exit_code == 0, result.output
+    chosen = "ABC"[int(choice) - 1]
+    assert f"steps for {chosen}" in result.output
+    assert slow_stages.count(("decompose", chosen)) == 1
+    assert ("prepared in the background" in result.output) == speculated
@@ -0,0 +1,127 @@
+import json
+import random
+import time
+
+import pytest
+
+from judge_output import (
+    JUDGE_KEYS,
+    JudgeOutputError,
+    find_json_object,
+    normalize_key,
+    parse_judge_output,
+    reparse_failed_results,
+)
+
+EVALUATION = {
+    "answer-score": 85,
+    "prompt-score": 60,
+    "justification": 'The answer is correct but says "cloud" {twice}.',
+    "input": "<prompt><task>What is cloud computing?</task></prompt>",
+    "output": "Cloud computing is...",
+    "prompt-recommendations": "Set a role and specify the output format.",
+}
+DOCUMENT = json.dumps(EVALUATION)
+
+# Shapes of judge output seen in practice, paired with the expected outcome:
+# either the parsed answer-score or the failure reason.
+FUZZ_CORPUS = [
+    (DOCUMENT, 85),
+    ("Here is the evaluation:\n" + DOCUMENT, 85),
+    (DOCUMENT + "\n\nLet me know if you need anything else.", 85),
+    ("```json\n" + DOCUMENT + "\n```", 85),
+    ("```\n" + DOCUMENT + "\n```\nDone.", 85),
+    ("Sure! ```json\n" + DOCUMENT, 85),
+    ("Scores {see below}:\n" + DOCUMENT, 85),
+    (DOCUMENT[:-1] + ",\n}", 85),
+    ('{"answer_score": "85/100", "Prompt Score": "60"}', 85),
+    ('{"answerScore": 85.0, "promptScore": 60}', 85),
+    ('{"answer-score": 85, "justification": "line one\nline two"}', 85),
+    ('{"answer-score": 85, "prompt-score": 60,}', 85),
+    ('{"answer-score": 85, "justification": "escaped \\" } brace"}', 85),
+    ("", "empty"),
+    ("   \n", "empty"),
+    ("I cannot evaluate this prompt.", "no-json-object"),
+    ('{"answer-score": 85, "prompt-score": ', "unbalanced-braces"),
+    ("{answer-score: 85}", "invalid-json"),
+    ("[1, 2, 3]", "not-an-object"),
+]
+
+
+@pytest.mark.parametrize("document,expected", FUZZ_CORPUS)
+def test_fuzz_corpus(document, expected):
+    if isinstance(expected, str):
+        with pytest.raises(JudgeOutputError) as excinfo:
+            parse_judge_output(document)
+        assert excinfo.value.reason == expected
+    else:
+        assert parse_judge_output(document)["answer-score"] == expected
+
+
+def test_random_wrappers_never_escape_judge_output_error():
+    rng = random.Random(1234)
+    noise = ["{", "}", '"', "\\", "```", "json", "\n", " ", "Note:", ",", "]"]
+    for _ in range(2000):
+        prefix = "".join(rng.choice(noise) for _ in range(rng.randint(0, 6)))
+        document = DOCUMENT
+        if rng.random() < 0.3:
+            cut = rng.randint(0, len(document))
+            document = document[:cut]
+        try:
+            result = parse_judge_output(prefix + document)
+        except JudgeOutputError as e:
+            assert e.reason in {
+                "empty",
+                "no-json-object",
+                "unbalanced-braces",
+                "invalid-json",
+                "not-an-object",
+            }
+        else:
+            assert isinstance(result, dict)
+
+
+def test_find_json_object_skips_braces_inside_strings():
+    text = 'prefix {"a": "}{", "b": {"c": 1}} suffix {"d": 2}'
+    assert find_json_object(text) == '{"a": "}{", "b": {"c": 1}}'
+
+
+def test_normalize_key_leaves_other_keys_alone():
+    assert normalize_key("Prompt_Recommendations") == "prompt-recommendations"
+    assert normalize_key("modelInvoke") == "modelInvoke"
+
+
+def test_missing_keys_are_labelled():
+    with pytest.raises(JudgeOutputError) as excinfo:
+        parse_judge_output('{"answer-score": 85}', required=JUDGE_KEYS)
+    assert excinfo.value.reason == "missing-keys"
+
+
+def test_reparse_failed_results_repairs_in_place():
+    results = [
+        {"answer-score": 90},
+        {
+            "error": "Invalid JSON",
+            "parse-error": "invalid-json",
+            "raw-output": "```json\n" + DOCUMENT + "\n```",
+            "modelInvoke": "invoke-model",
+        },
+        {"error": "empty", "parse-error": "empty", "raw-output": ""},
+    ]
+    assert reparse_failed_results(results) == 1
+    assert results[1]["prompt-score"] == 60
+    assert results[1]["modelInvoke"] == "invoke-model"
+    assert results[2]["parse-error"] == "empty"
+
+
+def test_parse_throughput():
+    wrapped = "Here is my evaluation of the prompt and answer:\n```json\n" + (
+        DOCUMENT + "\n```\nI hope this helps."
+    )
+    documents = [DOCUMENT, wrapped] * 5000
+    start = time.perf_counter()
+    for document in documents:
+        parse_judge_output(document)
+    elapsed = time.perf_counter() - start
+    print(f"\nparsed {len(documents) / elapsed:,.0f} documents/s")
+    assert elapsed < 2.0
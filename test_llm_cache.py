@@ -0,0 +1,28 @@
+from langchain_core.outputs import Generation
+
+from llm_cache import SQLiteLRUCache
+
+
+def test_lookup_misses_until_update(tmp_path):
+    cache = SQLiteLRUCache(str(tmp_path / "cache.db"))
+    assert cache.lookup("prompt", "model-a") is None
+    cache.update("prompt", "model-a", [Generation(text="answer")])
+    assert cache.lookup("prompt", "model-a") == [Generation(text="answer")]
+    assert cache.lookup("prompt", "model-b") is None
+
+    # A new instance on the same file sees earlier responses.
+    assert SQLiteLRUCache(str(tmp_path / "cache.db")).lookup("prompt", "model-a")
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = SQLiteLRUCache(str(tmp_path / "cache.db"), max_entries=2)
+    cache.update("first", "model", [Generation(text="1")])
+    cache.update("second", "model", [Generation(text="2")])
+    assert cache.lookup("first", "model")
+    cache.update("third", "model", [Generation(text="3")])
+    assert cache.size() == 2
+    assert cache.lookup("second", "model") is None
+    assert cache.lookup("first", "model") and cache.lookup("third", "model")
+
+    cache.clear()
+    assert cache.size() == 0
@@ -0,0 +1,105 @@
+import json
+import random
+import string
+import time
+
+from prompt_dedup import (
+    MinHasher,
+    NearDuplicateIndex,
+    cluster_dataset,
+    evaluate_clustered,
+    jaccard,
+    lsh_params,
+)
+
+TYPO = (
+    "<prompt><task>What is cloud computing?</task></prompt>",
+    "<prompt><task>What is cloud compting?</task></prompt>",
+)
+
+
+def random_prompt(rng, words=30):
+    return " ".join(
+        "".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9)))
+        for _ in range(words)
+    )
+
+
+def test_signatures_estimate_similarity():
+    hasher = MinHasher()
+    assert jaccard(hasher.signature(TYPO[0]), hasher.signature(TYPO[0])) == 1.0
+    assert jaccard(hasher.signature(TYPO[0]), hasher.signature(TYPO[1])) > 0.8
+    rng = random.Random(0)
+    unrelated = hasher.signature(random_prompt(rng)), hasher.signature(
+        random_prompt(rng)
+    )
+    assert jaccard(*unrelated) < 0.2
+    assert hasher.signature("Hi").shape == (128,)
+
+
+def test_lsh_params_follow_threshold():
+    bands, rows = lsh_params(0.8, 128)
+    assert bands * rows <= 128
+    assert rows > lsh_params(0.5, 128)[1]
+
+
+def test_index_clusters_typos_and_keeps_distinct_prompts_apart():
+    index = NearDuplicateIndex(threshold=0.8)
+    assert index.add("a", TYPO[0]) == 0
+    assert index.query(TYPO[1]) == 0
+    assert index.add("b", TYPO[1]) == 0
+    assert index.add("c", "<prompt><role>Act as a DBA</role></prompt>") == 1
+    assert index.representatives == ["a", "c"] and index.sizes == [2, 1]
+    assert NearDuplicateIndex(threshold=0.95).add("a", TYPO[0]) == 0
+
+
+def test_cluster_dataset_streams_membership(tmp_path):
+    dataset = tmp_path / "dataset.jsonl"
+    with open(dataset, "w") as f:
+        for prompt in TYPO + TYPO:
+            f.write(json.dumps({"input": prompt}) + "\n\n")
+    output = tmp_path / "clusters.jsonl"
+    index = cluster_dataset(str(dataset), str(output))
+    rows = [json.loads(line) for line in open(output)]
+    assert len(index) == 1
+    # Line numbers count blank lines, matching work_queue's shards.
+    assert [row["line"] for row in rows] == [0, 2, 4, 6]
+    assert [row["cluster"] for row in rows] == [0, 0, 0, 0]
+    assert [row["representative"] for row in rows] == [True, False, False, False]
+
+
+def test_evaluate_clustered_attributes_scores():
+    items = [{"input": prompt} for prompt in TYPO + ("Act as a DBA.",) + TYPO]
+    calls = []
+
+    def evaluate(batch):
+        calls.append(len(batch))
+        return [
+            {"input": item["input"], "prompt-score": 40 + 10 * i, "output": "..."}
+            for i, item in enumerate(batch)
+        ]
+
+    results, report = evaluate_clustered(items, evaluate)
+    assert calls == [2]
+    assert [result["input"] for result in results] == [i["input"] for i in items]
+    assert results[1]["prompt-score"] == 40 and results[1]["attributed-from"] == 0
+    assert "output" not in results[1]
+    assert report["clusters"] == 2 and report["attributed"] == 3
+
+    results, report = evaluate_clustered(items, evaluate, sample=2, pass_score=45)
+    assert results[3]["prompt-score"] == 45.0
+    assert report["disagreeing-clusters"] == [0]
+
+
+def test_streams_many_prompts():
+    rng = random.Random(1)
+    bases = [random_prompt(rng) for _ in range(200)]
+    index = NearDuplicateIndex()
+    start = time.perf_counter()
+    for i in range(4000):
+        text = bases[i % len(bases)]
+        position = rng.randrange(len(text))
+        index.add(i, text[:position] + "x" + text[position + 1 :])
+    assert time.perf_counter() - start < 20
+    # Two variants of one base can estimate just under the threshold.
+    assert len(bases) <= len(index) <= len(bases) * 1.05
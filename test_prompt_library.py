@@ -0,0 +1,164 @@
+import json
+import os
+import time
+
+from click.testing import CliRunner
+
+from prompt_library import DTD, PromptLibrary, main, parse_prompt
+
+PROMPTS_DTD = os.path.join(os.path.dirname(os.path.abspath(__file__)), "prompts.dtd")
+PROMPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "prompts")
+
+VALID_XML = (
+    "<prompt><instructions>Summarize {text}</instructions>"
+    "<output_format>Three sentences.</output_format></prompt>"
+)
+
+
+def write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+
+
+def test_repository_prompts_are_valid():
+    library = PromptLibrary(PROMPTS_DIR, PROMPTS_DTD, cache_path=None).load()
+    assert len(library.records) == 16
+    assert library.invalid() == []
+    kinds = {record.kind for record in library.records.values()}
+    assert kinds == {"xml", "json", "tmpl"}
+
+
+def test_dtd_validation_matches_xmllint_rules():
+    dtd = DTD.from_file(PROMPTS_DTD)
+    cases = {
+        VALID_XML: [],
+        "<prompts><prompt/><prompt><input>x</input></prompt></prompts>": [],
+        "<prompts/>": ["Element prompts content does not follow the DTD: nothing"],
+        "<prompt><task>x</task></prompt>": [
+            "Element prompt content does not follow the DTD: task",
+            "No declaration for element task",
+        ],
+        "<prompt>text<input>x</input></prompt>": [
+            "Element prompt does not allow text content"
+        ],
+        "<prompt><input>x<context/></input></prompt>": [
+            "Element input content does not follow the DTD: context"
+        ],
+        '<prompt id="1"/>': ["No declaration for attribute id of element prompt"],
+    }
+    for text, errors in cases.items():
+        assert parse_prompt("p.xml", text.encode(), dtd).errors == errors, text
+
+
+def test_dtd_children_models():
+    dtd = DTD(
+        "<!ELEMENT doc (title, (para | list)+, note?)>"
+        "<!ELEMENT title (#PCDATA)><!ELEMENT para (#PCDATA | em)*>"
+        "<!ELEMENT em (#PCDATA)><!ELEMENT list EMPTY><!ELEMENT note ANY>"
+        "<!ATTLIST doc lang CDATA #IMPLIED>"
+    )
+    ok = '<doc lang="en"><title/><para>a <em>b</em> c</para><list/><note/></doc>'
+    assert parse_prompt("d.xml", ok.encode(), dtd).errors == []
+    missing = "<doc><para/></doc>"
+    assert parse_prompt("d.xml", missing.encode(), dtd).errors == [
+        "Element doc content does not follow the DTD: para"
+    ]
+
+
+def test_records_are_normalized():
+    xml = parse_prompt("a.xml", VALID_XML.encode())
+    assert xml.sections == {
+        "instructions": "Summarize {text}",
+        "output_format": "Three sentences.",
+    }
+    assert xml.variables == ["text"]
+
+    data = json.dumps({"input": "<prompt>Review: {review}</prompt>"}).encode()
+    assert parse_prompt("b.json", data).text == "<prompt>Review: {review}</prompt>"
+    assert parse_prompt("c.json", b"[1]").errors == [
+        'Expected an object with a string "input"'
+    ]
+    template = parse_prompt("d.tmpl", b"<input>{{input}}</input> {{ output }}")
+    assert template.variables == ["input", "output"]
+
+
+def test_incremental_reload_and_hash_index(tmp_path):
+    directory = str(tmp_path / "prompts")
+    cache = str(tmp_path / "cache.json")
+    write(os.path.join(directory, "a.xml"), VALID_XML)
+    write(os.path.join(directory, "nested", "copy.xml"), VALID_XML)
+    write(os.path.join(directory, "b.tmpl"), "Hello {{name}}")
+    write(os.path.join(directory, "notes.txt"), "ignored")
+
+    library = PromptLibrary(directory, PROMPTS_DTD, cache).load()
+    assert library.reloaded == 3
+    (record,) = [r for r in library.records.values() if r.kind == "xml"][:1]
+    assert len(library.get(record.content_hash)) == 2
+
+    library = PromptLibrary(directory, PROMPTS_DTD, cache).load()
+    assert library.reloaded == 0
+
+    write(os.path.join(directory, "b.tmpl"), "Hello {{name}}, again")
+    os.remove(os.path.join(directory, "nested", "copy.xml"))
+    library = PromptLibrary(directory, PROMPTS_DTD, cache).load()
+    assert library.reloaded == 1
+    assert len(library.records) == 2
+
+    # A different DTD invalidates every cached validation result.
+    dtd = str(tmp_path / "strict.dtd")
+    write(dtd, "<!ELEMENT prompt EMPTY>")
+    library = PromptLibrary(directory, dtd, cache).load()
+    assert library.reloaded == 2
+    assert len(library.invalid()) == 1
+
+
+def test_process_pool_matches_in_process(tmp_path):
+    directory = str(tmp_path / "prompts")
+    for i in range(40):
+        write(os.path.join(directory, f"p{i}.xml"), VALID_XML.replace("Three", str(i)))
+    write(os.path.join(directory, "bad.xml"), "<prompt><task/></prompt>")
+
+    pooled = PromptLibrary(
+        directory, PROMPTS_DTD, None, processes=2, batch_size=8
+    ).load()
+    serial = PromptLibrary(directory, PROMPTS_DTD, None, processes=1).load()
+    assert pooled.records == serial.records
+    assert [r.path for r in pooled.invalid()] == [os.path.join(directory, "bad.xml")]
+
+
+def test_loads_thousands_of_prompts_quickly(tmp_path):
+    directory = str(tmp_path / "prompts")
+    for i in range(3000):
+        write(
+            os.path.join(directory, f"d{i % 30}", f"p{i}.xml"),
+            VALID_XML + f"<!-- {i} -->",
+        )
+    cache = str(tmp_path / "cache.json")
+
+    start = time.perf_counter()
+    library = PromptLibrary(directory, PROMPTS_DTD, cache).load()
+    cold = time.perf_counter() - start
+    start = time.perf_counter()
+    PromptLibrary(directory, PROMPTS_DTD, cache).load()
+    warm = time.perf_counter() - start
+
+    assert len(library.records) == 3000
+    assert library.invalid() == []
+    assert cold < 10
+    assert warm < cold
+
+
+def test_cli_exit_status(tmp_path):
+    directory = str(tmp_path / "prompts")
+    write(os.path.join(directory, "a.xml"), VALID_XML)
+    runner = CliRunner()
+    args = [directory, "--dtd", PROMPTS_DTD, "--cache", ""]
+    result = runner.invoke(main, args)
+    assert result.exit_code == 0
+    assert "1 prompts (1 re-read), 1 distinct, 0 invalid" in result.output
+
+    write(os.path.join(directory, "b.xml"), "<prompt><task/></prompt>")
+    result = runner.invoke(main, args)
+    assert result.exit_code == 1
+    assert "b.xml: No declaration for element task" in result.output
@@ -0,0 +1,86 @@
+import json
+import time
+
+import numpy as np
+
+from prompt_prescorer import (
+    FEATURES,
+    PreScorer,
+    correlation,
+    evaluate_triaged,
+    prompt_features,
+    triage,
+)
+
+
+def load_prompts(path="prompts_dataset.jsonl"):
+    with open(path) as f:
+        return [json.loads(line)["input"] for line in f if line.strip()]
+
+
+def test_features_follow_prompt_structure():
+    bare, structured, with_examples, misspelled = load_prompts()
+    features = dict(zip(FEATURES, prompt_features(with_examples)))
+    assert features["role"] == features["examples"] == features["format"] == 1.0
+    assert dict(zip(FEATURES, prompt_features(bare)))["role"] == 0.0
+    assert dict(zip(FEATURES, prompt_features(structured)))["examples"] == 0.0
+
+    scores = PreScorer().score(load_prompts())
+    assert scores[2] > scores[1] > scores[0]
+    assert all(0 <= score <= 100 for score in scores)
+
+
+def test_grammar_and_plain_text_prompts():
+    clean = dict(zip(FEATURES, prompt_features("Act as a tutor. Explain DNS.")))
+    sloppy = dict(zip(FEATURES, prompt_features("explain the the DNS")))
+    assert clean["role"] == 1.0 and clean["grammar"] == 1.0
+    assert sloppy["grammar"] == 0.25
+
+
+def test_fit_matches_judge_scores():
+    prompts = load_prompts()
+    judge_scores = [30, 75, 92, 25]
+    scorer = PreScorer().fit(prompts, judge_scores)
+    assert np.allclose(scorer.score(prompts), judge_scores, atol=1)
+
+
+def test_triage_orders_borderline_first_and_audits_skips():
+    prompts = [f"prompt {i}" for i in range(1000)]
+    scores = np.array([20.0] * 900 + [50.0, 95.0, 78.0] + [60.0] * 97)
+    plan = triage(prompts, scores, skip_below=40, pass_score=80, audit_rate=0.1)
+    assert plan.order[0] == 902  # 78 is closest to the passing score.
+    assert len(plan.skipped) + len(plan.audited) == 900
+    assert 50 < len(plan.audited) < 130
+    assert plan.audited == triage(prompts, scores, 40, audit_rate=0.1).audited
+
+
+def test_evaluate_triaged_keeps_order_and_reports_false_skips():
+    items = [{"input": prompt} for prompt in load_prompts()]
+    calls = []
+
+    def judge(batch):
+        calls.append([item["input"] for item in batch])
+        return [{"input": item["input"], "prompt-score": 85} for item in batch]
+
+    results, report = evaluate_triaged(items, judge, skip_below=50, audit_rate=1.0)
+    assert [result["input"] for result in results] == [item["input"] for item in items]
+    assert all("prescore" in result for result in results)
+    assert report["skipped"] == 0 and report["false-skips"] == report["audited"]
+
+    calls.clear()
+    results, report = evaluate_triaged(items, judge, skip_below=55, audit_rate=0.0)
+    assert len(calls[0]) == report["judged"] < len(items)
+    assert [i for i, result in enumerate(results) if "skipped" in result] == [0, 3]
+
+
+def test_correlation():
+    assert correlation([1, 2, 3, 4], [10, 20, 30, 45])["spearman"] == 1.0
+    assert correlation([1, 1, 1], [1, 2, 3]) is None
+
+
+def test_scores_large_batches_quickly():
+    prompts = load_prompts() * 5000
+    start = time.perf_counter()
+    scores = PreScorer().score(prompts)
+    assert len(scores) == 20000
+    assert time.perf_counter() - start < 5.0
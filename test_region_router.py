@@ -0,0 +1,124 @@
+import pytest
+from botocore.exceptions import ClientError, EventStreamError
+
+from region_router import (
+    RegionRouter,
+    RegionTarget,
+    RegionUnavailableError,
+    classify_error,
+    load_region_targets,
+)
+
+
+def client_error(code):
+    return ClientError({"Error": {"Code": code, "Message": code}}, "InvokeFlow")
+
+
+def make_router(**kwargs):
+    targets = [
+        RegionTarget(region="us-east-1", flowId="east", weight=2),
+        RegionTarget(region="us-west-2", flowId="west", weight=1),
+    ]
+    return RegionRouter(targets, lambda region: f"client-{region}", **kwargs)
+
+
+def test_load_region_targets_falls_back_to_single_region():
+    targets = load_region_targets({"region": "eu-west-1"}, "flow", "alias")
+    assert [(t.region, t.flowId, t.flowAliasId) for t in targets] == [
+        ("eu-west-1", "flow", "alias")
+    ]
+
+
+def test_load_region_targets_reads_region_list():
+    config = {
+        "region": "us-east-1",
+        "regions": [
+            {"region": "us-east-1", "flowId": "a", "flowAliasId": "x", "weight": 3},
+            {"region": "us-west-2", "flowId": "b", "flowAliasId": "y"},
+        ],
+    }
+    targets = load_region_targets(config)
+    assert [t.flowId for t in targets] == ["a", "b"]
+    assert targets[0].weight == 3
+
+
+def test_concurrent_calls_spread_by_weight():
+    router = make_router()
+    # Acquire without releasing to simulate calls in flight.
+    regions = [router._acquire(set()).target.region for _ in range(6)]
+    assert regions.count("us-east-1") == 4
+    assert regions.count("us-west-2") == 2
+
+
+def test_throttled_region_fails_over():
+    router = make_router()
+
+    def func(target, client):
+        if target.region == "us-east-1":
+            raise client_error("ThrottlingException")
+        return client
+
+    assert router.call(func) == "client-us-west-2"
+    stats = router.stats()
+    assert stats["us-east-1"]["throttles"] == 1
+    assert stats["us-east-1"]["throttleRate"] > 0
+
+
+def test_mid_stream_event_stream_errors_fail_over():
+    def stream_error(code):
+        return EventStreamError({"Error": {"Code": code, "Message": ""}}, "InvokeFlow")
+
+    assert classify_error(stream_error("throttlingException")) == "throttled"
+    assert classify_error(stream_error("serviceQuotaExceededException")) == "throttled"
+    for code in (
+        "internalServerException",
+        "badGatewayException",
+        "dependencyFailedException",
+    ):
+        assert classify_error(stream_error(code)) == "regional"
+    assert classify_error(stream_error("validationException")) is None
+
+    router = make_router(failure_threshold=2, cooldown=60)
+
+    def func(target, client):
+        if target.region == "us-east-1":
+            raise stream_error("throttlingException")
+        return target.region
+
+    assert router.call(func) == "us-west-2"
+    assert router.stats()["us-east-1"]["throttles"] == 1
+
+
+def test_unhealthy_region_is_skipped_during_cooldown():
+    router = make_router(failure_threshold=1, cooldown=60)
+
+    def failing(target, client):
+        if target.region == "us-east-1":
+            raise client_error("ServiceUnavailableException")
+        return target.region
+
+    router.call(failing)
+    assert [router.call(lambda t, c: t.region) for _ in range(3)] == ["us-west-2"] * 3
+
+
+def test_non_regional_errors_are_not_retried():
+    router = make_router()
+    calls = []
+
+    def func(target, client):
+        calls.append(target.region)
+        raise client_error("ValidationException")
+
+    with pytest.raises(ClientError):
+        router.call(func)
+    assert calls == ["us-east-1"]
+
+
+def test_all_regions_failing_raises():
+    router = make_router()
+
+    def func(target, client):
+        raise client_error("ThrottlingException")
+
+    with pytest.raises(RegionUnavailableError):
+        router.call(func)
@@ -0,0 +1,131 @@
+import json
+import multiprocessing
+import threading
+import time
+
+import pytest
+
+from work_queue import LeaseLostError, WorkQueue, read_shard, run_worker
+
+
+def write_dataset(path, count):
+    with open(path, "w") as f:
+        for i in range(count):
+            f.write(json.dumps({"input": f"prompt {i}"}) + "\n")
+
+
+def score_items(items):
+    return [{"prompt-score": int(item["input"].split()[1])} for item in items]
+
+
+def _worker(queue_path, worker, results_dir):
+    run_worker(WorkQueue(queue_path), worker, score_items, results_dir)
+
+
+def test_claim_renew_complete(tmp_path):
+    dataset = tmp_path / "dataset.jsonl"
+    write_dataset(dataset, 5)
+    queue = WorkQueue(str(tmp_path / "queue.db"))
+    assert queue.enqueue_dataset(str(dataset), shard_size=2) == 3
+    assert queue.enqueue_dataset(str(dataset), shard_size=2) == 0
+
+    shard = queue.claim("a")
+    assert (shard["start_line"], shard["end_line"]) == (0, 2)
+    queue.renew(shard["id"], "a")
+    with pytest.raises(LeaseLostError):
+        queue.renew(shard["id"], "b")
+    queue.complete(shard["id"], "a", "results.jsonl")
+    assert queue.counts() == {"done": 1, "pending": 2}
+
+
+def test_shards_seek_to_their_first_line(tmp_path):
+    dataset = tmp_path / "dataset.jsonl"
+    lines = ['{"input": "prompt 0 caf\u00e9"}', "", '{"input": "prompt 2"}']
+    dataset.write_text("\n".join(lines * 2) + "\n", encoding="utf-8")
+    queue = WorkQueue(str(tmp_path / "queue.db"))
+    queue.enqueue_dataset(str(dataset), shard_size=2)
+
+    shards = [queue.claim("a") for _ in range(3)]
+    assert shards[1]["start_offset"] == len("\n".join(lines[:2]).encode()) + 1
+    read = [(n, item["input"]) for shard in shards for n, item in read_shard(shard)]
+    assert read == [
+        (0, "prompt 0 caf\u00e9"),
+        (2, "prompt 2"),
+        (3, "prompt 0 caf\u00e9"),
+        (5, "prompt 2"),
+    ]
+    legacy = dict(shards[1], start_offset=None)
+    assert [n for n, _ in read_shard(legacy)] == [2, 3]
+
+
+def test_waiting_worker_outlives_an_empty_queue(tmp_path):
+    dataset = tmp_path / "dataset.jsonl"
+    write_dataset(dataset, 3)
+    queue_path = str(tmp_path / "queue.db")
+    completed = []
+    worker = threading.Thread(
+        target=lambda: completed.append(
+            run_worker(
+                WorkQueue(queue_path),
+                "early",
+                score_items,
+                str(tmp_path / "results"),
+                poll_interval=0.05,
+                wait_for_work=True,
+            )
+        )
+    )
+    worker.start()
+    time.sleep(0.2)
+    assert worker.is_alive()
+    WorkQueue(queue_path).enqueue_dataset(str(dataset), shard_size=2)
+    worker.join(timeout=10)
+    assert completed == [2]
+
+
+def test_expired_lease_is_reassigned(tmp_path):
+    dataset = tmp_path / "dataset.jsonl"
+    write_dataset(dataset, 2)
+    queue = WorkQueue(str(tmp_path / "queue.db"))
+    queue.enqueue_dataset(str(dataset), shard_size=2)
+
+    stale = queue.claim("crashed", lease_seconds=0.05)
+    assert queue.claim("b") is None
+    time.sleep(0.1)
+    shard = queue.claim("b")
+    assert shard["id"] == stale["id"]
+    assert shard["attempts"] == 2
+    with pytest.raises(LeaseLostError):
+        queue.complete(stale["id"], "crashed", "late.jsonl")
+
+
+def test_local_processes_drain_queue_and_merge(tmp_path):
+    dataset = tmp_path / "dataset.jsonl"
+    write_dataset(dataset, 503)
+    queue_path = str(tmp_path / "queue.db")
+    results_dir = str(tmp_path / "results")
+    queue = WorkQueue(queue_path)
+    queue.enqueue_dataset(str(dataset), shard_size=10)
+    # A worker that dies mid-shard leaves a lease that has to expire.
+    queue.claim("crashed", lease_seconds=0.5)
+
+    processes = [
+        multiprocessing.Process(
+            target=_worker, args=(queue_path, f"worker-{i}", results_dir)
+        )
+        for i in range(4)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(timeout=60)
+    # The crashed worker's shard is picked up once its lease has expired.
+    time.sleep(0.5)
+    _worker(queue_path, "late-worker", results_dir)
+
+    assert queue.is_finished()
+    output = tmp_path / "merged.jsonl"
+    assert queue.merge(str(output)) == 503
+    records = [json.loads(line) for line in output.read_text().splitlines()]
+    assert [r["line"] for r in records] == list(range(503))
+    assert all(r["prompt-score"] == r["line"] for r in records)
@@ -1,7 +1,7 @@
 #!/bin/bash
 
-# Validate prompts using xmllint
-xmllint --noout --dtdvalid prompts.dtd prompts/*.xml
+# Validate XML prompts against the DTD and check the JSON and template prompts
+python prompt_library.py prompts --dtd prompts.dtd
 
 # Check the exit status
 if [ $? -eq 0 ]; then
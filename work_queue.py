@@ -0,0 +1,282 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS shards (
+    id INTEGER PRIMARY KEY,
+    dataset TEXT NOT NULL,
+    start_line INTEGER NOT NULL,
+    end_line INTEGER NOT NULL,
+    start_offset INTEGER,
+    status TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    results_path TEXT
+);
+CREATE INDEX IF NOT EXISTS shards_status ON shards (status, lease_expires);
+"""
+
+
+class LeaseLostError(RuntimeError):
+    pass
+
+
+class WorkQueue:
+    """Durable queue of dataset shards backed by a SQLite file.
+
+    Workers claim a shard under a lease and must renew it while they work.
+    A shard whose lease expires goes back to the pool and is handed to the
+    next worker that asks, so crashed workers never strand work. Workers on
+    several hosts need the file on a filesystem with reliable locking.
+    """
+
+    def __init__(self, path, timeout=30.0):
+        self.path = path
+        self.timeout = timeout
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(shards)")}
+            if "start_offset" not in columns:
+                # Queues created before offsets were recorded; their shards
+                # are read from the start of the dataset.
+                conn.execute("ALTER TABLE shards ADD COLUMN start_offset INTEGER")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _transaction(self):
+        with self._connect() as conn:
+            # IMMEDIATE takes the write lock up front so two workers cannot
+            # both read the same pending shard before claiming it.
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def enqueue_dataset(self, dataset, shard_size=100):
+        """Split a JSONL dataset into shards of ``shard_size`` lines.
+
+        Each shard records the byte offset of its first line so workers can
+        seek straight to it. Returns the number of shards queued. A dataset
+        that is already queued is left alone, so a restarted coordinator
+        resumes where it stopped.
+        """
+        with self._connect() as conn:
+            (queued,) = conn.execute(
+                "SELECT COUNT(*) FROM shards WHERE dataset = ?", (dataset,)
+            ).fetchone()
+        if queued:
+            return 0
+        offsets = []
+        with open(dataset, "rb") as f:
+            offset = 0
+            for line in f:
+                offsets.append(offset)
+                offset += len(line)
+        line_count = len(offsets)
+        shards = [
+            (dataset, start, min(start + shard_size, line_count), offsets[start])
+            for start in range(0, line_count, shard_size)
+        ]
+        with self._transaction() as conn:
+            conn.executemany(
+                "INSERT INTO shards (dataset, start_line, end_line, start_offset) "
+                "VALUES (?, ?, ?, ?)",
+                shards,
+            )
+        return len(shards)
+
+    def claim(self, worker, lease_seconds=300.0):
+        """Lease the next pending or expired shard to ``worker``, or return None."""
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT * FROM shards WHERE status = 'pending' "
+                "OR (status = 'leased' AND lease_expires < ?) ORDER BY id LIMIT 1",
+                (now,),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE shards SET status = 'leased', worker = ?, lease_expires = ?, "
+                "attempts = attempts + 1 WHERE id = ?",
+                (worker, now + lease_seconds, row["id"]),
+            )
+        shard = dict(row)
+        shard.update(
+            status="leased",
+            worker=worker,
+            lease_expires=now + lease_seconds,
+            attempts=shard["attempts"] + 1,
+        )
+        return shard
+
+    def renew(self, shard_id, worker, lease_seconds=300.0):
+        """Extend the lease; raises ``LeaseLostError`` if another worker took the shard."""
+        with self._transaction() as conn:
+            updated = conn.execute(
+                "UPDATE shards SET lease_expires = ? "
+                "WHERE id = ? AND worker = ? AND status = 'leased'",
+                (time.time() + lease_seconds, shard_id, worker),
+            ).rowcount
+        if not updated:
+            raise LeaseLostError(f"Shard {shard_id} is no longer leased to {worker}")
+
+    def complete(self, shard_id, worker, results_path):
+        with self._transaction() as conn:
+            updated = conn.execute(
+                "UPDATE shards SET status = 'done', results_path = ?, "
+                "lease_expires = NULL WHERE id = ? AND worker = ? AND status = 'leased'",
+                (results_path, shard_id, worker),
+            ).rowcount
+        if not updated:
+            raise LeaseLostError(f"Shard {shard_id} is no longer leased to {worker}")
+
+    def counts(self):
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT status, COUNT(*) AS n FROM shards GROUP BY status"
+            ).fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+    def is_finished(self):
+        counts = self.counts()
+        return sum(counts.values()) == counts.get("done", 0)
+
+    def merge(self, output_path):
+        """Write one result per dataset line, in dataset order, from completed shards.
+
+        A shard that was processed more than once (because a lease expired
+        while its first worker was still running) contributes only the
+        results of the worker that completed it. Returns the number of
+        results written.
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT * FROM shards WHERE status = 'done' "
+                "ORDER BY dataset, start_line"
+            ).fetchall()
+        seen = set()
+        written = 0
+        tmp_path = output_path + ".tmp"
+        with open(tmp_path, "w") as out:
+            for row in rows:
+                with open(row["results_path"]) as f:
+                    for line in f:
+                        if not line.strip():
+                            continue
+                        record = json.loads(line)
+                        key = (row["dataset"], record["line"])
+                        if key in seen:
+                            continue
+                        seen.add(key)
+                        out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                        written += 1
+        os.replace(tmp_path, output_path)
+        return written
+
+
+def read_shard(shard):
+    """Yield ``(line_number, item)`` for the dataset lines in ``shard``."""
+    offset = shard.get("start_offset")
+    first_line = 0 if offset is None else shard["start_line"]
+    with open(shard["dataset"], "rb") as f:
+        f.seek(offset or 0)
+        for line_number, line in enumerate(f, first_line):
+            if line_number >= shard["end_line"]:
+                break
+            if line_number >= shard["start_line"] and line.strip():
+                yield line_number, json.loads(line)
+
+
+class _LeaseKeeper:
+    def __init__(self, queue, shard, lease_seconds):
+        self.queue = queue
+        self.shard = shard
+        self.lease_seconds = lease_seconds
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.lease_seconds / 3):
+            try:
+                self.queue.renew(
+                    self.shard["id"], self.shard["worker"], self.lease_seconds
+                )
+            except LeaseLostError:
+                self.lost = True
+                return
+            except sqlite3.Error as e:
+                print(f"Could not renew lease on shard {self.shard['id']}: {e}")
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+        return False
+
+
+def run_worker(
+    queue,
+    worker,
+    process_items,
+    results_dir,
+    lease_seconds=300.0,
+    poll_interval=5.0,
+    wait_for_work=False,
+):
+    """Claim shards until none are left, processing each with ``process_items``.
+
+    ``process_items`` takes a list of dataset items and returns one result
+    per item. Leases are renewed in the background while a shard runs. With
+    ``wait_for_work``, a worker started before the coordinator has queued a
+    dataset waits for it rather than finding an empty queue finished.
+    Returns the number of shards this worker completed.
+    """
+    os.makedirs(results_dir, exist_ok=True)
+    completed = 0
+    while True:
+        shard = queue.claim(worker, lease_seconds)
+        if shard is None:
+            if not wait_for_work or (queue.counts() and queue.is_finished()):
+                return completed
+            time.sleep(poll_interval)
+            continue
+
+        lines = list(read_shard(shard))
+        with _LeaseKeeper(queue, shard, lease_seconds) as keeper:
+            results = process_items([item for _, item in lines])
+        if keeper.lost:
+            print(f"Lease on shard {shard['id']} expired; discarding results")
+            continue
+
+        results_path = os.path.join(results_dir, f"shard-{shard['id']}-{worker}.jsonl")
+        with open(results_path, "w") as f:
+            for (line_number, _), result in zip(lines, results):
+                record = {"line": line_number, **result}
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        try:
+            queue.complete(shard["id"], worker, results_path)
+        except LeaseLostError:
+            print(f"Lease on shard {shard['id']} expired; discarding results")
+            continue
+        completed += 1